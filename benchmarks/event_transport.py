@@ -0,0 +1,142 @@
+# coding=utf-8
+
+"""
+Event transport latency and throughput.
+
+Measures how fast events can be serialized, then forwards events between two event managers over the Unix socket
+transport - one is the hub, the other connects to it - and reports throughput in events/s and one-way latency
+percentiles. Both managers share an event loop, so the numbers include the work on both ends.
+
+Run with `python -m benchmarks.event_transport` from the repository root, with `src` on the path.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from ultros.core.events.definitions.general import Event
+from ultros.core.events.definitions.remote import remote_identifier
+from ultros.core.events.manager import EventManager
+from ultros.core.events.serialization import decode_batch, encode_batch
+
+__author__ = "Gareth Coles"
+
+
+class MessageEvent(Event):
+    def __init__(self, sent: float, index: int):
+        super().__init__()
+
+        self.sent = sent
+        self.index = index
+        self.network = "irc"
+        self.target = "#ultros"
+        self.sender = "gdude2002"
+        self.message = "This is a message of a typical length for a chat network."
+        self.tags = {"time": "2017-01-01T00:00:00.000Z", "account": "gdude2002"}
+
+
+def measure_serialization(count: int, batch: int) -> tuple:
+    events = [MessageEvent(0.0, x) for x in range(batch)]
+    batches = max(1, count // batch)
+
+    start = time.perf_counter()
+
+    for _ in range(batches):
+        data = encode_batch("bench", events)
+
+    encoded = time.perf_counter() - start
+    start = time.perf_counter()
+
+    for _ in range(batches):
+        decode_batch(data)
+
+    decoded = time.perf_counter() - start
+
+    return batches * batch / encoded, batches * batch / decoded, len(data) / batch
+
+
+async def measure_transport(path: str, count: int, batch: int, window: int) -> tuple:
+    sender = EventManager(None)
+    receiver = EventManager(None)
+
+    for name, manager in (("receiver", receiver), ("sender", sender)):
+        manager.load_transport({
+            "type": "unix", "path": path, "name": name, "forward": [MessageEvent.identifier], "max_batch": batch
+        })
+
+        await manager.transport.start()
+
+    latencies = []
+    done = asyncio.Event()
+
+    def handler(event):
+        latencies.append(time.perf_counter() - event.data["sent"])
+
+        if len(latencies) >= count:
+            done.set()
+
+    receiver.add_handler(None, remote_identifier(MessageEvent), handler)
+
+    start = time.perf_counter()
+
+    for index in range(count):
+        await sender.fire_event(MessageEvent(time.perf_counter(), index))
+
+        if index % window == window - 1:
+            # Let the batch go out, as it would between bursts of network traffic
+            await asyncio.sleep(0)
+
+    await done.wait()
+    taken = time.perf_counter() - start
+
+    sender.shutdown()
+    receiver.shutdown()
+    await asyncio.sleep(0.01)  # Let the connections close
+
+    latencies.sort()
+
+    return count / taken, latencies
+
+
+def percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.event_transport")
+
+    parser.add_argument("--count", help="number of events to send", type=int, default=100000)
+    parser.add_argument(
+        "--batches", help="comma-separated maximum batch sizes", default="1,16,256"
+    )
+    parser.add_argument(
+        "--window", help="how many events to fire before yielding to the event loop", type=int, default=64
+    )
+
+    args = parser.parse_args()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    for batch in (int(x) for x in args.batches.split(",")):
+        encode_rate, decode_rate, size = measure_serialization(args.count, batch)
+
+        path = os.path.join(tempfile.mkdtemp(), "events.sock")
+        rate, latencies = loop.run_until_complete(measure_transport(path, args.count, batch, args.window))
+
+        print("Batch size: {:,}".format(batch))
+        print("    Encode:     {:12,.0f} events/s ({:.0f} bytes/event)".format(encode_rate, size))
+        print("    Decode:     {:12,.0f} events/s".format(decode_rate))
+        print("    Transport:  {:12,.0f} events/s".format(rate))
+        print("    Latency:    p50 {:.3f}ms, p99 {:.3f}ms, max {:.3f}ms".format(
+            percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000, latencies[-1] * 1000
+        ))
+
+        os.rmdir(os.path.dirname(path))
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# coding=utf-8
+
+"""
+End-to-end IRC throughput and latency.
+
+Connects a pool of `PlainIRCConnector`s to the simulated IRC server from `tests.tools.ircd`, over real sockets, and
+measures the whole stack - framing, parsing, dispatch and state tracking:
+
+* How long it takes to connect, register and join every channel, with `--users` members in each
+* How many lines per second get through when the server floods the channels, and how long each one took to reach its
+  handler, as latency percentiles. Pass `--rate` to send at a fixed rate rather than as fast as possible.
+* How long a NAMES burst and a netsplit (in a batch) take to be handled, for `--burst` users
+* The PING round trip time once the flood is over
+
+The server and the connectors share an event loop, so the numbers include the work on both ends.
+
+Run with `python -m benchmarks.irc_end_to_end` from the repository root, with `src` on the path.
+"""
+
+import argparse
+import asyncio
+import time
+
+from ultros.networks.irc.connectors.plain import PlainIRCConnector
+from ultros.networks.irc.servers.irc import IRCServer
+
+from benchmarks.event_transport import percentile
+from tests.tools.ircd import SimulatedIRCServer, sent_time, wait_until
+
+__author__ = "Gareth Coles"
+
+
+class BenchNetwork:
+    """
+    Just enough of a network for the connectors to run without the rest of Ultros.
+    """
+
+    name = "bench"
+    ultros = None
+
+    def notify_connected(self, connector):
+        pass
+
+    def notify_disconnected(self, connector, exc):
+        pass
+
+
+async def measure(args) -> dict:
+    ircd = SimulatedIRCServer()
+    channels = ["#bench{}".format(x) for x in range(args.channels)]
+
+    for channel in channels:
+        ircd.add_users(channel, args.users)
+
+    await ircd.start()
+
+    network = BenchNetwork()
+    server = IRCServer("irc.example.net", network, channels)
+    connectors = []
+
+    for index in range(args.connections):
+        connector = PlainIRCConnector(
+            "irc.example.net/{}".format(index), network, server, host="127.0.0.1", port=ircd.port,
+            nickname="Bench{}".format(index), flood_rate=None
+        )
+
+        server.add_connector(connector)
+        connectors.append(connector)
+
+    def members(channel: str) -> int:
+        return sum(len(connector.state.get_members(channel)) for connector in connectors)
+
+    results = {}
+    start = time.perf_counter()
+
+    await asyncio.gather(*(connector.do_connect() for connector in connectors))
+    await wait_until(lambda: all(members(channel) == args.users + 1 for channel in channels), timeout=60)
+
+    results["setup"] = time.perf_counter() - start
+
+    latencies = []
+
+    async def handler(message):
+        latencies.append(time.perf_counter() - sent_time(message))
+
+    for connector in connectors:
+        connector.add_command_handler("PRIVMSG", handler)
+
+    start = time.perf_counter()
+
+    delivered = await ircd.flood(channels, args.messages, rate=args.rate or None, size=args.size)
+    await wait_until(lambda: len(latencies) >= delivered, timeout=600)
+
+    results["flood"] = delivered / (time.perf_counter() - start)
+    results["latencies"] = sorted(latencies)
+
+    channel = channels[0]
+    expected = members(channel) + args.burst
+    start = time.perf_counter()
+
+    ircd.names_burst(channel, args.burst)
+    await wait_until(lambda: members(channel) == expected, timeout=60)
+
+    results["names"] = time.perf_counter() - start
+    start = time.perf_counter()
+
+    ircd.netsplit(args.burst, channel=channel)
+    await wait_until(lambda: members(channel) == expected - args.burst, timeout=60)
+
+    results["netsplit"] = time.perf_counter() - start
+    results["ping"] = await ircd.clients[0].ping()
+
+    for connector in connectors:
+        await connector.do_disconnect()
+
+    await ircd.close()
+    await wait_until(lambda: all(connector.dispatch_task.done() for connector in connectors))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.irc_end_to_end")
+
+    parser.add_argument("--connections", help="number of connections in the pool", type=int, default=1)
+    parser.add_argument("--channels", help="number of channels to join", type=int, default=4)
+    parser.add_argument("--users", help="number of users in each channel to start with", type=int, default=500)
+    parser.add_argument("--messages", help="number of messages to flood the channels with", type=int, default=100000)
+    parser.add_argument("--rate", help="messages per second to send, or 0 for as fast as possible", type=float,
+                        default=0)
+    parser.add_argument("--size", help="length of each message's text", type=int, default=100)
+    parser.add_argument("--burst", help="number of users in the NAMES burst and the netsplit", type=int,
+                        default=5000)
+
+    args = parser.parse_args()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    results = loop.run_until_complete(measure(args))
+    latencies = results["latencies"]
+
+    loop.close()
+
+    print("Connections: {:,}, channels: {:,}, users per channel: {:,}".format(
+        args.connections, args.channels, args.users
+    ))
+    print("    Setup:      {:10.3f}ms".format(results["setup"] * 1000))
+    print("    Flood:      {:10,.0f} lines/s".format(results["flood"]))
+    print("    Latency:    p50 {:.3f}ms, p99 {:.3f}ms, max {:.3f}ms".format(
+        percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000, latencies[-1] * 1000
+    ))
+    print("    NAMES:      {:10.3f}ms for {:,} users".format(results["names"] * 1000, args.burst))
+    print("    Netsplit:   {:10.3f}ms for {:,} users".format(results["netsplit"] * 1000, args.burst))
+    print("    PING:       {:10.3f}ms".format(results["ping"] * 1000))
+
+
+if __name__ == "__main__":
+    main()
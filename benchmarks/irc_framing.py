@@ -0,0 +1,105 @@
+# coding=utf-8
+
+"""
+IRC line framing throughput, in MB/s.
+
+Simulates a large NAMES burst arriving from the transport in fixed-size chunks, and compares `LineFramer` with the
+bytes buffer and `split()` approach it replaced.
+
+Run with `python -m benchmarks.irc_framing` from the repository root, with `src` on the path.
+"""
+
+import argparse
+import time
+
+from ultros.networks.irc.framing import LineFramer
+
+__author__ = "Gareth Coles"
+
+
+def make_burst(size: int) -> bytes:
+    """
+    Build roughly `size` bytes of RPL_NAMREPLY lines.
+    """
+
+    nicks = " ".join("@user{0} +voice{0} nick{0}".format(x) for x in range(20))
+    line = ":irc.example.net 353 Ultros = #big-channel :{}\r\n".format(nicks).encode("UTF-8")
+
+    return line * max(1, size // len(line))
+
+
+def chunk(data: bytes, size: int) -> list:
+    return [data[offset:offset + size] for offset in range(0, len(data), size)]
+
+
+def frame_split(chunks: list) -> int:
+    """
+    The old approach - append to a bytes buffer and split off one line at a time.
+    """
+
+    buffer = b""
+    count = 0
+
+    for data in chunks:
+        buffer += data
+
+        while b"\r\n" in buffer:
+            line, buffer = buffer.split(b"\r\n", 1)
+            count += 1
+
+    return count
+
+
+def frame_framer(chunks: list) -> int:
+    framer = LineFramer()
+    count = 0
+
+    for data in chunks:
+        count += len(framer.feed(data))
+
+    return count
+
+
+def measure(func, chunks: list, total: int, repeat: int) -> float:
+    """
+    Run `func` over the chunks `repeat` times, returning the best throughput in MB/s.
+    """
+
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(chunks)
+        taken = time.perf_counter() - start
+
+        if best is None or taken < best:
+            best = taken
+
+    return total / best / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.irc_framing")
+
+    parser.add_argument("--size", help="burst size in bytes", type=int, default=4 * 1024 * 1024)
+    parser.add_argument("--repeat", help="number of runs to take the best of", type=int, default=5)
+    parser.add_argument(
+        "--chunks", help="comma-separated chunk sizes, in bytes", default="1024,65536,262144"
+    )
+
+    args = parser.parse_args()
+
+    data = make_burst(args.size)
+
+    print("Burst: {:,} bytes, {:,} lines".format(len(data), data.count(b"\r\n")))
+
+    for size in (int(x) for x in args.chunks.split(",")):
+        chunks = chunk(data, size)
+
+        print("Chunk size: {:,} bytes".format(size))
+        print("    split():    {:10.2f} MB/s".format(measure(frame_split, chunks, len(data), args.repeat)))
+        print("    LineFramer: {:10.2f} MB/s".format(measure(frame_framer, chunks, len(data), args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# coding=utf-8
+
+"""
+IRC line parsing throughput, in lines per second.
+
+Parses a corpus of real server lines (`benchmarks/data/irc_corpus.txt`), comparing `parse_line` with the dict-based
+parser it replaced. Tag decoding is measured separately, as it only happens when a handler asks for the tags.
+
+Run with `python -m benchmarks.irc_parsing` from the repository root, with `src` on the path.
+"""
+
+import argparse
+import os
+import time
+
+from ultros.networks.irc.parser import parse_line
+
+__author__ = "Gareth Coles"
+
+CORPUS = os.path.join(os.path.dirname(__file__), "data", "irc_corpus.txt")
+
+
+def load_corpus() -> list:
+    with open(CORPUS, "r", encoding="UTF-8") as fh:
+        return [line.rstrip("\r\n") for line in fh if line.strip()]
+
+
+def parse_line_dict(line: str) -> dict:
+    """
+    The old parser, from `BaseIRCConnector.parse_line`.
+    """
+
+    data = {
+        "tags": {},
+        "prefix": None,
+        "command": None,
+        "params": []
+    }
+
+    if line[0] == "@":
+        tags, line = line.split(" ", 1)
+
+        for tag in tags.split(";"):
+            if "=" in tag:
+                key, value = tag.split("=", 1)
+            else:
+                key, value = tag, None
+
+            if key not in data["tags"]:
+                data["tags"][key] = value
+
+    if line[0] == ":":
+        prefix, line = line.split(" ", 1)
+        data["prefix"] = prefix[1:]
+
+    command, line = line.split(" ", 1)
+    data["command"] = command.upper()
+
+    while line:
+        if " " in line:
+            param, line = line.split(" ", 1)
+        else:
+            param, line = line, ""
+
+        if param[0] == ":":
+            data["params"].append(param[1:] + " " + line)
+            break
+
+        data["params"].append(param)
+
+    return data
+
+
+def run_dict(lines: list):
+    for line in lines:
+        parse_line_dict(line)
+
+
+def run_message(lines: list):
+    for line in lines:
+        parse_line(line)
+
+
+def run_message_tags(lines: list):
+    for line in lines:
+        parse_line(line).tags
+
+
+def measure(func, lines: list, repeat: int) -> float:
+    """
+    Run `func` over the lines `repeat` times, returning the best throughput in lines per second.
+    """
+
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(lines)
+        taken = time.perf_counter() - start
+
+        if best is None or taken < best:
+            best = taken
+
+    return len(lines) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.irc_parsing")
+
+    parser.add_argument("--lines", help="number of lines to parse per run", type=int, default=200000)
+    parser.add_argument("--repeat", help="number of runs to take the best of", type=int, default=5)
+
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    lines = (corpus * (args.lines // len(corpus) + 1))[:args.lines]
+
+    print("Corpus: {:,} distinct lines, {:,} lines per run".format(len(corpus), len(lines)))
+    print("    dict parser:               {:12,.0f} lines/s".format(measure(run_dict, lines, args.repeat)))
+    print("    parse_line:                {:12,.0f} lines/s".format(measure(run_message, lines, args.repeat)))
+    print("    parse_line + tags:         {:12,.0f} lines/s".format(measure(run_message_tags, lines, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
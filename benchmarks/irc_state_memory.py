@@ -0,0 +1,90 @@
+# coding=utf-8
+
+"""
+IRC state tracking memory use.
+
+Fills an `IRCState` with NAMES replies for a large number of users spread over many channels, and reports the
+memory allocated for it, measured with `tracemalloc`.
+
+Run with `python -m benchmarks.irc_state_memory` from the repository root, with `src` on the path.
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from ultros.networks.irc.state import IRCState
+
+__author__ = "Gareth Coles"
+
+
+def make_names(users: int, channels: int, per_user: int, hosts: int, seed: int) -> dict:
+    """
+    Work out which users are in each channel. Every user is in `per_user` random channels, and has one of `hosts`
+    shared (cloaked) hosts.
+
+    :return: A dict mapping channel names to lists of NAMES entries
+    """
+
+    rng = random.Random(seed)
+    names = {"#channel{}".format(x): [] for x in range(channels)}
+    channel_names = list(names)
+
+    for x in range(users):
+        prefix = rng.choice(("", "", "", "", "+", "@"))
+        entry = "{}user{}!ident{}@cloak{}.example.net".format(prefix, x, x, x % hosts)
+
+        for channel in rng.sample(channel_names, per_user):
+            names[channel].append(entry)
+
+    return names
+
+
+def fill(names: dict) -> IRCState:
+    state = IRCState()
+
+    for channel, entries in names.items():
+        state.join(channel, "Ultros", "ultros", "ultros.io", is_self=True)
+
+        # Servers send NAMES in chunks of a few hundred bytes
+        for offset in range(0, len(entries), 20):
+            state.names(channel, entries[offset:offset + 20])
+
+        state.names_end(channel)
+
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.irc_state_memory")
+
+    parser.add_argument("--users", help="number of users", type=int, default=50000)
+    parser.add_argument("--channels", help="number of channels", type=int, default=500)
+    parser.add_argument("--per-user", help="number of channels each user is in", type=int, default=3)
+    parser.add_argument("--hosts", help="number of distinct hosts", type=int, default=1000)
+    parser.add_argument("--seed", help="random seed", type=int, default=0)
+
+    args = parser.parse_args()
+
+    names = make_names(args.users, args.channels, args.per_user, args.hosts, args.seed)
+    memberships = sum(len(entries) for entries in names.values())
+
+    tracemalloc.start()
+
+    start = time.perf_counter()
+    state = fill(names)
+    taken = time.perf_counter() - start
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("Users: {:,}, channels: {:,}, memberships: {:,}".format(len(state.users), len(state.channels), memberships))
+    print("Filled in {:.2f}s".format(taken))
+    print("Memory: {:,.0f} KiB (peak {:,.0f} KiB)".format(current / 1024, peak / 1024))
+    print("    Per user:       {:8.1f} bytes".format(current / len(state.users)))
+    print("    Per membership: {:8.1f} bytes".format(current / memberships))
+
+
+if __name__ == "__main__":
+    main()
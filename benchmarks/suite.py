@@ -0,0 +1,381 @@
+# coding=utf-8
+
+"""
+The core benchmark suite.
+
+Measures the hot paths of Ultros, entirely offline:
+
+* `irc.framing`: Splitting a burst of data from the transport into lines, at several chunk sizes
+* `irc.parsing`: Parsing a corpus of real server lines, with and without decoding tags
+* `events.fire_event`: Firing events through the event manager, with more handlers and deeper event class
+  hierarchies
+* `rules.run`: Running a value through larger and larger rule sets
+* `storage.<format>.load` and `storage.<format>.save`: Loading and saving data files of several sizes, in each
+  storage format. Formats whose dependencies aren't installed are skipped.
+
+Each benchmark is run `--repeat` times, and the best and median time per operation are reported. Pass `--output` to
+save the results as JSON, along with the commit and Python version they were measured on, and `--compare` to compare
+them with results saved earlier - for example, from the parent commit. Benchmarks that got slower by more than
+`--threshold` are reported as regressions, and the exit code is 1 if there were any. Only compare results measured on
+the same machine.
+
+Run with `python -m benchmarks.suite` from the repository root, with `src` on the path.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from collections import namedtuple
+from configparser import ConfigParser
+from typing import Callable, Dict, Iterable, List, Optional
+
+from benchmarks.irc_framing import chunk, make_burst
+from benchmarks.irc_parsing import load_corpus
+
+__author__ = "Gareth Coles"
+
+Case = namedtuple("Case", ["name", "params", "ops", "func"])
+Case.__doc__ = """
+A single benchmark to run.
+
+:ivar name: The name of the benchmark, eg "rules.run"
+:ivar params: The parameters it was run with, eg {"rules": 100}
+:ivar ops: How many operations each call of `func` performs
+:ivar func: A function that performs `ops` operations
+"""
+
+Skipped = namedtuple("Skipped", ["name", "reason"])
+
+
+def case_key(name: str, params: Dict[str, object]) -> str:
+    """
+    Get the key a benchmark's results are stored under, eg "rules.run[rules=100]".
+    """
+
+    if not params:
+        return name
+
+    return "{}[{}]".format(name, ",".join("{}={}".format(key, value) for key, value in sorted(params.items())))
+
+
+# region: Benchmarks
+
+def bench_irc(args) -> Iterable[Case]:
+    from ultros.networks.irc.framing import LineFramer
+    from ultros.networks.irc.parser import parse_line
+
+    data = make_burst(args.scale * 1024 * 1024)
+    lines = data.count(b"\r\n")
+
+    for size in (1024, 65536):
+        chunks = chunk(data, size)
+
+        def frame(chunks=chunks):
+            framer = LineFramer()
+
+            for item in chunks:
+                framer.feed(item)
+
+        yield Case("irc.framing", {"chunk": size}, lines, frame)
+
+    corpus = load_corpus()
+    parse_lines = (corpus * (args.scale * 50000 // len(corpus) + 1))[:args.scale * 50000]
+
+    def parse():
+        for line in parse_lines:
+            parse_line(line)
+
+    def parse_tags():
+        for line in parse_lines:
+            parse_line(line).tags
+
+    yield Case("irc.parsing", {"tags": False}, len(parse_lines), parse)
+    yield Case("irc.parsing", {"tags": True}, len(parse_lines), parse_tags)
+
+
+def make_event_class(depth: int) -> type:
+    """
+    Make an event class `depth` levels below `Event`, so each event has `depth + 1` identifiers to look up.
+    """
+
+    from ultros.core.events.definitions.general import Event
+
+    cls = Event
+
+    for level in range(depth):
+        cls = type("BenchEvent{}".format(level), (cls,), {})
+
+    return cls
+
+
+def bench_events(args) -> Iterable[Case]:
+    from ultros.core.events.definitions.general import Event
+    from ultros.core.events.manager import EventManager
+
+    count = args.scale * 10000
+
+    for handlers in (1, 10, 100):
+        for depth in (1, 5):
+            manager = EventManager(None)
+            cls = make_event_class(depth)
+
+            # Spread the handlers over every level, so every identifier lookup finds some
+            levels = [Event] + list(cls.__mro__[:depth])
+
+            for index in range(handlers):
+                manager.add_handler(None, levels[index % len(levels)], lambda event: None)
+
+            events = [cls() for _ in range(count)]
+
+            async def fire(manager=manager, events=events):
+                for event in events:
+                    await manager.fire_event(event)
+
+            yield Case(
+                "events.fire_event", {"handlers": handlers, "depth": depth}, count, run_coroutine(fire)
+            )
+
+
+def bench_rules(args) -> Iterable[Case]:
+    from ultros.core.rules import predicates, transformers
+    from ultros.core.rules.engine import RulesEngine
+
+    count = args.scale * 2000
+
+    for rules in (1, 10, 100, 1000):
+        engine = RulesEngine()
+
+        # Every rule matches, so the whole set is run each time
+        for index in range(rules - 1):
+            engine.add_rule("bench", predicates.num_less_than, index + 1000000, transformers.trans_continue)
+
+        engine.add_rule("bench", predicates.num_less_than, 1000000, transformers.factory_trans_return(True))
+
+        async def run(engine=engine):
+            for value in range(count):
+                await engine.run("bench", value)
+
+        yield Case("rules.run", {"rules": rules}, count, run_coroutine(run))
+
+
+STORAGE_FORMATS = ("ini", "json", "toml", "yml")
+
+
+def make_data(entries: int) -> Dict[str, Dict[str, str]]:
+    """
+    Make data that every format can store - INI only has sections of strings.
+    """
+
+    return {
+        "section{}".format(index): {"name": "user{}".format(index), "value": str(index), "enabled": "true"}
+        for index in range(entries)
+    }
+
+
+def bench_storage(args) -> Iterable[Case]:
+    from ultros.core.storage.manager import StorageManager
+
+    directory = tempfile.mkdtemp()
+    manager = StorageManager(None, directory, directory)
+
+    for fmt in STORAGE_FORMATS:
+        for entries in (10, 100, 1000):
+            path = "bench-{}.{}".format(entries, fmt)
+
+            try:
+                obj = manager.get_data(path)
+            except ImportError as e:
+                yield Skipped("storage.{}".format(fmt), str(e))
+                break
+
+            data = make_data(entries)
+
+            if fmt == "ini":
+                obj.data = ConfigParser()
+                obj.data.read_dict(data)
+            else:
+                obj.data = data
+
+            # Make sure there's a file to load
+            obj.save()
+            repeats = max(1, args.scale * 1000 // entries)
+
+            def load(obj=obj, repeats=repeats):
+                for _ in range(repeats):
+                    obj.load()
+
+            def save(obj=obj, repeats=repeats):
+                for _ in range(repeats):
+                    obj.save()
+
+            yield Case("storage.{}.load".format(fmt), {"entries": entries}, repeats, load)
+            yield Case("storage.{}.save".format(fmt), {"entries": entries}, repeats, save)
+
+    manager.shutdown()
+    shutil.rmtree(directory)
+
+
+BENCHMARKS = [bench_irc, bench_events, bench_rules, bench_storage]
+
+# endregion
+
+
+def run_coroutine(func: Callable) -> Callable:
+    """
+    Wrap a coroutine function so it can be timed like any other function, on a new event loop each time.
+    """
+
+    def run():
+        loop = asyncio.new_event_loop()
+
+        try:
+            loop.run_until_complete(func())
+        finally:
+            loop.close()
+
+    return run
+
+
+def measure(case: Case, repeat: int) -> Dict[str, object]:
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case.func()
+        times.append((time.perf_counter() - start) / case.ops)
+
+    best = min(times)
+
+    return {
+        "name": case.name,
+        "params": case.params,
+        "ops": case.ops,
+        "best": best,
+        "median": statistics.median(times),
+        "ops_per_second": 1 / best if best else None
+    }
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL
+        ).decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args) -> Dict[str, object]:
+    results = {}
+    skipped = {}
+
+    for bench in BENCHMARKS:
+        for case in bench(args):
+            key = case.name if isinstance(case, Skipped) else case_key(case.name, case.params)
+
+            if args.filter and not any(item in key for item in args.filter):
+                continue
+
+            if isinstance(case, Skipped):
+                skipped[key] = case.reason
+                print("{:50} skipped: {}".format(key, case.reason))
+                continue
+
+            result = results[key] = measure(case, args.repeat)
+
+            print("{:50} {:14,.0f} ops/s  ({:.3f}us/op, median {:.3f}us/op)".format(
+                key, result["ops_per_second"] or 0, result["best"] * 1000000, result["median"] * 1000000
+            ))
+
+    return {
+        "meta": {
+            "commit": get_commit(),
+            "date": datetime.datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "scale": args.scale
+        },
+        "results": results,
+        "skipped": skipped
+    }
+
+
+def compare(old: Dict[str, object], new: Dict[str, object], threshold: float) -> List[str]:
+    """
+    Compare two sets of results, printing the change in each benchmark.
+
+    :return: The keys of the benchmarks that got slower by more than `threshold` (eg 0.1 for 10%)
+    """
+
+    regressions = []
+
+    print()
+    print("Compared with {} ({}):".format(old["meta"].get("commit") or "unknown commit", old["meta"].get("date")))
+
+    for key, result in new["results"].items():
+        previous = old["results"].get(key)
+
+        if previous is None:
+            print("    {:50} new".format(key))
+            continue
+
+        change = result["best"] / previous["best"] - 1
+        flag = ""
+
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+
+        print("    {:50} {:+7.1%}{}".format(key, change, flag))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.suite")
+
+    parser.add_argument("--repeat", help="number of runs to take the best and median of", type=int, default=5)
+    parser.add_argument("--scale", help="multiply the amount of work in each run by this", type=int, default=1)
+    parser.add_argument(
+        "--filter", help="only run benchmarks whose key contains this; may be given more than once", action="append"
+    )
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="compare the results with a JSON file saved earlier")
+    parser.add_argument(
+        "--threshold", help="how much slower counts as a regression, eg 0.1 for 10%%", type=float, default=0.1
+    )
+
+    args = parser.parse_args()
+
+    results = run_suite(args)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, "r") as fh:
+            old = json.load(fh)
+
+        regressions = compare(old, results, args.threshold)
+
+        if regressions:
+            print()
+            print("{} regressions over {:.0%}".format(len(regressions), args.threshold))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
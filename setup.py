@@ -62,7 +62,7 @@ setup(
     install_requires=open(
         "requirements.txt"
     ).read().replace("\r", "").split("\n"),
-    extras_require={"uvloop": "uvloop"},
+    extras_require={"uvloop": "uvloop", "numpy": "numpy"},
     namespace_packages=["ultros", "ultros.networks", "ultros.plugins"],
     data_files=[("", ["config.zip"])]
 )
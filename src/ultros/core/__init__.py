@@ -14,10 +14,15 @@ Modules
     :toctree: api
 
     events
+    metrics
     networks
     plugins
+    profiling
+    registry
     rules
     storage
+    supervisor
+    watchdog
     main
 """
 
@@ -3,9 +3,10 @@ import argparse
 import logging
 import os
 import shutil
+import sys
 import zipfile
 
-from ultros.core.main import Ultros
+from ultros.core.profiling import StartupProfiler
 
 """
 Ultros - Module runnable
@@ -24,11 +25,44 @@ def start(arguments):
     config_dir = os.environ.get("ULTROS_CONFIG_DIR", arguments.config)
     data_dir = os.environ.get("ULTROS_DATA_DIR", arguments.data)
 
-    u = Ultros(config_dir, data_dir)
+    profiler = StartupProfiler(enabled=arguments.profile_startup)
+
+    # Imported here so that the import is profiled too, and so other commands don't pay for it
+    with profiler.phase("Import"):
+        from ultros.core.main import Ultros
+
+    u = Ultros(config_dir, data_dir, profiler=profiler)
     u.setup()
     u.run()
 
 
+def supervise(arguments):
+    logging.basicConfig(  # TODO: Proper logging
+        format="%(asctime)s | %(levelname)-8s | %(processName)-10s | %(name)-10s | %(message)s",
+        level=logging.DEBUG if arguments.debug else logging.INFO
+    )
+
+    from ultros.core.storage.manager import StorageManager
+    from ultros.core.supervisor import Supervisor
+
+    config_dir = os.environ.get("ULTROS_CONFIG_DIR", arguments.config)
+    data_dir = os.environ.get("ULTROS_DATA_DIR", arguments.data)
+
+    storage = StorageManager(None, config_dir, data_dir)
+    settings = storage.get_config("settings.yml", defaults_path=False)
+
+    networks = list(settings["networks"] or [])
+    options = dict(settings.get("supervisor") or {})
+
+    if arguments.workers:
+        options["workers"] = arguments.workers
+
+    storage.shutdown()
+
+    supervisor = Supervisor(config_dir, data_dir, networks, **options)
+    sys.exit(supervisor.run())
+
+
 def get_bool(prompt: str, arguments, *, default=True):
     if hasattr(arguments, "force") and arguments.force:
         return default
@@ -115,8 +149,26 @@ if __name__ == "__main__":
     parser_init.set_defaults(func=init)
 
     parser_start = subparsers.add_parser("start", help="Start Ultros")
+
+    parser_start.add_argument(
+        "--profile-startup", help="Log how long each phase of startup took, and how many modules it imported",
+        action="store_true"
+    )
+
     parser_start.set_defaults(func=start)
 
+    parser_supervise = subparsers.add_parser(
+        "supervise", help="Start Ultros, spreading the networks across several worker processes"
+    )
+
+    parser_supervise.add_argument(
+        "--workers", help="how many worker processes to start - defaults to one per CPU core, or the supervisor "
+                          "setting in settings.yml",
+        type=int
+    )
+
+    parser_supervise.set_defaults(func=supervise)
+
     args = parser.parse_args()
 
     if hasattr(args, "func"):
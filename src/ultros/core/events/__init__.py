@@ -16,6 +16,8 @@ Submodules
     definitions
     constants
     manager
+    serialization
+    transports
 """
 
 __author__ = "Gareth Coles"
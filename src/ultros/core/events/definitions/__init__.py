@@ -13,6 +13,7 @@ Submodules
 
     general
     meta
+    remote
 """
 
 __author__ = "Gareth Coles"
@@ -0,0 +1,55 @@
+# coding=utf-8
+
+"""
+Events that were fired by another Ultros instance
+"""
+
+from typing import Any, Dict, List
+
+from ultros.core.events.definitions.general import Event
+
+__author__ = "Gareth Coles"
+
+REMOTE_PREFIX = "remote:"
+
+
+def remote_identifier(identifier) -> str:
+    """
+    Get the identifier to listen for, to receive events that were fired by other Ultros instances.
+
+    >>> event_manager.add_handler(self, remote_identifier(IRCBatchEvent), handler)
+
+    :param identifier: An identifier or event class
+    """
+
+    if not isinstance(identifier, str):
+        identifier = identifier.identifier
+
+    return REMOTE_PREFIX + identifier
+
+
+class RemoteEvent(Event):
+    """
+    An event that was fired by another Ultros instance, and forwarded to this one by an event transport.
+
+    Only the original event's public attributes that could be serialized make it across - see
+    `ultros.core.events.serialization` - and they're in `data`, rather than being attributes of this event.
+
+    Remote events match their own identifier, and the original event's identifiers with `remote:` in front of them,
+    so handlers for local events don't receive remote ones by accident. Use `remote_identifier()` to listen for them.
+
+    :ivar origin: The name of the Ultros instance that fired the original event
+    :ivar remote_identifier: The original event's identifier
+    :ivar remote_identifiers: The original event's identifiers
+    :ivar data: The original event's attributes
+    """
+
+    def __init__(self, origin: str, identifier: str, identifiers: List[str], data: Dict[str, Any]):
+        super().__init__()
+
+        self.origin = origin
+        self.remote_identifier = identifier
+        self.remote_identifiers = identifiers
+        self.data = data
+
+        self.identifiers = RemoteEvent.identifiers + [REMOTE_PREFIX + x for x in identifiers]
@@ -4,14 +4,19 @@
 The event manager
 """
 
+import logging
+
 from asyncio.coroutines import iscoroutinefunction, _CoroutineABC
 
 from operator import itemgetter
-from typing import Callable, Union, Optional
+from time import perf_counter
+from typing import Callable, Iterable, Union, Optional
 
 from ultros.core import main as u
+from ultros.core import metrics as m
 from ultros.core.events.constants import EventPriority
 from ultros.core.events.definitions.general import Event
+from ultros.core.events.transports import base as base_transport
 
 __author__ = "Gareth Coles"
 
@@ -42,7 +47,17 @@ class EventManager:
 
     ultros = None
 
+    #: Optional[BaseTransport]: Forwards events to other Ultros instances, if configured
+    transport = None
+
+    #: Optional[Counter]: Events fired, by identifier - only set if metrics are enabled
+    events_fired = None
+    #: Optional[Histogram]: Time spent running handlers, by event identifier - only set if metrics are enabled
+    handler_time = None
+
     def __init__(self, ultros: "u.Ultros"):
+        self.log = logging.getLogger(__name__)  # TODO: Proper logging
+
         self.ultros = ultros
         self.registered = {}
 
@@ -53,9 +68,70 @@ class EventManager:
         Clears all event handlers and deletes the instance-level reference to the parent Ultros object.
         """
 
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
         self.registered.clear()
         self.ultros = None
 
+    def register_metrics(self, metrics: "m.Metrics"):
+        """
+        Start reporting how many events are fired and how long their handlers take, along with the event
+        transport's stats.
+        """
+
+        self.events_fired = metrics.counter(
+            "ultros_events_fired_total", "Events fired, by identifier", ["event"]
+        )
+        self.handler_time = metrics.histogram(
+            "ultros_event_handler_seconds", "Time spent running the handlers for each event fired", ["event"]
+        )
+
+        metrics.add_collector(self.collect_transport_metrics)
+
+    def collect_transport_metrics(self) -> Iterable["m.Metric"]:
+        transport = self.transport
+
+        if transport is None:
+            return
+
+        for key, value in transport.stats().items():
+            if key == "pending":
+                metric = m.Gauge("ultros_event_transport_pending", "Events waiting to be sent to other instances")
+            else:
+                metric = m.Counter(
+                    "ultros_event_transport_{}_total".format(key), "Event transport: {}".format(key.replace("_", " "))
+                )
+
+            metric.labels().set(value)
+            yield metric
+
+    def load_transport(self, config: Optional[dict]) -> Optional["base_transport.BaseTransport"]:
+        """
+        Set up an event transport, to forward events to other Ultros instances. It still needs to be started, with
+        `await manager.transport.start()`.
+
+        :param config: The `event_transport` section of `settings.yml` - the transport's `type`, and keyword
+                       arguments for it. If this is empty or has no type, no transport is set up.
+        :return: The transport, or None if there isn't one
+        """
+
+        config = dict(config or {})
+        transport_type = config.pop("type", None)
+
+        if not transport_type:
+            return None
+
+        transport_cls = base_transport.transport_registry.get(transport_type)
+
+        if transport_cls is None:
+            self.log.error("Unknown event transport type: %s", transport_type)
+            return None
+
+        self.transport = transport_cls(self, **config)
+        return self.transport
+
     def _get_identifier(self, identifier: Union[str, Event]):
         if isinstance(identifier, str):
             return identifier
@@ -207,10 +283,34 @@ class EventManager:
         event you passed in is returned in case you need to do any advanced
         coroutine processing.
 
+        If an event transport is set up and the event matches one of the
+        identifiers it forwards, the event is also sent to other Ultros
+        instances.
+
+        If metrics are enabled, the event is counted, and the time taken by
+        its handlers is recorded.
+
         :param event: The event object to be fired.
         :return: The event object you passed in.
         """
 
+        transport = self.transport
+
+        if transport is not None and transport.should_forward(event):
+            transport.send(event)
+
+        if self.events_fired is None:
+            return await self._call_handlers(event)
+
+        self.events_fired.labels(event.identifier).inc()
+        start = perf_counter()
+
+        try:
+            return await self._call_handlers(event)
+        finally:
+            self.handler_time.labels(event.identifier).observe(perf_counter() - start)
+
+    async def _call_handlers(self, event: Event) -> Event:
         for identifier in event.identifiers:
             handlers = self.registered.get(identifier, [])
             for handler in handlers:
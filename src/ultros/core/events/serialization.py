@@ -0,0 +1,323 @@
+# coding=utf-8
+
+"""
+Compact binary serialization of events, for sending them between Ultros instances.
+
+Values are written as a one-byte type tag followed by the value. Integers and lengths are varints, so small numbers
+take a single byte. Each string is written in full only the first time it appears in a batch - after that, it's
+written as an index into the strings seen so far. Batches of similar events are mostly the same identifiers and
+keys repeated, so they shrink a lot.
+
+Only these types can be serialized: None, bool, int, float, str, bytes, and lists, tuples and dicts of them.
+Tuples come back as lists.
+
+An event is serialized as its type, and its public attributes. Attributes of any other type are left out - for
+example, the connector a `NetworkEvent` came from. The type (the event's identifier and its list of identifiers) is
+written once per batch, and referred to by index after that.
+"""
+
+import struct
+
+from typing import Any, Dict, List, Tuple
+
+from ultros.core.events.definitions.general import Event
+
+__author__ = "Gareth Coles"
+
+NONE = 0x00
+TRUE = 0x01
+FALSE = 0x02
+INT = 0x03  #: Zigzag-encoded varint
+FLOAT = 0x04  #: 8-byte double
+STR = 0x05  #: Varint length, then UTF-8 - and remembered, for STR_REF
+STR_REF = 0x06  #: Varint index of a string already in the batch
+BYTES = 0x07  #: Varint length, then the bytes
+LIST = 0x08  #: Varint count, then the items
+DICT = 0x09  #: Varint count, then the keys and values
+
+SIMPLE_TYPES = frozenset((type(None), bool, int, float, str, bytes, bytearray))
+
+_simple_types = tuple(SIMPLE_TYPES)  # For subclasses, eg enums
+
+_double = struct.Struct("!d")
+
+
+class SerializationError(Exception):
+    """
+    Raised when data can't be serialized or deserialized.
+    """
+
+
+class Encoder:
+    """
+    Serializes values into a buffer. Strings are only written in full once per encoder, so use one encoder for
+    everything in a batch.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.strings = {}  #: Dict[str, int]: String -> index
+
+    def write_varint(self, value: int):
+        buffer = self.buffer
+
+        while value > 0x7F:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+
+        buffer.append(value)
+
+    def write(self, value: Any):
+        buffer = self.buffer
+
+        # Checked in order of how common they are in events
+        if isinstance(value, str):
+            index = self.strings.get(value)
+
+            if index is not None:
+                buffer.append(STR_REF)
+
+                if index < 0x80:
+                    buffer.append(index)
+                else:
+                    self.write_varint(index)
+            else:
+                self.strings[value] = len(self.strings)
+                data = value.encode("UTF-8")
+
+                buffer.append(STR)
+                self.write_varint(len(data))
+                buffer += data
+        elif value is None:
+            buffer.append(NONE)
+        elif value is True:
+            buffer.append(TRUE)
+        elif value is False:
+            buffer.append(FALSE)
+        elif isinstance(value, int):
+            buffer.append(INT)
+            self.write_varint(value << 1 if value >= 0 else (-value << 1) - 1)
+        elif isinstance(value, float):
+            buffer.append(FLOAT)
+            buffer += _double.pack(value)
+        elif isinstance(value, (list, tuple)):
+            buffer.append(LIST)
+            self.write_varint(len(value))
+
+            for item in value:
+                self.write(item)
+        elif isinstance(value, dict):
+            buffer.append(DICT)
+            self.write_varint(len(value))
+
+            for key, item in value.items():
+                self.write(key)
+                self.write(item)
+        elif isinstance(value, (bytes, bytearray)):
+            buffer.append(BYTES)
+            self.write_varint(len(value))
+            buffer += value
+        else:
+            raise SerializationError("Can't serialize {!r}".format(type(value)))
+
+
+class Decoder:
+    """
+    Deserializes values written by an `Encoder`.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+        self.strings = []  #: List[str]: Strings seen so far, by index
+
+    def read_varint(self) -> int:
+        data = self.data
+        result = 0
+        shift = 0
+
+        try:
+            while True:
+                byte = data[self.offset]
+                self.offset += 1
+
+                result |= (byte & 0x7F) << shift
+
+                if byte < 0x80:
+                    return result
+
+                shift += 7
+        except IndexError:
+            raise SerializationError("Data ended unexpectedly") from None
+
+    def read_bytes(self) -> bytes:
+        length = self.read_varint()
+        end = self.offset + length
+
+        if end > len(self.data):
+            raise SerializationError("Data ended unexpectedly")
+
+        value = self.data[self.offset:end].tobytes()
+        self.offset = end
+
+        return value
+
+    def read(self) -> Any:
+        try:
+            tag = self.data[self.offset]
+        except IndexError:
+            raise SerializationError("Data ended unexpectedly") from None
+
+        self.offset += 1
+
+        if tag == STR:
+            value = self.read_bytes().decode("UTF-8")
+            self.strings.append(value)
+            return value
+        elif tag == STR_REF:
+            try:
+                return self.strings[self.read_varint()]
+            except IndexError:
+                raise SerializationError("Unknown string reference") from None
+        elif tag == NONE:
+            return None
+        elif tag == TRUE:
+            return True
+        elif tag == FALSE:
+            return False
+        elif tag == INT:
+            value = self.read_varint()
+            return value >> 1 if not value & 1 else -((value + 1) >> 1)
+        elif tag == FLOAT:
+            if self.offset + 8 > len(self.data):
+                raise SerializationError("Data ended unexpectedly")
+
+            value = _double.unpack_from(self.data, self.offset)[0]
+            self.offset += 8
+            return value
+        elif tag == LIST:
+            return [self.read() for _ in range(self.read_varint())]
+        elif tag == DICT:
+            count = self.read_varint()
+            value = {}
+
+            for _ in range(count):
+                key = self.read()
+                value[key] = self.read()
+
+            return value
+        elif tag == BYTES:
+            return self.read_bytes()
+
+        raise SerializationError("Unknown type tag: {}".format(tag))
+
+
+def is_serializable(value: Any) -> bool:
+    """
+    Check whether a value, and everything in it, can be serialized.
+    """
+
+    if type(value) in SIMPLE_TYPES or isinstance(value, _simple_types):
+        return True
+
+    if isinstance(value, (list, tuple)):
+        return all(is_serializable(item) for item in value)
+
+    if isinstance(value, dict):
+        return all(is_serializable(key) and is_serializable(item) for key, item in value.items())
+
+    return False
+
+
+def get_event_data(event: Event) -> Dict[str, Any]:
+    """
+    Get the public attributes of an event that can be serialized.
+    """
+
+    return {
+        key: value for key, value in vars(event).items()
+        if not key.startswith("_") and is_serializable(value)
+    }
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Serialize a single value.
+    """
+
+    encoder = Encoder()
+    encoder.write(value)
+
+    return bytes(encoder.buffer)
+
+
+def loads(data: bytes) -> Any:
+    """
+    Deserialize a single value.
+    """
+
+    decoder = Decoder(data)
+    value = decoder.read()
+
+    if decoder.offset != len(decoder.data):
+        raise SerializationError("Unexpected data after the value")
+
+    return value
+
+
+def encode_batch(origin: str, events: List[Event]) -> bytes:
+    """
+    Serialize a batch of events fired by one Ultros instance.
+
+    :param origin: The name of the instance the events were fired by
+    """
+
+    encoder = Encoder()
+    types = {}  # Event class -> index
+
+    encoder.write(origin)
+    encoder.write_varint(len(events))
+
+    for event in events:
+        event_type = type(event)
+        index = types.get(event_type)
+
+        if index is None:
+            index = types[event_type] = len(types)
+
+            encoder.write_varint(index)
+            encoder.write(event.identifier)
+            encoder.write(event.identifiers)
+        else:
+            encoder.write_varint(index)
+
+        encoder.write(get_event_data(event))
+
+    return bytes(encoder.buffer)
+
+
+def decode_batch(data: bytes) -> Tuple[str, List[Tuple[str, List[str], Dict[str, Any]]]]:
+    """
+    Deserialize a batch of events.
+
+    :return: The name of the instance the events came from, and a list of (identifier, identifiers, data) tuples
+    """
+
+    decoder = Decoder(data)
+    types = []  # (identifier, identifiers) by index
+
+    origin = decoder.read()
+    events = []
+
+    for _ in range(decoder.read_varint()):
+        index = decoder.read_varint()
+
+        if index == len(types):
+            types.append((decoder.read(), decoder.read()))
+        elif index > len(types):
+            raise SerializationError("Unknown event type reference")
+
+        identifier, identifiers = types[index]
+        events.append((identifier, identifiers, decoder.read()))
+
+    return origin, events
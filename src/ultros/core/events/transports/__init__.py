@@ -0,0 +1,25 @@
+# coding=utf-8
+
+"""
+Event transports, which forward events between Ultros instances - for example, between the worker processes started
+by `ultros.core.supervisor`.
+
+Events with the identifiers listed in the `event_transport` section of `settings.yml` are serialized (see
+`ultros.core.events.serialization`), batched, and sent to every other instance, where they're fired as
+`RemoteEvent` objects.
+
+Transports are looked up by type in `transport_registry` - see `ultros.core.registry`.
+
+Submodules
+==========
+
+.. currentmodule:: ultros.core.events.transports
+
+.. autosummary::
+    :toctree: transports
+
+    base
+    unix
+"""
+
+__author__ = "Gareth Coles"
@@ -0,0 +1,204 @@
+# coding=utf-8
+
+"""
+Base class to be inherited by all event transports
+"""
+
+import asyncio
+import logging
+import os
+import socket
+
+from abc import ABCMeta, abstractmethod
+from operator import attrgetter
+from typing import Any, Dict, Iterable, Optional
+from weakref import ref
+
+from ultros.core.events import manager as event_manager
+from ultros.core.events.definitions.general import Event
+from ultros.core.events.definitions.remote import RemoteEvent
+from ultros.core.events.serialization import SerializationError, decode_batch, encode_batch
+from ultros.core.registry import Registry
+
+__author__ = "Gareth Coles"
+
+
+class BaseTransport(metaclass=ABCMeta):
+    """
+    Sends events to other Ultros instances, and fires the events they send as `RemoteEvent` objects.
+
+    Events are batched: everything fired during one iteration of the event loop (or within `batch_delay` seconds, if
+    that's set) is sent together, up to `max_batch` events at a time. Events are serialized when the batch is sent,
+    so they include any changes made by this instance's handlers.
+
+    Subclasses implement `start()`, `write()` and `close()`, and call `receive()` with each batch another instance
+    sent.
+
+    :param manager: The event manager to fire remote events with
+    :param name: The name of this Ultros instance, which must be unique - defaults to the host name and process ID
+    :param forward: Identifiers of the events to send to other instances
+    :param max_batch: The most events to send in one batch
+    :param batch_delay: How long to wait for more events before sending a batch, in seconds
+    """
+
+    type = "base"  #: str: The type of transport, eg "unix"
+
+    def __init__(self, manager: "event_manager.EventManager", name: Optional[str]=None, forward: Iterable[str]=(),
+                 max_batch: int=256, batch_delay: float=0.0):
+        self.log = logging.getLogger(__name__)  # TODO: Proper logging
+
+        self._manager = ref(manager)
+        self.name = name or "{}:{}".format(socket.gethostname(), os.getpid())
+        self.forward = set(forward)
+
+        self.max_batch = max_batch
+        self.batch_delay = batch_delay
+
+        self._pending = []  #: List[Event]: Events waiting to be sent
+        self._flush_handle = None  #: Optional[asyncio.Handle]
+        self._inbox = None  #: Optional[asyncio.Queue]: Received events waiting to be fired, in order
+        self._deliver_task = None  #: Optional[asyncio.Task]
+
+        self.events_sent = 0
+        self.events_received = 0
+        self.batches_sent = 0
+        self.batches_received = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    @property
+    def manager(self) -> "event_manager.EventManager":
+        return self._manager()
+
+    def should_forward(self, event: Event) -> bool:
+        """
+        Check whether an event should be sent to other instances. Remote events are never sent on again.
+        """
+
+        return not self.forward.isdisjoint(event.identifiers) and not isinstance(event, RemoteEvent)
+
+    def send(self, event: Event):
+        """
+        Queue an event to be sent to the other instances, in the next batch.
+        """
+
+        self._pending.append(event)
+
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._flush_handle is None:
+            loop = asyncio.get_event_loop()
+
+            if self.batch_delay:
+                self._flush_handle = loop.call_later(self.batch_delay, self.flush)
+            else:
+                self._flush_handle = loop.call_soon(self.flush)
+
+    def flush(self):
+        """
+        Send every queued event now.
+        """
+
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._pending:
+            return
+
+        events, self._pending = self._pending, []
+
+        try:
+            data = encode_batch(self.name, events)
+        except SerializationError:
+            self.log.exception("Failed to serialize a batch of %s events", len(events))
+            return
+
+        if self.write(data):
+            self.events_sent += len(events)
+            self.batches_sent += 1
+            self.bytes_sent += len(data)
+
+    def receive(self, data: bytes):
+        """
+        Handle a batch of events sent by another instance, firing them in the order they were sent.
+        """
+
+        try:
+            origin, events = decode_batch(data)
+        except (SerializationError, UnicodeDecodeError):
+            self.log.exception("Failed to deserialize a batch of events")
+            return
+
+        if origin == self.name:
+            return  # Our own batch, relayed back to us
+
+        self.events_received += len(events)
+        self.batches_received += 1
+        self.bytes_received += len(data)
+
+        if self._inbox is None:
+            self._inbox = asyncio.Queue()
+            self._deliver_task = asyncio.ensure_future(self._deliver())
+
+        for identifier, identifiers, event_data in events:
+            self._inbox.put_nowait(RemoteEvent(origin, identifier, identifiers, event_data))
+
+    async def _deliver(self):
+        while True:
+            event = await self._inbox.get()
+            manager = self.manager
+
+            if manager is None:
+                return
+
+            try:
+                await manager.fire_event(event)
+            except Exception:
+                self.log.exception("Error handling remote event: %s", event.remote_identifier)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get a dict of metrics describing how much has been sent and received.
+        """
+
+        return {
+            "events_sent": self.events_sent,
+            "events_received": self.events_received,
+            "batches_sent": self.batches_sent,
+            "batches_received": self.batches_received,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "pending": len(self._pending)
+        }
+
+    @abstractmethod
+    async def start(self):
+        """
+        Connect to the other instances.
+        """
+
+    @abstractmethod
+    def write(self, data: bytes) -> bool:
+        """
+        Send a serialized batch of events to every other instance.
+
+        :return: Whether the batch was sent
+        """
+
+    def close(self):
+        """
+        Send anything that's queued, then disconnect. Subclasses should call this before closing their connections.
+        """
+
+        self.flush()
+
+        if self._deliver_task is not None:
+            self._deliver_task.cancel()
+            self._deliver_task = None
+
+
+transport_registry = Registry(BaseTransport, attrgetter("type"), "ultros.core.events.transports.{}")
+"""
+Event transport classes, by type. Transports should register themselves with `@transport_registry.register()`.
+"""
@@ -0,0 +1,254 @@
+# coding=utf-8
+
+"""
+An event transport over a Unix domain socket.
+
+Every instance using the same socket path is connected through a hub. The first instance to start listens on the
+socket and becomes the hub, and the others connect to it. The hub passes each batch it receives on to every other
+instance. If the hub goes away, the others take over - the first to notice becomes the new hub.
+
+Batches are framed with a four-byte length prefix.
+"""
+
+import asyncio
+import errno
+import os
+import socket
+import struct
+
+from typing import Optional, Set
+
+from ultros.core.events import manager as event_manager
+from ultros.core.events.transports.base import BaseTransport, transport_registry
+
+__author__ = "Gareth Coles"
+
+MAX_FRAME_SIZE = 16 * 1024 * 1024  #: The largest batch we'll accept, in bytes
+MAX_BUFFER_SIZE = 16 * 1024 * 1024  #: How much may be waiting to be sent to another instance, in bytes, by default
+
+_length = struct.Struct("!I")
+
+
+@transport_registry.register()
+class UnixSocketTransport(BaseTransport):
+    """
+    Forwards events to other instances through a Unix domain socket. See the module documentation.
+
+    Batches sent while reconnecting are dropped, as are batches for an instance that isn't keeping up - once more
+    than `max_buffer_size` bytes are waiting to be sent to it. Both are counted in `batches_dropped`.
+
+    :param path: The path to the socket, which is shared by every instance
+    :param reconnect_delay: How long to wait before reconnecting after losing the connection to the hub, in seconds
+    :param max_buffer_size: How many bytes may be waiting to be sent to another instance before batches for it are
+                            dropped
+    """
+
+    type = "unix"
+
+    def __init__(self, manager: "event_manager.EventManager", path: str, *, reconnect_delay: float=1.0,
+                 max_buffer_size: int=MAX_BUFFER_SIZE, **kwargs):
+        super().__init__(manager, **kwargs)
+
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self.max_buffer_size = max_buffer_size
+
+        self.is_hub = False
+        self.closing = False
+        self.batches_dropped = 0
+
+        self._server = None  #: Optional[asyncio.AbstractServer]: Our server, if we're the hub
+        self._clients = set()  #: Set[asyncio.StreamWriter]: Connected instances, if we're the hub
+        self._writer = None  #: Optional[asyncio.StreamWriter]: Our connection to the hub, if we aren't it
+        self._reader_task = None  #: Optional[asyncio.Task]
+
+    async def start(self):
+        self.closing = False
+
+        while not self.closing:
+            if await self._connect():
+                return
+
+            if await self._serve():
+                return
+
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _connect(self) -> bool:
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+
+        self.is_hub = False
+        self._writer = writer
+        self._reader_task = asyncio.ensure_future(self._read_hub(reader))
+
+        self.log.info("Connected to the event hub at %s", self.path)
+        return True
+
+    async def _serve(self) -> bool:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            # Bind the socket ourselves - asyncio would remove an existing socket file, even if it's in use
+            sock.bind(self.path)
+        except OSError as e:
+            sock.close()
+
+            if e.errno != errno.EADDRINUSE:
+                raise
+
+            # Either another instance is becoming the hub right now, or the socket was left behind by one that
+            # died - give it a moment, and remove it if nobody's listening
+            await asyncio.sleep(0.1)
+
+            if not await self._connect():
+                self.log.debug("Removing stale event hub socket at %s", self.path)
+                os.unlink(self.path)
+                return await self._serve()
+
+            return True
+
+        self._server = await asyncio.start_unix_server(self._handle_client, sock=sock)
+        self.is_hub = True
+
+        self.log.info("Listening for other instances at %s", self.path)
+        return True
+
+    # region: Frames
+
+    @staticmethod
+    def make_frame(data: bytes) -> bytes:
+        return _length.pack(len(data)) + data
+
+    async def read_frame(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        """
+        Read a frame, returning its payload - or None if the connection has closed.
+        """
+
+        try:
+            length = _length.unpack(await reader.readexactly(4))[0]
+
+            if length > MAX_FRAME_SIZE:
+                self.log.error("Received a batch of %s bytes, which is too large; disconnecting", length)
+                return None
+
+            return await reader.readexactly(length)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+
+    def send_frame(self, writer: asyncio.StreamWriter, frame: bytes) -> bool:
+        """
+        Send a frame to another instance, unless too much is already waiting to be sent to it.
+
+        :return: False if the frame was dropped
+        """
+
+        if writer.transport.get_write_buffer_size() > self.max_buffer_size:
+            self.batches_dropped += 1
+            self.log.debug("Dropped a batch for an instance that isn't keeping up")
+            return False
+
+        writer.write(frame)
+        return True
+
+    # endregion
+
+    # region: Hub
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._clients.add(writer)
+
+        try:
+            while True:
+                data = await self.read_frame(reader)
+
+                if data is None:
+                    break
+
+                frame = self.make_frame(data)
+
+                for client in self._clients:
+                    if client is not writer:
+                        self.send_frame(client, frame)
+
+                self.receive(data)
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    # endregion
+
+    # region: Connection to the hub
+
+    async def _read_hub(self, reader: asyncio.StreamReader):
+        while True:
+            data = await self.read_frame(reader)
+
+            if data is None:
+                break
+
+            self.receive(data)
+
+        self._writer.close()
+        self._writer = None
+
+        if not self.closing:
+            self.log.warning("Lost connection to the event hub; reconnecting")
+
+            await asyncio.sleep(self.reconnect_delay)
+            await self.start()
+
+    # endregion
+
+    def write(self, data: bytes) -> bool:
+        frame = self.make_frame(data)
+
+        if self.is_hub:
+            for client in self._clients:
+                self.send_frame(client, frame)
+
+            return True
+
+        if self._writer is None:
+            self.batches_dropped += 1
+            return False
+
+        return self.send_frame(self._writer, frame)
+
+    def close(self):
+        super().close()
+        self.closing = True
+
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        for client in list(self._clients):
+            client.close()
+
+        self._clients.clear()
+
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+        self.is_hub = False
+
+    @property
+    def clients(self) -> Set[asyncio.StreamWriter]:
+        """
+        The connections to other instances, if this instance is the hub.
+        """
+
+        return set(self._clients)
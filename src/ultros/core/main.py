@@ -17,15 +17,23 @@ import logging
 import os
 import signal
 
-from typing import Optional
+from time import perf_counter
+from typing import Iterable, Optional
 
 from ultros.core.events import manager as event_manager
+from ultros.core.metrics import Metrics, MetricsServer
 from ultros.core.networks import manager as network_manager
 from ultros.core.plugins import manager as plugin_manager
+from ultros.core.profiling import StartupProfiler
 from ultros.core.storage import manager as storage_manager
+from ultros.core.watchdog import LoopMonitor
 
 __author__ = "Gareth Coles"
 
+DEFAULT_SHUTDOWN_TIMEOUT = 10  #: How long to allow for draining on shutdown, in seconds, if not configured
+SIGBREAK_SHUTDOWN_TIMEOUT = 4  #: Windows kills us five seconds after SIGBREAK, so drain for less than that
+SHUTDOWN_GRACE_PERIOD = 5  #: How long saves that have started get to finish after draining times out, in seconds
+
 
 class Ultros:
     """
@@ -37,6 +45,11 @@ class Ultros:
                        preferring `uvloop` if installed. If you don't want to use uvloop, pass in a loop yourself.
     :param handle_signals: If you don't want SIGTERM, SIGINT and SIGBREAK handled automatically (eg, you have more
                            than one Ultros instance), then set this to False.
+    :param network_names: Optionally, the names of the networks this instance is responsible for. Omit this to
+                          load every network listed in `settings.yml`.
+    :param profiler: Optionally, a profiler to time startup with, if you've already started one - for example, to
+                     include the time taken to import Ultros. Startup is always timed, but the report is only logged
+                     if the profiler is enabled.
     """
 
     event_manager = None
@@ -44,14 +57,23 @@ class Ultros:
     plugin_manager = None
     storage_manager = None
 
+    config = None
+    loop_monitor = None
+    metrics_server = None
+
     def __init__(self, config_dir: str, data_dir: str, event_loop: Optional[asyncio.BaseEventLoop]=None,
-                 handle_signals: bool=True):
+                 handle_signals: bool=True, network_names: Optional[Iterable[str]]=None,
+                 profiler: Optional[StartupProfiler]=None):
         self.do_stop = False
+        self.stopping = False
         self.config_dir = config_dir
         self.data_dir = data_dir
+        self.network_names = set(network_names) if network_names is not None else None
 
         # TODO: Proper logging
         self.log = logging.getLogger(__name__)
+        self.profiler = profiler or StartupProfiler()
+        self.metrics = Metrics()  #: Metrics: Runtime metrics, which the managers report into if enabled
 
         if not event_loop:
             try:
@@ -71,15 +93,22 @@ class Ultros:
         self.log.info("Data dir: %s", os.path.abspath(self.data_dir))
 
         # Load order is important
-        self.storage_manager = storage_manager.StorageManager(
-            self, self.config_dir, self.data_dir
-        )
+        with self.profiler.phase("Storage manager"):
+            self.storage_manager = storage_manager.StorageManager(
+                self, self.config_dir, self.data_dir
+            )
+
+        with self.profiler.phase("Event manager"):
+            self.event_manager = event_manager.EventManager(self)
+
+        with self.profiler.phase("Plugin manager"):
+            self.plugin_manager = plugin_manager.PluginManager(self)
 
-        self.event_manager = event_manager.EventManager(self)
-        self.plugin_manager = plugin_manager.PluginManager(self)
-        self.network_manager = network_manager.NetworkManager(self)
+        with self.profiler.phase("Network manager"):
+            self.network_manager = network_manager.NetworkManager(self)
 
-        self.config = self.storage_manager.get_config("settings.yml", defaults_path=False)
+        with self.profiler.phase("Settings"):
+            self.config = self.storage_manager.get_config("settings.yml", defaults_path=False)
 
         if handle_signals:
             signal.signal(signal.SIGINT, self._sigint)
@@ -114,25 +143,83 @@ class Ultros:
         """
 
         self.log.debug("SIGBREAK caught.")
-        asyncio.run_coroutine_threadsafe(self.shutdown(), self.event_loop)
+        asyncio.run_coroutine_threadsafe(self.shutdown(SIGBREAK_SHUTDOWN_TIMEOUT), self.event_loop)
 
-    async def shutdown(self):
+    async def shutdown(self, timeout: Optional[float]=None):
         """
-        Gracefully shut down this Ultros instance.
+        Gracefully shut down this Ultros instance, within a deadline.
+
+        First, everything is drained at once: the networks stop reading, send the lines they have queued and QUIT,
+        while data files that have changed are saved. Networks that haven't finished by the deadline are cut short,
+        but their connections are still closed. Saves that have already started get `SHUTDOWN_GRACE_PERIOD` more
+        seconds to finish, so files aren't left half-written; any files still unsaved after that are logged.
+
+        Then, in order, this unloads the plugin manager, event manager and storage manager, and stops the event
+        loop if instructed to earlier (eg by calling `.run()`).
 
-        In order, this unloads the network manager, plugin manager, event manager and storage manager,
-        and then stops the event loop if instructed to earlier (eg by calling `.run()`).
+        Calling this again while already shutting down does nothing.
+
+        :param timeout: How long to allow for draining, in seconds - defaults to the `shutdown_timeout` setting
         """
 
+        if self.stopping:
+            return
+
+        self.stopping = True
         self.log.info("Shutting down...")
 
+        if timeout is None:
+            timeout = DEFAULT_SHUTDOWN_TIMEOUT
+
+            if self.config is not None:
+                timeout = self.config.get("shutdown_timeout", DEFAULT_SHUTDOWN_TIMEOUT)
+
+        drain = None
+        flush = None
+
         if self.network_manager:
-            try:
-                self.network_manager.shutdown()
-            except Exception as e:
-                print(e)  # TODO: Logging
+            drain = asyncio.ensure_future(self.network_manager.shutdown())
+
+        if self.storage_manager:
+            flush = asyncio.ensure_future(self.storage_manager.flush())
+
+        tasks = [task for task in (drain, flush) if task is not None]
+
+        if tasks:
+            start = perf_counter()
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+
+            if drain in pending:
+                self.log.warning("Networks didn't finish draining within %ss; disconnecting anyway", timeout)
+                drain.cancel()
+
+            if pending:
+                _, pending = await asyncio.wait(pending, timeout=SHUTDOWN_GRACE_PERIOD)
+
+            if flush in pending:
+                self.log.error(
+                    "Data files weren't saved within %ss: %s", timeout + SHUTDOWN_GRACE_PERIOD,
+                    ", ".join(self.storage_manager.unsaved_files())
+                )
+
+            for task in pending:
+                task.cancel()
+
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception() is not None:
+                    self.log.error("Error while shutting down: %s", task.exception())  # TODO: Logging
+
+            self.log.debug("Drained in %.2fs", perf_counter() - start)
+
+        self.network_manager = None
+
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            self.metrics_server = None
 
-            self.network_manager = None
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop()
+            self.loop_monitor = None
 
         if self.plugin_manager:
             try:
@@ -160,7 +247,6 @@ class Ultros:
 
         if self.do_stop:
             self.event_loop.stop()
-            self.event_loop.close()
 
     def setup(self):
         """
@@ -169,8 +255,71 @@ class Ultros:
         This will parse configs, load plugins, and get networks connected. The managers however have already been
         instantiated.
         """
-        self.network_manager.load_networks()
-        asyncio.run_coroutine_threadsafe(self.network_manager.connect_all(), self.event_loop)
+
+        with self.profiler.phase("Metrics"):
+            self._setup_metrics()
+
+        self._setup_loop_monitor()
+
+        with self.profiler.phase("Event transport"):
+            self.event_manager.load_transport(self.config.get("event_transport"))
+
+        with self.profiler.phase("Load networks"):
+            self.network_manager.load_networks()
+
+        asyncio.run_coroutine_threadsafe(self._start(), self.event_loop)
+
+    def _setup_metrics(self):
+        config = dict(self.config.get("metrics") or {})
+
+        if not config.pop("enabled", False):
+            return
+
+        self.metrics.enabled = True
+
+        for manager in (self.storage_manager, self.event_manager, self.network_manager):
+            manager.register_metrics(self.metrics)
+
+        self.metrics_server = MetricsServer(self.metrics, **config)
+
+    def _setup_loop_monitor(self):
+        config = dict(self.config.get("loop_monitor") or {})
+
+        if not config.pop("enabled", False):
+            return
+
+        self.loop_monitor = LoopMonitor(self.event_loop, **config)
+
+        if self.metrics.enabled:
+            self.loop_monitor.register_metrics(self.metrics)
+
+    async def _start(self):
+        if self.loop_monitor is not None:
+            self.loop_monitor.start()
+
+        if self.metrics_server is not None:
+            try:
+                await self.metrics_server.start()
+            except Exception:
+                self.log.exception("Failed to start the metrics server")
+
+        if self.event_manager.transport is not None:
+            start = perf_counter()
+
+            try:
+                await self.event_manager.transport.start()
+            except Exception:
+                self.log.exception("Failed to start the event transport")
+
+            self.profiler.add_phase("Start event transport", perf_counter() - start)
+
+        start = perf_counter()
+
+        try:
+            await self.network_manager.connect_all()
+        finally:
+            self.profiler.add_phase("Connect networks", perf_counter() - start)
+            self.profiler.report()
 
     def run(self):
         """
@@ -183,4 +332,8 @@ class Ultros:
         """
 
         self.do_stop = True
-        self.event_loop.run_forever()
+
+        try:
+            self.event_loop.run_forever()
+        finally:
+            self.event_loop.close()
@@ -0,0 +1,463 @@
+# coding=utf-8
+
+"""
+Runtime metrics, served in Prometheus' text format.
+
+Every `Ultros` instance has a `Metrics` object, `ultros.metrics`. When the `metrics` section of `settings.yml` is
+enabled, each manager registers the metrics it reports into, and a `MetricsServer` serves them over HTTP - on a
+local TCP port, or a Unix socket - for Prometheus (or anything else that understands its format) to scrape.
+
+There are two ways to report a metric:
+
+* Instrument the code directly, with a `Counter`, `Gauge` or `Histogram`. Updating one of these is an attribute
+  lookup and an addition or two, so it's cheap enough for hot paths - dispatching lines, firing events and so on.
+
+  >>> fired = metrics.counter("ultros_events_fired_total", "Events fired", ["event"])
+  >>> fired.labels("irc-message").inc()
+
+* Add a collector - a function that's only called when the metrics are scraped, and returns metrics built from
+  numbers that are kept anyway, like the stats of an outbound queue. These cost nothing at all between scrapes.
+
+When metrics are disabled (the default), nothing registers any metrics, and the instrumented code only has to check
+that it has nothing to report into.
+"""
+
+import asyncio
+import logging
+import math
+import os
+
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+__author__ = "Gareth Coles"
+
+#: Histogram bucket upper bounds, in seconds - suitable for timing most things Ultros does
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"  #: The content type of the text format
+
+MAX_REQUEST_SIZE = 8192  #: The largest HTTP request head we'll read, in bytes
+REQUEST_TIMEOUT = 10  #: How long to wait for a scraper to send its request, in seconds
+
+
+def format_value(value: float) -> str:
+    """
+    Format a sample value for the text format.
+    """
+
+    if isinstance(value, int):
+        return str(value)
+
+    if math.isnan(value):
+        return "NaN"
+
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value))
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace("\"", "\\\"")
+
+
+def escape_documentation(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+# region: Metric types
+
+class CounterValue:
+    """
+    A single counter, with one set of label values. Counters only go up.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float=1):
+        self.value += amount
+
+    def set(self, value: float):
+        """
+        Set the total directly - for collectors reporting a count that's kept elsewhere.
+        """
+
+        self.value = value
+
+
+class GaugeValue:
+    """
+    A single gauge, with one set of label values. Gauges may go up and down.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float=1):
+        self.value += amount
+
+    def dec(self, amount: float=1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class HistogramValue:
+    """
+    A single histogram, with one set of label values. Values are counted into buckets by their upper bound.
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  #: List[int]: Per bucket, not cumulative - the last is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        """
+        A context manager that observes how long everything inside it took, in seconds.
+        """
+
+        start = perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start)
+
+
+class Metric:
+    """
+    A named metric, with a value for each combination of label values.
+
+    :param name: The name of the metric, eg "ultros_events_fired_total"
+    :param documentation: A description of the metric
+    :param labels: The names of the metric's labels, if any
+    """
+
+    type = "untyped"  #: str: The type of metric, as written in the text format
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+        self.values = {}  #: Dict[Tuple[str, ...], object]: Label values -> value
+
+    def labels(self, *values: str):
+        """
+        Get the value for a combination of label values, creating it if needed. Metrics without labels have a
+        single value, which you can get with `labels()`.
+        """
+
+        try:
+            return self.values[values]
+        except KeyError:
+            if len(values) != len(self.label_names):
+                raise ValueError("{} takes {} label values, not {}".format(
+                    self.name, len(self.label_names), len(values)
+                ))
+
+            value = self.values[values] = self.create_value()
+            return value
+
+    def remove(self, *values: str):
+        """
+        Remove the value for a combination of label values - for example, when the connector it was about has gone.
+        """
+
+        self.values.pop(values, None)
+
+    def create_value(self):
+        raise NotImplementedError()
+
+    def format_labels(self, values: Tuple[str, ...], extra: str="") -> str:
+        labels = ",".join(
+            "{}=\"{}\"".format(name, escape_label_value(str(value))) for name, value in zip(self.label_names, values)
+        )
+
+        if extra:
+            labels = "{},{}".format(labels, extra) if labels else extra
+
+        return "{{{}}}".format(labels) if labels else ""
+
+    def render(self) -> List[str]:
+        """
+        Render the metric in the text format, as a list of lines.
+        """
+
+        lines = [
+            "# HELP {} {}".format(self.name, escape_documentation(self.documentation)),
+            "# TYPE {} {}".format(self.name, self.type)
+        ]
+
+        for values, value in self.values.items():
+            lines.extend(self.render_value(values, value))
+
+        return lines
+
+    def render_value(self, values: Tuple[str, ...], value) -> List[str]:
+        return ["{}{} {}".format(self.name, self.format_labels(values), format_value(value.value))]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def create_value(self) -> CounterValue:
+        return CounterValue()
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def create_value(self) -> GaugeValue:
+        return GaugeValue()
+
+
+class Histogram(Metric):
+    """
+    :param buckets: The upper bounds of the buckets, in increasing order. A +Inf bucket is always added.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]=(),
+                 buckets: Sequence[float]=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+
+        self.buckets = tuple(sorted(buckets))
+
+    def create_value(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def render_value(self, values: Tuple[str, ...], value: HistogramValue) -> List[str]:
+        lines = []
+        total = 0
+
+        for bound, count in zip(self.buckets + (math.inf,), value.counts):
+            total += count
+
+            lines.append("{}_bucket{} {}".format(
+                self.name, self.format_labels(values, "le=\"{}\"".format(format_value(float(bound)))), total
+            ))
+
+        labels = self.format_labels(values)
+
+        lines.append("{}_sum{} {}".format(self.name, labels, format_value(value.sum)))
+        lines.append("{}_count{} {}".format(self.name, labels, value.count))
+
+        return lines
+
+# endregion
+
+
+class Metrics:
+    """
+    A registry of metrics, and the collectors that produce more of them when scraped.
+
+    :ivar enabled: Whether metrics are being collected at all. Code that reports metrics without registering them
+                   up front should check this first.
+    """
+
+    def __init__(self, enabled: bool=False):
+        self.enabled = enabled
+
+        self.metrics = OrderedDict()  #: Dict[str, Metric]: Registered metrics, by name
+        self.collectors = []  #: List[Callable[[], Iterable[Metric]]]
+
+    def _register(self, cls: type, name: str, *args, **kwargs) -> Metric:
+        metric = self.metrics.get(name)
+
+        if metric is None:
+            metric = self.metrics[name] = cls(name, *args, **kwargs)
+        elif type(metric) is not cls:
+            raise ValueError("Metric {} is already registered as a {}".format(name, metric.type))
+
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str]=()) -> Counter:
+        """
+        Get a registered counter, or register a new one.
+        """
+
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str]=()) -> Gauge:
+        """
+        Get a registered gauge, or register a new one.
+        """
+
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str]=(),
+                  buckets: Sequence[float]=DEFAULT_BUCKETS) -> Histogram:
+        """
+        Get a registered histogram, or register a new one.
+        """
+
+        return self._register(Histogram, name, documentation, labels, buckets)
+
+    def add_collector(self, collector: Callable[[], Iterable[Metric]]):
+        """
+        Add a function to be called whenever the metrics are scraped. It should return new metrics objects each
+        time - metrics from several collectors with the same name are combined.
+        """
+
+        self.collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], Iterable[Metric]]):
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    def collect(self) -> List[Metric]:
+        """
+        Get every registered metric, along with everything the collectors return.
+        """
+
+        collected = OrderedDict()  # Name -> metric
+
+        for collector in self.collectors:
+            try:
+                metrics = list(collector())
+            except Exception:
+                logging.getLogger(__name__).exception("Error in metrics collector: %r", collector)
+                continue
+
+            for metric in metrics:
+                existing = collected.get(metric.name)
+
+                if existing is None:
+                    collected[metric.name] = metric
+                else:
+                    existing.values.update(metric.values)
+
+        return list(self.metrics.values()) + [
+            metric for name, metric in collected.items() if name not in self.metrics
+        ]
+
+    def render(self) -> str:
+        """
+        Render every metric in Prometheus' text format.
+        """
+
+        lines = []
+
+        for metric in self.collect():
+            lines.extend(metric.render())
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Serves metrics over HTTP, for scraping. `GET /metrics` (or just `/`) returns every metric in the text format.
+
+    Give either a `path` to listen on a Unix socket, or a `port` to listen on TCP. This is meant to be scraped
+    locally, so it listens on the loopback interface unless told otherwise.
+
+    :param metrics: The metrics to serve
+    :param host: The address to listen on, for TCP
+    :param port: The port to listen on, for TCP - 0 picks a free port
+    :param path: The path of a Unix socket to listen on, instead of TCP
+    """
+
+    def __init__(self, metrics: Metrics, host: str="127.0.0.1", port: Optional[int]=None,
+                 path: Optional[str]=None):
+        self.log = logging.getLogger(__name__)  # TODO: Proper logging
+
+        if port is None and not path:
+            raise ValueError("Either a port or a path is required")
+
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.path = path
+
+        self.scrapes = 0  #: int: How many times the metrics have been served
+        self._server = None  #: Optional[asyncio.AbstractServer]
+
+    async def start(self):
+        if self.path:
+            if os.path.exists(self.path):
+                os.unlink(self.path)  # Left behind by an instance that didn't shut down cleanly
+
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+            self.log.info("Serving metrics at %s", self.path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+            if not self.port:
+                self.port = self._server.sockets[0].getsockname()[1]
+
+            self.log.info("Serving metrics at http://%s:%s/metrics", self.host, self.port)
+
+    def close(self):
+        if self._server is None:
+            return
+
+        self._server.close()
+        self._server = None
+
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+
+        try:
+            method, target = head.decode("latin-1").split(" ", 2)[:2]
+        except ValueError:
+            method, target = "", ""
+
+        target = target.split("?", 1)[0]
+
+        if len(head) > MAX_REQUEST_SIZE or not method:
+            status, body, content_type = "400 Bad Request", b"Bad request\n", "text/plain"
+        elif method not in ("GET", "HEAD"):
+            status, body, content_type = "405 Method Not Allowed", b"Method not allowed\n", "text/plain"
+        elif target not in ("/", "/metrics"):
+            status, body, content_type = "404 Not Found", b"Not found\n", "text/plain"
+        else:
+            self.scrapes += 1
+            status, body, content_type = "200 OK", self.metrics.render().encode("UTF-8"), CONTENT_TYPE
+
+        writer.write(
+            "HTTP/1.1 {}\r\nContent-Type: {}\r\nContent-Length: {}\r\nConnection: close\r\n\r\n".format(
+                status, content_type, len(body)
+            ).encode("latin-1")
+        )
+
+        if method != "HEAD":
+            writer.write(body)
+
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
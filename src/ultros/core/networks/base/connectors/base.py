@@ -1,10 +1,12 @@
 # coding=utf-8
 from abc import ABCMeta, abstractmethod
 from asyncio import BaseProtocol
+from typing import Iterable
 from weakref import ref
 
 from logging import getLogger
 
+from ultros.core import metrics as m
 from ultros.core.networks.base.networks import base as base_network
 from ultros.core.networks.base.servers import base as base_server
 
@@ -42,6 +44,14 @@ class BaseConnector(BaseProtocol, metaclass=ABCMeta):
     async def do_disconnect(self):
         pass
 
+    def collect_metrics(self) -> Iterable["m.Metric"]:
+        """
+        Get metrics describing this connector, such as how many lines it has sent and received. This is only called
+        when metrics are enabled and being scraped, so it may build them from scratch each time.
+        """
+
+        return ()
+
     def connection_made(self, transport):
         super().connection_made(transport)
 
@@ -4,11 +4,13 @@
 Base class to be inherited by all networks
 """
 from abc import ABCMeta, abstractmethod
-from typing import Optional
+from operator import attrgetter
+from typing import List, Optional
 from weakref import ref
 
 import asyncio
 
+from ultros.core.registry import Registry
 from ultros.core.networks.base.connectors import base as base_connector
 from ultros.core.networks.base.servers import base as base_server
 from ultros.core.storage.config.base import ConfigFile
@@ -30,12 +32,17 @@ class BaseNetwork(metaclass=ABCMeta):
         self._servers = {}  #: Dict[str, BaseServer]
         self._connectors = {}  #: Dict[str, BaseConnector]
 
-        self._connector_associations = {}  #: Dict[str, List[BaseConnector]]
+        self._connector_associations = {}  #: Dict[str, List[BaseConnector]]: Server name -> connectors
+        self._connector_servers = {}  #: Dict[BaseConnector, str]: Connector -> server name
 
     @property
     def ultros(self) -> "u.Ultros":
         return self._ultros()
 
+    @property
+    def connectors(self) -> List["base_connector.BaseConnector"]:
+        return list(self._connectors.values())
+
     @abstractmethod
     async def setup(self):
         pass
@@ -45,8 +52,12 @@ class BaseNetwork(metaclass=ABCMeta):
         pass
 
     async def _shutdown(self):
-        for _, server in self._servers:
-            self.destroy_server(server)
+        """
+        Destroy every server and connector, disconnecting them all at once.
+        """
+
+        await asyncio.gather(*(self.destroy_server(server) for server in list(self._servers.values())))
+        await asyncio.gather(*(self.destroy_connector(connector) for connector in list(self._connectors.values())))
 
     def notify_connected(self, connector: "base_connector.BaseConnector"):
         server = self.get_server_for_connector(connector)
@@ -67,15 +78,18 @@ class BaseNetwork(metaclass=ABCMeta):
             return  # TODO: Logging
 
         try:
-            server.connector_disconnected(connector, exc)
+            asyncio.ensure_future(server.connector_disconnected(connector, exc))
         except Exception as e:
             pass  # TODO: Logging
 
     def get_server_for_connector(self, connector: "base_connector.BaseConnector") \
             -> Optional["base_server.BaseServer"]:
-        for server_name, connector_list in self._connector_associations.items():
-            if connector in connector_list and self.has_server(server_name):
-                return self.get_server(server_name)
+        server_name = self._connector_servers.get(connector)
+
+        if server_name is None:
+            return None
+
+        return self.get_server(server_name)
 
     def has_server(self, server: str) -> bool:
         return server in self._servers
@@ -91,13 +105,13 @@ class BaseNetwork(metaclass=ABCMeta):
         self._servers[server.name] = server
 
     async def destroy_server(self, server: "base_server.BaseServer"):
-        connectors = self._connector_associations[server.name]
+        connectors = self._connector_associations.pop(server.name, [])
 
-        for connector in connectors:
-            await self.destroy_connector(connector, remove_association=False)
+        await asyncio.gather(*(
+            self.destroy_connector(connector, remove_association=False) for connector in connectors
+        ))
 
         del self._servers[server.name]
-        del self._connector_associations[server.name]
 
     @abstractmethod
     async def create_connector(self, *args,
@@ -110,10 +124,8 @@ class BaseNetwork(metaclass=ABCMeta):
         self._connectors[connector.name] = connector
 
         if server:
-            if server.name not in self._connector_associations:
-                self._connector_associations[server.name] = [connector]
-            else:
-                self._connector_associations[server.name].append(connector)
+            self._connector_associations.setdefault(server.name, []).append(connector)
+            self._connector_servers[connector] = server.name
 
     async def destroy_connector(self, connector: "base_connector.BaseConnector", remove_association=True):
         try:
@@ -123,7 +135,14 @@ class BaseNetwork(metaclass=ABCMeta):
 
         del self._connectors[connector.name]
 
-        if remove_association:
-            for server_name, connectors in self._connector_associations:
-                if connector in connectors:
-                    connectors.remove(connector)
+        server_name = self._connector_servers.pop(connector, None)
+
+        if remove_association and server_name in self._connector_associations:
+            self._connector_associations[server_name].remove(connector)
+
+
+network_registry = Registry(BaseNetwork, attrgetter("type"), "ultros.networks.{}.network", "ultros.networks")
+"""
+Network classes, by type. Networks should register themselves with `@network_registry.register()`; other packages
+can also provide them with entry points in the `ultros.networks` group.
+"""
@@ -1,15 +1,28 @@
 # coding=utf-8
-import importlib
-import inspect
+import asyncio
 import logging
 
-from typing import Optional
+from collections import namedtuple
+from time import monotonic
+from typing import Dict, Iterable, Optional
 
 from ultros.core import main as u
-from ultros.core.networks.base.networks.base import BaseNetwork
+from ultros.core import metrics as m
+from ultros.core.networks.base.networks import base as base_network
 
 __author__ = "Gareth Coles"
-PACKAGE = "ultros.networks.{}.network"
+
+DEFAULT_CONCURRENCY = 8  #: How many networks to set up at once, if not configured
+DEFAULT_TIMEOUT = 60  #: How long to wait for a network to be set up, in seconds, if not configured
+
+NetworkStatus = namedtuple("NetworkStatus", ["ready", "time", "error"])
+NetworkStatus.__doc__ = """
+The result of setting up a network.
+
+:ivar ready: Whether the network was set up successfully
+:ivar time: How long setting the network up took, in seconds
+:ivar error: A description of what went wrong, or None if the network is ready
+"""
 
 
 class NetworkManager:
@@ -18,9 +31,47 @@ class NetworkManager:
         self.ultros = ultros
 
         self.networks = {}
+        self.statuses = {}  #: Dict[str, NetworkStatus]: The result of setting up each network
+
+    async def shutdown(self):
+        """
+        Shut down every network at once - each network drains and closes its connections.
+        """
+
+        try:
+            names = list(self.networks.keys())
+            results = await asyncio.gather(
+                *(self.networks[name].shutdown() for name in names), return_exceptions=True
+            )
+
+            for name, result in zip(names, results):
+                if isinstance(result, Exception):
+                    self.log.error("Failed to shut down network %s: %s", name, result)
+        finally:
+            self.networks.clear()
+            self.ultros = None
 
-    def shutdown(self):
-        self.ultros = None
+    def register_metrics(self, metrics: "m.Metrics"):
+        """
+        Start reporting whether each network is ready, along with the metrics of every connector.
+        """
+
+        metrics.add_collector(self.collect_metrics)
+
+    def collect_metrics(self) -> Iterable["m.Metric"]:
+        ready = m.Gauge("ultros_network_ready", "Whether each network was set up successfully", ["network"])
+        setup_time = m.Gauge("ultros_network_setup_seconds", "Time taken to set up each network", ["network"])
+
+        for name, status in self.statuses.items():
+            ready.labels(name).set(int(status.ready))
+            setup_time.labels(name).set(status.time)
+
+        yield ready
+        yield setup_time
+
+        for network in list(self.networks.values()):
+            for connector in network.connectors:
+                yield from connector.collect_metrics()
 
     def load_networks(self):
         config = self.ultros.config
@@ -28,6 +79,9 @@ class NetworkManager:
 
         if not network_list:
             self.log.warning("No networks have been configured!")
+        elif self.ultros.network_names is not None:
+            # This instance is only responsible for some of the networks, eg as a supervisor's worker
+            network_list = [name for name in network_list if name in self.ultros.network_names]
 
         for network_name in network_list:
             network = self._load_network(network_name)
@@ -38,12 +92,59 @@ class NetworkManager:
 
             self.networks[network_name] = network
 
-    async def connect_all(self):
-        for network_name, network in self.networks.items():
-            self.log.info("Setting up: %s", network_name)
-            await network.setup()
+    async def connect_all(self) -> Dict[str, NetworkStatus]:
+        """
+        Set up every loaded network concurrently, so one slow or unreachable network doesn't hold up the rest.
+
+        The `network_concurrency` setting limits how many networks are set up at once, and `network_timeout` is how
+        long to give each one, in seconds - set it to null to wait forever.
+
+        :return: A readiness report, mapping each network name to its `NetworkStatus`
+        """
+
+        config = self.ultros.config
+        concurrency = config.get("network_concurrency") or DEFAULT_CONCURRENCY
+        timeout = config.get("network_timeout", DEFAULT_TIMEOUT)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        names = list(self.networks.keys())
+
+        statuses = await asyncio.gather(*(
+            self._setup_network(name, self.networks[name], semaphore, timeout) for name in names
+        ))
+
+        report = dict(zip(names, statuses))
+        self.statuses.update(report)
+
+        self.log.info(
+            "%s of %s networks ready", sum(1 for status in statuses if status.ready), len(statuses)
+        )
+
+        for name, status in report.items():
+            if status.ready:
+                self.log.info("    %s: ready in %.2fs", name, status.time)
+            else:
+                self.log.warning("    %s: %s after %.2fs", name, status.error, status.time)
+
+        return report
+
+    async def _setup_network(self, name: str, network: "base_network.BaseNetwork", semaphore: asyncio.Semaphore,
+                             timeout: Optional[float]) -> NetworkStatus:
+        async with semaphore:
+            self.log.info("Setting up: %s", name)
+            start = monotonic()
+
+            try:
+                await asyncio.wait_for(network.setup(), timeout)
+            except asyncio.TimeoutError:
+                return NetworkStatus(False, monotonic() - start, "timed out")
+            except Exception as e:
+                self.log.exception("Failed to set up network: %s", name)
+                return NetworkStatus(False, monotonic() - start, "failed ({})".format(e))
+
+            return NetworkStatus(True, monotonic() - start, None)
 
-    def _load_network(self, name) -> Optional[BaseNetwork]:
+    def _load_network(self, name) -> Optional["base_network.BaseNetwork"]:
         self.log.info("Loading network: %s", name)
         config_file = "networks/{}.yml".format(name)
 
@@ -60,12 +161,10 @@ class NetworkManager:
 
         return network_cls(name, config, self.ultros)
 
-    def _get_class(self, module_name) -> Optional[type(BaseNetwork)]:
-        module = importlib.import_module(PACKAGE.format(module_name))
+    def _get_class(self, network_type) -> Optional[type]:
+        """
+        Get the network class for a network type, importing it the first time it's needed. See
+        `ultros.core.registry`.
+        """
 
-        for name, network_cls in inspect.getmembers(module):
-            if inspect.isclass(network_cls):
-                if network_cls != BaseNetwork:
-                    for parent in inspect.getmro(network_cls):
-                        if parent == BaseNetwork:
-                            return network_cls
+        return base_network.network_registry.get(network_type)
@@ -0,0 +1,117 @@
+# coding=utf-8
+
+"""
+Startup profiling.
+
+Startup is split into named phases - importing the core, creating each manager, loading networks and so on. The
+profiler times each phase and counts the modules it imported, then logs a report once startup is done:
+
+>>> profiler = StartupProfiler(enabled=True)
+>>> with profiler.phase("import"):
+...     from ultros.core.main import Ultros
+>>> profiler.report()
+
+Pass `--profile-startup` to `python -m ultros.core start` to see this report. For a per-module breakdown of
+import times, run Python with `-X importtime` as well.
+"""
+
+import logging
+import sys
+
+from collections import namedtuple
+from contextlib import contextmanager
+from time import perf_counter
+from typing import List
+
+__author__ = "Gareth Coles"
+
+Phase = namedtuple("Phase", ["name", "time", "modules"])
+Phase.__doc__ = """
+A timed phase of startup.
+
+:ivar name: The name of the phase
+:ivar time: How long the phase took, in seconds
+:ivar modules: How many modules were imported during the phase
+"""
+
+
+class StartupProfiler:
+    """
+    Times the phases of startup.
+
+    Phases are always timed, since that costs next to nothing; the report is only logged when `enabled` is True.
+
+    :param enabled: Whether to log the report
+    """
+
+    def __init__(self, enabled: bool=False):
+        self.log = logging.getLogger(__name__)  # TODO: Proper logging
+        self.enabled = enabled
+
+        self.phases = []  #: List[Phase]: Phases that have finished, in order
+        self.started = perf_counter()  #: float: When the profiler was created
+        self.finished = None  #: Optional[float]: When the report was made
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        A context manager that times everything inside it as a phase of startup.
+        """
+
+        modules = len(sys.modules)
+        start = perf_counter()
+
+        try:
+            yield
+        finally:
+            self.add_phase(name, perf_counter() - start, len(sys.modules) - modules)
+
+    def add_phase(self, name: str, time: float, modules: int=0):
+        """
+        Record a phase that was timed separately, for example one that ran on the event loop.
+        """
+
+        self.phases.append(Phase(name, time, modules))
+
+    @property
+    def total(self) -> float:
+        """
+        The time from creating the profiler until the report, or until now if there hasn't been a report yet.
+        """
+
+        return (self.finished or perf_counter()) - self.started
+
+    def format_report(self) -> List[str]:
+        """
+        Format the phases as lines of a table, with a total at the end.
+        """
+
+        width = max([len(phase.name) for phase in self.phases] + [len("Total")])
+        lines = []
+
+        for phase in self.phases:
+            lines.append("{:<{}}  {:>9.1f}ms  {:>5} modules".format(
+                phase.name, width, phase.time * 1000, phase.modules
+            ))
+
+        lines.append("{:<{}}  {:>9.1f}ms".format("Total", width, self.total * 1000))
+
+        return lines
+
+    def report(self):
+        """
+        Finish profiling, and log the report if enabled. Only the first call does anything.
+        """
+
+        if self.finished is not None:
+            return
+
+        self.finished = perf_counter()
+
+        if not self.enabled:
+            return
+
+        self.log.info("Startup profile:")
+
+        for line in self.format_report():
+            self.log.info("    %s", line)
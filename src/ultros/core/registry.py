@@ -0,0 +1,190 @@
+# coding=utf-8
+
+"""
+Registries of pluggable classes, such as network types and storage formats.
+
+Classes register themselves with a decorator when their module is imported:
+
+>>> @network_registry.register()
+... class IRCNetwork(BaseNetwork):
+...     type = "irc"
+
+When a class is asked for by name, the registry looks in three places, in
+order, and remembers the result:
+
+1. Classes that have already been registered.
+2. Entry points in the registry's entry point group, so that other packages
+   can provide classes without being imported up front. Entry points are only
+   read the first time a name isn't otherwise known.
+3. The module the name maps to, which is imported and expected to register its
+   class. For modules that don't use the decorator, the registry falls back to
+   the single concrete subclass of the base class that the module defines.
+
+Modules are only imported when one of their classes is actually needed, which
+keeps startup fast no matter how many backends are available.
+"""
+
+import importlib
+import inspect
+import logging
+
+from typing import Callable, Dict, Optional
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # Python < 3.8
+    try:
+        import importlib_metadata
+    except ImportError:
+        importlib_metadata = None
+
+__author__ = "Gareth Coles"
+
+log = logging.getLogger(__name__)
+
+
+class Registry:
+    """
+    A registry of classes that subclass a common base, by name.
+
+    :param base: The class everything in the registry must subclass
+    :param key: A function that works out the name a class is registered under, when it isn't given
+    :param module_template: A format string that turns a name into the module containing its class, eg
+                            "ultros.networks.{}.network" - leave this out if names are module names already
+    :param entry_point_group: The entry point group other packages may add classes to, or None for no entry points
+    """
+
+    def __init__(self, base: type, key: Callable[[type], str], module_template: str="{}",
+                 entry_point_group: Optional[str]=None):
+        self.base = base
+        self.key = key
+        self.module_template = module_template
+        self.entry_point_group = entry_point_group
+
+        self._classes = {}  #: Dict[str, type]
+        self._entry_points = None  #: Dict[str, EntryPoint]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._classes
+
+    def register(self, name: Optional[str]=None):
+        """
+        A class decorator that adds the class to the registry.
+
+        :param name: The name to register the class under, or None to work it out with the registry's `key`
+        """
+
+        def inner(cls: type) -> type:
+            self.add(cls, name)
+            return cls
+
+        return inner
+
+    def add(self, cls: type, name: Optional[str]=None):
+        """
+        Add a class to the registry, replacing any class already registered with the same name.
+        """
+
+        if not issubclass(cls, self.base):
+            raise TypeError("{!r} is not a subclass of {!r}".format(cls, self.base))
+
+        self._classes[name or self.key(cls)] = cls
+
+    def remove(self, name: str) -> bool:
+        """
+        Remove a class from the registry.
+
+        :return: False if no class was registered with that name, True otherwise
+        """
+
+        return self._classes.pop(name, None) is not None
+
+    def get(self, name: str) -> Optional[type]:
+        """
+        Get the class for a name, importing it if necessary.
+
+        :return: The class, or None if there isn't one
+        :raises TypeError: If the name's module defines more than one class it could be, and registers none of them
+        """
+
+        cls = self._classes.get(name)
+
+        if cls is not None:
+            return cls
+
+        cls = self._load_entry_point(name)
+
+        if cls is None:
+            cls = self._load_module(name)
+
+        if cls is not None:
+            self.add(cls, name)
+
+        return cls
+
+    def _load_entry_point(self, name: str) -> Optional[type]:
+        if self.entry_point_group is None or importlib_metadata is None:
+            return None
+
+        if self._entry_points is None:
+            entry_points = importlib_metadata.entry_points()
+
+            if hasattr(entry_points, "select"):  # Python 3.10+
+                group = entry_points.select(group=self.entry_point_group)
+            else:
+                group = entry_points.get(self.entry_point_group, [])
+
+            self._entry_points = {entry_point.name: entry_point for entry_point in group}
+
+        entry_point = self._entry_points.get(name)
+
+        if entry_point is None:
+            return None
+
+        return entry_point.load()
+
+    def _load_module(self, name: str) -> Optional[type]:
+        module_name = self.module_template.format(name)
+
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            missing = getattr(e, "name", None) or ""
+
+            if missing and (module_name == missing or module_name.startswith(missing + ".")):
+                return None  # The module doesn't exist - anything else is a real problem
+
+            raise
+
+        cls = self._classes.get(name)
+
+        if cls is not None:
+            return cls
+
+        # Fall back to looking for the class, for modules that don't register it themselves
+        candidates = [
+            member for _, member in inspect.getmembers(module, inspect.isclass)
+            if member.__module__ == module.__name__ and self._is_candidate(member)
+        ]
+
+        if len(candidates) > 1:
+            raise TypeError("Module {} contains more than one {}: {}".format(
+                module_name, self.base.__name__, ", ".join(c.__name__ for c in candidates)
+            ))
+
+        if candidates:
+            log.debug("%s doesn't register its class; found %s", module_name, candidates[0].__name__)
+            return candidates[0]
+
+        return None
+
+    def _is_candidate(self, cls: type) -> bool:
+        return issubclass(cls, self.base) and cls is not self.base and not inspect.isabstract(cls)
+
+    @property
+    def classes(self) -> Dict[str, type]:
+        """
+        A copy of the classes that have been registered or loaded so far.
+        """
+
+        return dict(self._classes)
@@ -19,6 +19,7 @@ Submodules
 .. autosummary::
     :toctree: rules
 
+    bulk
     constants
     engine
     predicates
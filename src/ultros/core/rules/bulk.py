@@ -0,0 +1,165 @@
+# coding=utf-8
+
+"""
+Helpers for running rules over whole columns of values at once.
+
+Predicates that know how to check a whole column in one go carry a `bulk`
+attribute, which is attached with the `bulk_predicate` decorator. A bulk
+implementation takes a column of values and the comparable from the rule,
+and returns a sequence of booleans - one for each value in the column.
+
+If NumPy is installed, columns are NumPy arrays and the bulk
+implementations are vectorized. Otherwise, columns are plain lists and each
+bulk implementation falls back to a single comprehension, which is still
+far cheaper than running the rule set once per value. NumPy is an optional
+dependency; install Ultros with the `numpy` extra if you need it.
+
+See `RulesEngine.run_bulk()` for how these are used.
+"""
+
+from typing import Callable, Iterable, Sequence
+
+try:
+    import numpy
+except ImportError:  # Optional dependency
+    numpy = None
+
+__author__ = "Gareth Coles"
+
+
+def bulk_predicate(bulk_func: Callable[[Sequence, object], Sequence[bool]]) -> Callable:
+    """
+    A decorator that attaches a bulk implementation to a predicate.
+
+    The predicate itself is returned unchanged, so it can still be used in
+    standard rules.
+
+    :param bulk_func: A function taking a column and a comparable, returning
+                      a sequence of booleans
+    """
+
+    def inner(func):
+        func.bulk = bulk_func
+        return func
+    return inner
+
+
+def as_column(values: Iterable) -> Sequence:
+    """
+    Copy some values into a column suitable for bulk predicates.
+
+    This may be a list, a tuple, an `array.array`, a NumPy array, or any
+    other iterable. The values are always copied, so the column can be
+    modified without affecting what was passed in.
+    """
+
+    if numpy is not None:
+        if not hasattr(values, "__len__"):  # Generators and other lazy iterables
+            values = list(values)
+
+        return numpy.array(values)
+    return list(values)
+
+
+def new_mask(size: int) -> Sequence[bool]:
+    """
+    Create a boolean mask of the given size, with every value set to True.
+    """
+
+    if numpy is not None:
+        return numpy.ones(size, dtype=bool)
+    return [True] * size
+
+
+# Number operations
+
+def num_greater_than(column: Sequence, comparable) -> Sequence[bool]:
+    """
+    Bulk implementation of `predicates.num_greater_than`.
+    """
+
+    if numpy is not None:
+        return column > comparable
+    return [value > comparable for value in column]
+
+
+def num_less_than(column: Sequence, comparable) -> Sequence[bool]:
+    """
+    Bulk implementation of `predicates.num_less_than`.
+    """
+
+    if numpy is not None:
+        return column < comparable
+    return [value < comparable for value in column]
+
+
+def num_in_range(column: Sequence, comparable) -> Sequence[bool]:
+    """
+    Bulk implementation of `predicates.num_in_range`.
+    """
+
+    start, stop = comparable
+
+    if numpy is not None:
+        return (column >= start) & (column < stop)
+    return [start <= value < stop for value in column]
+
+
+def num_not_in_range(column: Sequence, comparable) -> Sequence[bool]:
+    """
+    Bulk implementation of `predicates.num_not_in_range`.
+    """
+
+    start, stop = comparable
+
+    if numpy is not None:
+        return (column < start) | (column >= stop)
+    return [not start <= value < stop for value in column]
+
+
+def num_between(column: Sequence, comparable) -> Sequence[bool]:
+    """
+    Bulk implementation of `predicates.num_between`.
+    """
+
+    low, high = comparable
+
+    if numpy is not None:
+        return (column >= low) & (column <= high)
+    return [low <= value <= high for value in column]
+
+
+def num_not_between(column: Sequence, comparable) -> Sequence[bool]:
+    """
+    Bulk implementation of `predicates.num_not_between`.
+    """
+
+    low, high = comparable
+
+    if numpy is not None:
+        return (column < low) | (column > high)
+    return [not low <= value <= high for value in column]
+
+
+def num_in_set(column: Sequence, comparable) -> Sequence[bool]:
+    """
+    Bulk implementation of `predicates.num_in_set`.
+    """
+
+    if numpy is not None:
+        return numpy.isin(column, list(comparable))
+
+    comparable = frozenset(comparable)
+    return [value in comparable for value in column]
+
+
+def num_not_in_set(column: Sequence, comparable) -> Sequence[bool]:
+    """
+    Bulk implementation of `predicates.num_not_in_set`.
+    """
+
+    if numpy is not None:
+        return numpy.isin(column, list(comparable), invert=True)
+
+    comparable = frozenset(comparable)
+    return [value not in comparable for value in column]
@@ -9,12 +9,22 @@ most use-cases.
 import types
 
 from asyncio.coroutines import iscoroutinefunction
-from typing import Union
+from collections import namedtuple
+from types import MappingProxyType
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple, Union
 
+from ultros.core.rules import bulk
 from ultros.core.rules.constants import TransformerResult
 
 __author__ = "Gareth Coles"
 
+#: A single compiled rule. Whether the predicate and transformer are coroutine functions is worked out once, when
+#: the rule is added, rather than every time the rule is run.
+Rule = namedtuple("Rule", ("predicate", "comparable", "transformer", "async_predicate", "async_transformer"))
+
+#: An immutable, versioned view of every rule set in an engine at one point in time.
+RulesSnapshot = namedtuple("RulesSnapshot", ("version", "rule_sets"))
+
 
 class RulesEngine:
     """
@@ -24,14 +34,59 @@ class RulesEngine:
 
     This engine does have the concept of sets of rules, so you can use the
     same instance with more than one group of rules.
+
+    Rule sets are stored as immutable, versioned snapshots. Adding or removing
+    rules never modifies a snapshot in place - instead, a new one is built
+    and published in a single assignment. Any call to `run()` that is
+    already in progress will carry on with the snapshot it started with, so
+    it's safe to change rules while they're being run, without any locking.
     """
 
-    rule_sets = None
+    _snapshot = None
 
     def __init__(self):
-        self.rule_sets = {}
+        self._snapshot = RulesSnapshot(0, MappingProxyType({}))
+
+    @property
+    def rule_sets(self) -> Mapping[str, Tuple[Rule, ...]]:
+        """
+        A read-only mapping of the current rule sets. Use `add_rule()` and
+        `del_rule_set()` to make changes.
+        """
 
-    async def run(self, rule_set: str, value: object) -> object:
+        return self._snapshot.rule_sets
+
+    @property
+    def version(self) -> int:
+        """
+        The current rule set version, incremented every time a change is
+        published.
+        """
+
+        return self._snapshot.version
+
+    def snapshot(self) -> RulesSnapshot:
+        """
+        Get the current snapshot of all rule sets, along with its version.
+
+        The snapshot will never change, so you can hold on to it (and pass it
+        to `run()`) for as long as you need a consistent view of the rules.
+        """
+
+        return self._snapshot
+
+    def _publish(self, rule_sets: dict):
+        """
+        Replace the current snapshot with a new one built from `rule_sets`.
+
+        The dict passed in must not be used again after this call.
+        """
+
+        self._snapshot = RulesSnapshot(
+            self._snapshot.version + 1, MappingProxyType(rule_sets)
+        )
+
+    async def run(self, rule_set: str, value: object, snapshot: Optional[RulesSnapshot]=None) -> object:
         """
         Run a set of rules against a value, returning as required by your
         transformers. It follows these basic steps:
@@ -50,24 +105,32 @@ class RulesEngine:
 
             * If the predicate returns False, return False and stop processing
 
+        The rule set is taken from the current snapshot when the run starts,
+        and changes made to the rules after that point won't affect this run.
+
         :param rule_set: The set of rules to run
         :param value: The value you want to compare across your rules
+        :param snapshot: Optionally, a snapshot from `snapshot()` to run the
+                         rules from, instead of the current one
         :return: What you get depends entirely on your rules; see above
         """
 
-        _set = self.get_rule_set(rule_set)
+        if snapshot is None:
+            snapshot = self._snapshot
+
+        _set = snapshot.rule_sets.get(rule_set, None)
 
         if _set is None:
             raise LookupError("No such rule set: {}".format(rule_set))
 
-        for predicate, comparable, transformer in _set:
-            if iscoroutinefunction(predicate):
+        for predicate, comparable, transformer, async_predicate, async_transformer in _set:
+            if async_predicate:
                 result = await predicate(value, comparable)
             else:
                 result = predicate(value, comparable)
 
             if result:
-                if iscoroutinefunction(transformer):
+                if async_transformer:
                     transformer_result = await transformer(value)
                 else:
                     transformer_result = transformer(value)
@@ -92,6 +155,98 @@ class RulesEngine:
                 "Unknown transformer result: {}".format(transformer_result)
             )
 
+    async def run_bulk(self, rule_set: str, values: Iterable,
+                       snapshot: Optional[RulesSnapshot]=None) -> Tuple[Sequence[bool], List[object]]:
+        """
+        Run a set of rules against a whole column of values at once. This
+        follows the same steps as `run()`, but each rule is checked against
+        every value that's still being processed before moving on to the next
+        one.
+
+        Predicates with a bulk implementation (such as the number predicates
+        in the `predicates` module) are called once per rule with the whole
+        column of remaining values, instead of once per value. Other
+        predicates, and all transformers, are still called once per value.
+
+        `values` may be any iterable of values, including an `array.array` or
+        a NumPy array. It is copied into a list before the rules are run, and
+        typed columns are only built from the remaining values when a bulk
+        predicate needs one, so transformers may replace values with anything.
+
+        :param rule_set: The set of rules to run
+        :param values: The values you want to compare across your rules
+        :param snapshot: Optionally, a snapshot from `snapshot()` to run the
+                         rules from, instead of the current one
+        :return: A tuple containing a boolean mask (False for each value that
+                 failed a predicate) and a list of results, one per value, as
+                 would have been returned by `run()`
+        """
+
+        if snapshot is None:
+            snapshot = self._snapshot
+
+        _set = snapshot.rule_sets.get(rule_set, None)
+
+        if _set is None:
+            raise LookupError("No such rule set: {}".format(rule_set))
+
+        current = list(values)  # Values as they've been left by the transformers so far
+        mask = bulk.new_mask(len(current))
+        results = [None] * len(current)
+
+        active = list(range(len(current)))  # Indices of the values still being processed
+
+        for predicate, comparable, transformer, async_predicate, async_transformer in _set:
+            if not active:
+                break
+
+            bulk_func = getattr(predicate, "bulk", None)
+
+            if bulk_func is not None:
+                matched = bulk_func(bulk.as_column([current[index] for index in active]), comparable)
+            elif async_predicate:
+                matched = [await predicate(current[index], comparable) for index in active]
+            else:
+                matched = [predicate(current[index], comparable) for index in active]
+
+            still_active = []
+
+            for index, result in zip(active, matched):
+                if not result:
+                    mask[index] = False
+                    results[index] = False  # Rule wasn't matched
+                    continue
+
+                if async_transformer:
+                    transformer_result = await transformer(current[index])
+                else:
+                    transformer_result = transformer(current[index])
+
+                if isinstance(transformer_result, tuple):
+                    t_r, value = transformer_result
+
+                    if t_r is TransformerResult.CONTINUE:
+                        current[index] = value
+                        still_active.append(index)
+                        continue
+                    if t_r is TransformerResult.RETURN:
+                        results[index] = value
+                        continue
+
+                if transformer_result is TransformerResult.CONTINUE:
+                    still_active.append(index)
+                    continue
+                if transformer_result is TransformerResult.RETURN:
+                    continue
+
+                raise NotImplementedError(
+                    "Unknown transformer result: {}".format(transformer_result)
+                )
+
+            active = still_active
+
+        return mask, results
+
     def add_rule(self,
                  rule_set: str,
                  predicate: Union[types.FunctionType, types.CoroutineType],
@@ -100,6 +255,9 @@ class RulesEngine:
         """
         Add a rule to a rule set. If the set doesn't exist, it is created.
 
+        This publishes a new snapshot; runs that are already in progress
+        won't see the new rule.
+
         :param rule_set: The rule set to add the rule to
         :param predicate: A function representing a simple two-value comparison
         :param comparable: The right-side value to compare with every time this
@@ -108,29 +266,39 @@ class RulesEngine:
                             rule is matched
         """
 
-        if rule_set not in self.rule_sets:
-            self.rule_sets[rule_set] = []
-
-        self.rule_sets[rule_set].append(
-            (predicate, comparable, transformer)
+        rule = Rule(
+            predicate, comparable, transformer,
+            iscoroutinefunction(predicate), iscoroutinefunction(transformer)
         )
 
-    def get_rule_set(self, rule_set: str) -> list:
+        rule_sets = dict(self._snapshot.rule_sets)
+        rule_sets[rule_set] = rule_sets.get(rule_set, ()) + (rule,)
+
+        self._publish(rule_sets)
+
+    def get_rule_set(self, rule_set: str) -> Optional[Tuple[Rule, ...]]:
         """
         Get a set of rules, as defined.
 
         :param rule_set: The rule set to get
-        :return: The rule set, or None if it doesn't exist
+        :return: The rule set as an immutable tuple of rules, or None if it
+                 doesn't exist
         """
 
-        return self.rule_sets.get(rule_set, None)
+        return self._snapshot.rule_sets.get(rule_set, None)
 
     def del_rule_set(self, rule_set: str):
         """
         Delete a rule set, assuming it exists.
 
+        This publishes a new snapshot; runs that are already in progress
+        won't be affected.
+
         :param rule_set: The rule set to delete
         """
 
-        if rule_set in self.rule_sets:
-            del self.rule_sets[rule_set]
+        if rule_set in self._snapshot.rule_sets:
+            rule_sets = dict(self._snapshot.rule_sets)
+            del rule_sets[rule_set]
+
+            self._publish(rule_sets)
@@ -12,18 +12,28 @@ that's currently being checked.
 Aside from that, predicates can do whatever they want, but do bear in mind
 that they are only designed to be used for checking, not actioning. Note that
 predicates may either be a standard function, or a coroutine function.
+
+The number predicates also come with bulk implementations, so they can be
+checked against a whole column of values in one go with
+`RulesEngine.run_bulk()` - see the `bulk` module for more on that. Those that
+take two numbers as their comparable expect a `(low, high)` tuple or list,
+so they can be given straight from a config file.
 """
 
 import re
 
 from numbers import Number
-from typing import Union
+from typing import Collection, Sequence, Union
+
+from ultros.core.rules import bulk
+from ultros.core.rules.bulk import bulk_predicate
 
 __author__ = "Gareth Coles"
 
 
 # Number operations
 
+@bulk_predicate(bulk.num_greater_than)
 def num_greater_than(value: Number, comparable: Number) -> bool:
     """
     Checks whether `value` is greater than `comparable`.
@@ -32,6 +42,7 @@ def num_greater_than(value: Number, comparable: Number) -> bool:
     return value > comparable
 
 
+@bulk_predicate(bulk.num_less_than)
 def num_less_than(value: Number, comparable: Number) -> bool:
     """
     Checks whether `value` is less than `comparable`.
@@ -40,6 +51,66 @@ def num_less_than(value: Number, comparable: Number) -> bool:
     return value < comparable
 
 
+@bulk_predicate(bulk.num_in_range)
+def num_in_range(value: Number, comparable: Sequence[Number]) -> bool:
+    """
+    Checks whether `value` is within the half-open range in `comparable`,
+    like Python's `range()` - `start <= value < stop`.
+    """
+
+    start, stop = comparable
+    return start <= value < stop
+
+
+@bulk_predicate(bulk.num_not_in_range)
+def num_not_in_range(value: Number, comparable: Sequence[Number]) -> bool:
+    """
+    Checks whether `value` is outside of the half-open range in `comparable`.
+    """
+
+    start, stop = comparable
+    return not start <= value < stop
+
+
+@bulk_predicate(bulk.num_between)
+def num_between(value: Number, comparable: Sequence[Number]) -> bool:
+    """
+    Checks whether `value` is between the two values in `comparable`,
+    inclusive - `low <= value <= high`.
+    """
+
+    low, high = comparable
+    return low <= value <= high
+
+
+@bulk_predicate(bulk.num_not_between)
+def num_not_between(value: Number, comparable: Sequence[Number]) -> bool:
+    """
+    Checks whether `value` is not between the two values in `comparable`.
+    """
+
+    low, high = comparable
+    return not low <= value <= high
+
+
+@bulk_predicate(bulk.num_in_set)
+def num_in_set(value: Number, comparable: Collection[Number]) -> bool:
+    """
+    Checks whether `value` is one of the values in `comparable`.
+    """
+
+    return value in comparable
+
+
+@bulk_predicate(bulk.num_not_in_set)
+def num_not_in_set(value: Number, comparable: Collection[Number]) -> bool:
+    """
+    Checks whether `value` is none of the values in `comparable`.
+    """
+
+    return value not in comparable
+
+
 # String operations
 
 def str_contains(value: str, comparable: str) -> bool:
@@ -4,11 +4,17 @@
 Base classes for storage formats
 """
 
+import asyncio
+import pickle
+
 from abc import ABCMeta, abstractmethod
 from contextlib import AbstractContextManager
 from typing import Any, List, Dict
+from operator import attrgetter
 from weakref import ref
 
+from ultros.core.registry import Registry
+
 __author__ = "Gareth Coles"
 
 
@@ -53,6 +59,14 @@ class DatabaseStorageBase(StorageBase, metaclass=ABCMeta):
 
         self._url = url
 
+    def pool_stats(self) -> Dict[str, int]:
+        """
+        Get the stats of the database's connection pool, if it has one - for example, how many connections are
+        checked out. These are reported as metrics, when enabled.
+        """
+
+        return {}
+
     @abstractmethod
     def load(self):
         """
@@ -91,6 +105,22 @@ class FileStorageBase(StorageBase, metaclass=ABCMeta):
         This will be called by the storage manager automatically
         """
 
+    async def aload(self):
+        """
+        Load the file in a worker thread, so the event loop isn't blocked while it's read and parsed. This waits
+        for any save of the file that's in progress first.
+
+        `load()` must only replace `.data` once it's finished for this to be safe, rather than filling it in as it
+        goes.
+        """
+
+        manager = self.manager
+
+        if manager is None:
+            await asyncio.get_event_loop().run_in_executor(None, self.load)
+        else:
+            await manager.aload_file(self)
+
     @abstractmethod
     def reload(self):
         """
@@ -124,12 +154,34 @@ class MutableFileStorageBase(FileStorageBase, AbstractContextManager, metaclass=
 
     Note that mutable config files are not mutable if the filename ends with ".default", and will raise an exception
     if you attempt to call `.save()` - check `.mutable` if you need to be aware of this.
+
+    Data files track whether they've been changed since they were last loaded or saved in `.dirty`, and the storage
+    manager saves dirty data files when shutting down. Changes made inside nested values (eg `x["a"]["b"] = 1`)
+    can't be seen, so call `.mark_dirty()` after making them - or use the context manager, which saves anyway.
+
+    `.save()` blocks the event loop until the file has been written, which can take a while for big files. Use
+    `await .asave()` instead to take a snapshot of the data and write that in a worker thread - or in a separate
+    process, for big files of formats that set `process_pool`. The data may be changed while it's being written.
+    Formats need to implement `dump()` for this; formats that don't are saved with `.save()` in a worker thread,
+    where changing the data during the save isn't safe.
     """
 
+    #: bool: Whether big files of this format should be saved in a separate process by `asave()` - worth it for
+    #: formats with slow, pure-Python serializers. See `StorageManager.process_pool_threshold`.
+    process_pool = False
+
     def __init__(self, owner: Any, manager, path: str, *args: List[Any], **kwargs: Dict[Any, Any]):
         super().__init__(owner, manager, path, *args, **kwargs)
 
         self.mutable = True
+        self.dirty = False
+
+    def mark_dirty(self):
+        """
+        Mark the file as changed, so that it's saved when the storage manager is flushed.
+        """
+
+        self.dirty = True
 
     @abstractmethod
     def save(self):
@@ -140,11 +192,54 @@ class MutableFileStorageBase(FileStorageBase, AbstractContextManager, metaclass=
         if it is false instead of saving - this is because defaults files should never be modified at runtime.
         """
 
+    @staticmethod
+    def dump(path: str, data: Any):
+        """
+        Write some data to a file at `path`, in this format. This is used by `asave()` to write a snapshot of the
+        data in a worker thread or process, so it must not touch the storage object.
+
+        :raises NotImplementedError: If the format doesn't support this
+        """
+
+        raise NotImplementedError()
+
+    def snapshot(self) -> bytes:
+        """
+        Take a copy of the data for `dump()` to write in another thread or process, so it can keep being changed in
+        the meantime. The copy is pickled, which is much quicker than serializing it to the file's format.
+        """
+
+        return pickle.dumps(self.data, pickle.HIGHEST_PROTOCOL)
+
+    async def asave(self):
+        """
+        Save all stored data to disk without blocking the event loop; see the class documentation. Saves of the same
+        file are never run at the same time - if this file is already being saved, this waits for that to finish
+        first, and saves made while waiting are combined into one.
+
+        :raises RuntimeError: If the file isn't mutable
+        """
+
+        if not self.mutable:
+            raise RuntimeError("You may not modify a defaults file at runtime - check the mutable attribute!")
+
+        manager = self.manager
+
+        if manager is None:
+            await asyncio.get_event_loop().run_in_executor(None, self.save)
+        else:
+            await manager.asave_file(self)
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         if not any((exc_type, exc_val, exc_tb)):
             # Everything is None; no errors - we can save
             if self.mutable:
-                self.save()
+                manager = self.manager
+
+                if manager is not None:
+                    manager.save_file(self)
+                else:
+                    self.save()
 
 
 class AbstractItemAccessMixin(metaclass=ABCMeta):
@@ -278,3 +373,10 @@ class MutableAbstractDictFunctionsMixin(AbstractDictFunctionsMixin, metaclass=AB
         Update your data using the (key, value) pairs of other, overwriting
         as necessary
         """
+
+
+storage_registry = Registry(StorageBase, attrgetter("__module__"))
+"""
+Storage classes, by the name of the module they're defined in - the storage formats in `ultros.core.storage.formats`
+refer to them by module. Storage classes should register themselves with `@storage_registry.register()`.
+"""
@@ -8,12 +8,13 @@ from configparser import ConfigParser, _UNSET
 from typing import Any, List, Dict, Union
 
 from ultros.core.storage import manager as m
-from ultros.core.storage.base import AbstractItemAccessMixin
+from ultros.core.storage.base import AbstractItemAccessMixin, storage_registry
 from ultros.core.storage.config.base import ConfigFile
 
 __author__ = "Gareth Coles"
 
 
+@storage_registry.register()
 class INIConfig(ConfigFile, AbstractItemAccessMixin):
     """
     Class for INI-based configurations
@@ -23,8 +24,10 @@ class INIConfig(ConfigFile, AbstractItemAccessMixin):
         super().__init__(owner, manager, path, *args, **kwargs)
 
     def load(self):
-        self.data = ConfigParser()
-        self.data.read(self.path)
+        data = ConfigParser()
+        data.read(self.path)
+
+        self.data = data
 
     def reload(self):
         self.unload()
@@ -9,12 +9,13 @@ import json
 from typing import Any, List, Dict
 
 from ultros.core.storage import manager as m
-from ultros.core.storage.base import MutableAbstractItemAccessMixin, MutableAbstractDictFunctionsMixin
+from ultros.core.storage.base import MutableAbstractItemAccessMixin, MutableAbstractDictFunctionsMixin, storage_registry
 from ultros.core.storage.config.base import MutableConfigFile
 
 __author__ = "Gareth Coles"
 
 
+@storage_registry.register()
 class JSONConfig(MutableConfigFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunctionsMixin):
     """
     Class for JSON-based configurations
@@ -32,8 +33,12 @@ class JSONConfig(MutableConfigFile, MutableAbstractItemAccessMixin, MutableAbstr
         if not self.mutable:
             raise RuntimeError("You may not modify a defaults file at runtime - check the mutable attribute!")
 
-        with open(self.path, "w") as fh:
-            json.dump(self.data, fh, indent=2)
+        self.dump(self.path, self.data)
+
+    @staticmethod
+    def dump(path: str, data: Any):
+        with open(path, "w") as fh:
+            json.dump(data, fh, indent=2)
 
     def reload(self):
         self.unload()
@@ -9,12 +9,13 @@ import runpy
 from typing import Any, List, Dict
 
 from ultros.core.storage import manager as m
-from ultros.core.storage.base import AbstractItemAccessMixin, AbstractDictFunctionsMixin
+from ultros.core.storage.base import AbstractItemAccessMixin, AbstractDictFunctionsMixin, storage_registry
 from ultros.core.storage.config.base import ConfigFile
 
 __author__ = "Gareth Coles"
 
 
+@storage_registry.register()
 class PythonConfig(ConfigFile, AbstractItemAccessMixin, AbstractDictFunctionsMixin):
     """
     Class for Python-based configurations
@@ -32,11 +33,13 @@ class PythonConfig(ConfigFile, AbstractItemAccessMixin, AbstractDictFunctionsMix
         Note that we remove all entries of the form "\_\_x\_\_" to ensure we only get the data we want here.
         """
 
-        self.data = runpy.run_path(self.path)
+        data = runpy.run_path(self.path)
 
-        for key in self.data.copy().keys():
+        for key in data.copy().keys():
             if key.startswith("__") and key.endswith("__"):
-                del self.data[key]
+                del data[key]
+
+        self.data = data
 
     def reload(self):
         self.unload()
@@ -9,12 +9,13 @@ import toml
 from typing import Any, List, Dict
 
 from ultros.core.storage import manager as m
-from ultros.core.storage.base import AbstractItemAccessMixin, AbstractDictFunctionsMixin
+from ultros.core.storage.base import AbstractItemAccessMixin, AbstractDictFunctionsMixin, storage_registry
 from ultros.core.storage.config.base import ConfigFile
 
 __author__ = "Gareth Coles"
 
 
+@storage_registry.register()
 class TOMLConfig(ConfigFile, AbstractItemAccessMixin, AbstractDictFunctionsMixin):
     """
     Class for TOML-based configurations
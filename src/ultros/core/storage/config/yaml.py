@@ -9,12 +9,13 @@ from ruamel import yaml
 from typing import Any, List, Dict
 
 from ultros.core.storage import manager as m
-from ultros.core.storage.base import AbstractItemAccessMixin, AbstractDictFunctionsMixin
+from ultros.core.storage.base import AbstractItemAccessMixin, AbstractDictFunctionsMixin, storage_registry
 from ultros.core.storage.config.base import ConfigFile
 
 __author__ = "Gareth Coles"
 
 
+@storage_registry.register()
 class YAMLConfig(ConfigFile, AbstractItemAccessMixin, AbstractDictFunctionsMixin):
     """
     Class for YAML-based (non-roundtrip) configurations
@@ -21,12 +21,13 @@ from ruamel import yaml
 from ruamel.yaml.comments import CommentedMap, NoComment
 
 from ultros.core.storage import manager as m
-from ultros.core.storage.base import MutableAbstractDictFunctionsMixin, MutableAbstractItemAccessMixin
+from ultros.core.storage.base import MutableAbstractDictFunctionsMixin, MutableAbstractItemAccessMixin, storage_registry
 from ultros.core.storage.config.base import MutableConfigFile
 
 __author__ = "Gareth Coles"
 
 
+@storage_registry.register()
 class YAMLRoundtripConfig(MutableConfigFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunctionsMixin):
     """
     Class for YAML-based (roundtrip) configurations
@@ -55,6 +56,9 @@ class YAMLRoundtripConfig(MutableConfigFile, MutableAbstractItemAccessMixin, Mut
         with open(self.path, "w") as fh:
             yaml.round_trip_dump(self.data, fh)
 
+    # No `dump()` here - comments are kept in slots on the CommentedMap, which don't survive the pickled snapshot,
+    # so `asave()` falls back to `save()` in a worker thread
+
     # region: CommentedMap functions
 
     def insert(self, pos, key, value, *, comment=None):
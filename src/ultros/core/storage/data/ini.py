@@ -9,12 +9,13 @@ from configparser import ConfigParser, _UNSET
 from typing import Any, List, Dict, Union
 
 from ultros.core.storage import manager as m
-from ultros.core.storage.base import MutableAbstractItemAccessMixin
+from ultros.core.storage.base import MutableAbstractItemAccessMixin, storage_registry
 from ultros.core.storage.data.base import DataFile
 
 __author__ = "Gareth Coles"
 
 
+@storage_registry.register()
 class INIData(DataFile, MutableAbstractItemAccessMixin):
     """
     Class for INI-based data files
@@ -25,19 +26,27 @@ class INIData(DataFile, MutableAbstractItemAccessMixin):
 
     def load(self):
         if os.path.exists(self.path):
-            self.data = ConfigParser()
-            self.data.read(self.path)
+            data = ConfigParser()
+            data.read(self.path)
+
+            self.data = data
 
     def reload(self):
         self.unload()
         self.load()
+        self.dirty = False
 
     def unload(self):
         del self.data
 
     def save(self):
-        with open(self.path, "w") as fh:
-            self.data.write(fh)
+        self.dump(self.path, self.data)
+        self.dirty = False
+
+    @staticmethod
+    def dump(path: str, data: ConfigParser):
+        with open(path, "w") as fh:
+            data.write(fh)
 
     # region: ConfigParser methods
 
@@ -57,6 +66,7 @@ class INIData(DataFile, MutableAbstractItemAccessMixin):
         The name of the section must be a string, otherwise `TypeError` is raised.
         """
 
+        self.dirty = True
         return self.data.add_section(section)
 
     def has_section(self, section: str):
@@ -141,6 +151,7 @@ class INIData(DataFile, MutableAbstractItemAccessMixin):
         Note that `option` and `value` must be strings - if not, `TypeError` is raised.
         """
 
+        self.dirty = True
         return self.data.set(section, option, value)
 
     def remove_option(self, section: str, option: str):
@@ -151,6 +162,7 @@ class INIData(DataFile, MutableAbstractItemAccessMixin):
         If the option existed, returns `True`, otherwise returns `False`.
         """
 
+        self.dirty = True
         return self.data.remove_option(section, option)
 
     def remove_section(self, section: str):
@@ -160,6 +172,7 @@ class INIData(DataFile, MutableAbstractItemAccessMixin):
         If the section existed, returns `True`, otherwise returns `False`.
         """
 
+        self.dirty = True
         return self.data.remove_section(section)
 
     # endregion
@@ -215,6 +228,8 @@ class INIData(DataFile, MutableAbstractItemAccessMixin):
         and `remove_option`.
         """
 
+        self.dirty = True
+
         if isinstance(item, slice):  # x[section:option]
             return self.remove_option(item.start, item.stop)
 
@@ -241,6 +256,8 @@ class INIData(DataFile, MutableAbstractItemAccessMixin):
         >>>
         """
 
+        self.dirty = True
+
         if isinstance(item, slice):
             return self.set(item.start, item.stop, value)
         elif isinstance(item, str):
@@ -10,13 +10,14 @@ import os
 from typing import Any, List, Dict
 
 from ultros.core.storage import manager as m
-from ultros.core.storage.base import MutableAbstractItemAccessMixin, MutableAbstractDictFunctionsMixin
+from ultros.core.storage.base import MutableAbstractItemAccessMixin, MutableAbstractDictFunctionsMixin, storage_registry
 from ultros.core.storage.data.base import DataFile
 
 
 __author__ = "Gareth Coles"
 
 
+@storage_registry.register()
 class JSONData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunctionsMixin):
     """
     Class for JSON-based data files
@@ -34,12 +35,18 @@ class JSONData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
             self.data = {}
 
     def save(self):
-        with open(self.path, "w") as fh:
-            json.dump(self.data, fh, indent=2)
+        self.dump(self.path, self.data)
+        self.dirty = False
+
+    @staticmethod
+    def dump(path: str, data: Any):
+        with open(path, "w") as fh:
+            json.dump(data, fh, indent=2)
 
     def reload(self):
         self.unload()
         self.load()
+        self.dirty = False
 
     def unload(self):
         self.clear()
@@ -47,6 +54,7 @@ class JSONData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
     # region: Dict functions
 
     def clear(self):
+        self.dirty = True
         return self.data.clear()
 
     def copy(self):
@@ -62,12 +70,16 @@ class JSONData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         return self.data.keys()
 
     def pop(self, key, default=None):
+        self.dirty = True
         return self.data.pop(key, default)
 
     def popitem(self):
+        self.dirty = True
         return self.data.popitem()
 
     def setdefault(self, key, default=None):
+        self.dirty = True
+
         if key not in self.data:
             self.data[key] = default
             return default
@@ -75,6 +87,7 @@ class JSONData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         return self.data[key]
 
     def update(self, other):
+        self.dirty = True
         return self.data.update(other)
 
     def values(self):
@@ -96,6 +109,7 @@ class JSONData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         Wrapper for `dict.__delitem__()`
         """
 
+        self.dirty = True
         del self.data[key]
 
     def __getitem__(self, key):
@@ -124,4 +138,5 @@ class JSONData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         Wrapper for `dict.__getitem__()`
         """
 
+        self.dirty = True
         return self.data.__setitem__(key, value)
@@ -9,12 +9,13 @@ import toml
 from typing import Any, List, Dict
 
 from ultros.core.storage import manager as m
-from ultros.core.storage.base import MutableAbstractDictFunctionsMixin, MutableAbstractItemAccessMixin
+from ultros.core.storage.base import MutableAbstractDictFunctionsMixin, MutableAbstractItemAccessMixin, storage_registry
 from ultros.core.storage.data.base import DataFile
 
 __author__ = "Gareth Coles"
 
 
+@storage_registry.register()
 class TOMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunctionsMixin):
     """
     Class for TOML-based data files
@@ -32,12 +33,18 @@ class TOMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
             self.data = {}
 
     def save(self):
-        with open(self.path, "w") as fh:
-            toml.dump(self.data, fh)
+        self.dump(self.path, self.data)
+        self.dirty = False
+
+    @staticmethod
+    def dump(path: str, data: Any):
+        with open(path, "w") as fh:
+            toml.dump(data, fh)
 
     def reload(self):
         self.unload()
         self.load()
+        self.dirty = False
 
     def unload(self):
         self.clear()
@@ -45,6 +52,7 @@ class TOMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
     # region: Dict functions
 
     def clear(self):
+        self.dirty = True
         return self.data.clear()
 
     def copy(self):
@@ -60,12 +68,16 @@ class TOMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         return self.data.keys()
 
     def pop(self, key, default=None):
+        self.dirty = True
         return self.data.pop(key, default)
 
     def popitem(self):
+        self.dirty = True
         return self.data.popitem()
 
     def setdefault(self, key, default=None):
+        self.dirty = True
+
         if key not in self.data:
             self.data[key] = default
             return default
@@ -73,6 +85,7 @@ class TOMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         return self.data[key]
 
     def update(self, other):
+        self.dirty = True
         return self.data.update(other)
 
     def values(self):
@@ -94,6 +107,7 @@ class TOMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         Wrapper for `dict.__delitem__()`
         """
 
+        self.dirty = True
         del self.data[key]
 
     def __getitem__(self, key):
@@ -122,4 +136,5 @@ class TOMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         Wrapper for `dict.__getitem__()`
         """
 
+        self.dirty = True
         return self.data.__setitem__(key, value)
@@ -9,17 +9,20 @@ from ruamel import yaml
 from typing import Any, List, Dict
 
 from ultros.core.storage import manager as m
-from ultros.core.storage.base import MutableAbstractDictFunctionsMixin, MutableAbstractItemAccessMixin
+from ultros.core.storage.base import MutableAbstractDictFunctionsMixin, MutableAbstractItemAccessMixin, storage_registry
 from ultros.core.storage.data.base import DataFile
 
 __author__ = "Gareth Coles"
 
 
+@storage_registry.register()
 class YAMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunctionsMixin):
     """
     Class for YAML-based data files
     """
 
+    process_pool = True
+
     def __init__(self, owner: Any, manager: "m.StorageManager", path: str, *args: List[Any], **kwargs: Dict[Any, Any]):
         self.data = {}
 
@@ -33,12 +36,18 @@ class YAMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
             self.data = {}
 
     def save(self):
-        with open(self.path, "w") as fh:
-            yaml.dump(self.data, fh)
+        self.dump(self.path, self.data)
+        self.dirty = False
+
+    @staticmethod
+    def dump(path: str, data: Any):
+        with open(path, "w") as fh:
+            yaml.dump(data, fh)
 
     def reload(self):
         self.unload()
         self.load()
+        self.dirty = False
 
     def unload(self):
         self.clear()
@@ -46,6 +55,7 @@ class YAMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
     # region: Dict functions
 
     def clear(self):
+        self.dirty = True
         return self.data.clear()
 
     def copy(self):
@@ -61,12 +71,16 @@ class YAMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         return self.data.keys()
 
     def pop(self, key, default=None):
+        self.dirty = True
         return self.data.pop(key, default)
 
     def popitem(self):
+        self.dirty = True
         return self.data.popitem()
 
     def setdefault(self, key, default=None):
+        self.dirty = True
+
         if key not in self.data:
             self.data[key] = default
             return default
@@ -74,6 +88,7 @@ class YAMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         return self.data[key]
 
     def update(self, other):
+        self.dirty = True
         return self.data.update(other)
 
     def values(self):
@@ -95,6 +110,7 @@ class YAMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         Wrapper for `dict.__delitem__()`
         """
 
+        self.dirty = True
         del self.data[key]
 
     def __getitem__(self, key):
@@ -123,4 +139,5 @@ class YAMLData(DataFile, MutableAbstractItemAccessMixin, MutableAbstractDictFunc
         Wrapper for `dict.__getitem__()`
         """
 
+        self.dirty = True
         return self.data.__setitem__(key, value)
@@ -4,6 +4,7 @@ SQLAlchemy-based class for relational databases, powered by SQLAlchemy-AIO
 """
 
 from typing import Any, List, Dict, Coroutine
+from ultros.core.storage.base import storage_registry
 from ultros.core.storage.database.base import RelationalDatabase
 
 from sqlalchemy_aio import ASYNCIO_STRATEGY
@@ -12,6 +13,7 @@ from sqlalchemy import MetaData, create_engine
 __author__ = "Gareth Coles"
 
 
+@storage_registry.register()
 class SQLADatabase(RelationalDatabase):
     """
     SQLAlchemy-based class for relational databases, powered by SQLAlchemy-AIO
@@ -62,6 +64,24 @@ class SQLADatabase(RelationalDatabase):
 
         self.metadata = MetaData()
 
+    def pool_stats(self) -> Dict[str, int]:
+        if self.engine is None:
+            return {}
+
+        # The synchronous engine that sqlalchemy_aio wraps, which owns the pool
+        engine = getattr(self.engine, "sync_engine", None) or getattr(self.engine, "_engine", None)
+        pool = getattr(engine, "pool", None)
+        stats = {}
+
+        for key, name in (("size", "size"), ("checked_in", "checkedin"), ("checked_out", "checkedout"),
+                          ("overflow", "overflow")):
+            func = getattr(pool, name, None)
+
+            if func is not None:
+                stats[key] = func()
+
+        return stats
+
     def unload(self):
         self.metadata.clear()
 
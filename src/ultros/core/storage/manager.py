@@ -9,31 +9,34 @@ elsewhere.
 
 # TODO: Where to get the instance
 
-import importlib
-import inspect
+import asyncio
 import os
-from typing import Optional, Any, Dict, List, Union
+import pickle
+
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Optional, Any, Dict, Iterable, List, Union
 
 import logging
 
 from ultros.core import main as u
+from ultros.core import metrics as m
 
-from ultros.core.storage.base import FileStorageBase, MutableFileStorageBase, AbstractItemAccessMixin, \
-    MutableAbstractItemAccessMixin, AbstractDictFunctionsMixin, MutableAbstractDictFunctionsMixin, StorageBase, \
-    DatabaseStorageBase
-from ultros.core.storage.config.base import ConfigFile, MutableConfigFile
+from ultros.core.storage.base import FileStorageBase, MutableFileStorageBase, DatabaseStorageBase, storage_registry
 from ultros.core.storage.data.base import DataFile
-from ultros.core.storage.database.base import RelationalDatabase, OtherDatabase, DocumentOrientedDatabase
 from ultros.core.storage.exceptions import UnknownFormatError, UnsupportedFormatError
 from ultros.core.storage.formats import FileFormats, DatabaseFormats
 
 __author__ = "Gareth Coles"
 
-BASE_CLASSES = [
-    FileStorageBase, MutableFileStorageBase, AbstractItemAccessMixin, MutableAbstractItemAccessMixin,
-    AbstractDictFunctionsMixin, MutableAbstractDictFunctionsMixin, ConfigFile, MutableConfigFile, DataFile,
-    StorageBase, DatabaseStorageBase, RelationalDatabase, DocumentOrientedDatabase, OtherDatabase
-]
+
+def _save_snapshot(cls: type, path: str, snapshot: bytes):
+    """
+    Write a snapshot taken by `MutableFileStorageBase.snapshot()` with the class's `dump()`. This is run in a worker
+    thread or process, so it's given the class rather than the storage object.
+    """
+
+    cls.dump(path, pickle.loads(snapshot))
 
 
 class StorageManager:
@@ -59,6 +62,10 @@ class StorageManager:
     :ivar data_location: Path (str) to a directory containing data files
 
     :ivar file_formats: A FileFormats object representing all supported formats
+
+    Files can also be loaded and saved without blocking the event loop, with `aload()` and `asave()` on the storage
+    objects. The work is done in the event loop's default executor, or a process pool for big files in some formats
+    (see `process_pool_threshold`). Only one load or save of each file runs at a time.
     """
 
     config_location = None
@@ -72,6 +79,15 @@ class StorageManager:
 
     ultros = None
 
+    #: Optional[Histogram]: Time taken to load storage objects, by kind - only set if metrics are enabled
+    load_time = None
+    #: Optional[Histogram]: Time taken to save files, by kind - only set if metrics are enabled
+    save_time = None
+
+    #: Optional[int]: Files at least this many bytes big (as last saved) are saved in a separate process by
+    #: `asave()`, if their format sets `process_pool`. None to never use a separate process.
+    process_pool_threshold = 1024 * 1024
+
     def __init__(self, ultros: "u.Ultros", config_location: str,
                  data_location: str):
         """
@@ -91,14 +107,194 @@ class StorageManager:
         self.config_files = {}
         self.databases = {}
 
+        self._file_locks = {}  #: Dict[str, asyncio.Lock]: Path -> lock held while the file is loaded or saved
+        self._queued_saves = {}  #: Dict[str, asyncio.Future]: Path -> save waiting for the lock, to be shared
+        self._process_pool = None  #: Optional[ProcessPoolExecutor]: Created when it's first needed
+
     def shutdown(self):
         try:
             self.unload_all()
         except Exception as e:
             self.log.error("Error raised while unloading everything: %s", e)  # TODO: Logging
 
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+
         self.ultros = None
 
+    def register_metrics(self, metrics: "m.Metrics"):
+        """
+        Start reporting how long storage objects take to load and save, how many are loaded, and the connection
+        pool stats of each database.
+        """
+
+        self.load_time = metrics.histogram(
+            "ultros_storage_load_seconds", "Time taken to load storage objects, by kind", ["kind"]
+        )
+        self.save_time = metrics.histogram(
+            "ultros_storage_save_seconds", "Time taken to save files, by kind", ["kind"]
+        )
+
+        metrics.add_collector(self.collect_metrics)
+
+    def collect_metrics(self) -> Iterable["m.Metric"]:
+        loaded = m.Gauge("ultros_storage_loaded", "Storage objects currently loaded, by kind", ["kind"])
+
+        loaded.labels("config").set(len(self.config_files))
+        loaded.labels("data").set(len(self.data_files))
+        loaded.labels("database").set(len(self.databases))
+
+        yield loaded
+
+        pools = {}  # Stat -> gauge
+
+        for url, obj in self.databases.items():
+            for key, value in obj.pool_stats().items():
+                gauge = pools.get(key)
+
+                if gauge is None:
+                    gauge = pools[key] = m.Gauge(
+                        "ultros_database_pool_{}".format(key),
+                        "Database connection pool: {}".format(key.replace("_", " ")), ["database"]
+                    )
+
+                gauge.labels(self._safe_url(url)).set(value)
+
+        yield from pools.values()
+
+    @staticmethod
+    def _safe_url(url: str) -> str:
+        # Leave out any password, since metrics are often less private than config
+        scheme, sep, rest = url.partition("://")
+        credentials, at, host = rest.rpartition("@")
+
+        if not at:
+            return url
+
+        return "{}{}{}@{}".format(scheme, sep, credentials.split(":", 1)[0], host)
+
+    def _load(self, obj: Union[FileStorageBase, DatabaseStorageBase], kind: str):
+        if self.load_time is None:
+            obj.load()
+            return
+
+        start = perf_counter()
+        obj.load()
+        self.load_time.labels(kind).observe(perf_counter() - start)
+
+    @staticmethod
+    def _kind(obj: FileStorageBase) -> str:
+        return "data" if isinstance(obj, DataFile) else "config"
+
+    def save_file(self, obj: MutableFileStorageBase):
+        """
+        Save a file, timing it if metrics are enabled. Files are saved through this when their context manager
+        exits.
+        """
+
+        if self.save_time is None:
+            obj.save()
+            return
+
+        start = perf_counter()
+
+        obj.save()
+        self.save_time.labels(self._kind(obj)).observe(perf_counter() - start)
+
+    # region: Non-blocking file access
+
+    def _get_lock(self, path: str) -> asyncio.Lock:
+        lock = self._file_locks.get(path)
+
+        if lock is None:
+            lock = self._file_locks[path] = asyncio.Lock()
+
+        return lock
+
+    def _get_executor(self, obj: MutableFileStorageBase) -> Optional[ProcessPoolExecutor]:
+        """
+        Get the process pool if a file should be saved in it, or None for the default executor.
+        """
+
+        if not obj.process_pool or self.process_pool_threshold is None:
+            return None
+
+        try:
+            if os.path.getsize(obj.path) < self.process_pool_threshold:
+                return None
+        except OSError:  # Not saved yet
+            return None
+
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=1)
+
+        return self._process_pool
+
+    async def aload_file(self, obj: FileStorageBase):
+        """
+        Load a file in the event loop's default executor, timing it if metrics are enabled. If the file is being
+        saved, this waits for that to finish first. Files are loaded through this by their `aload()`.
+        """
+
+        loop = asyncio.get_event_loop()
+
+        async with self._get_lock(obj.path):
+            start = perf_counter()
+            await loop.run_in_executor(None, obj.load)
+
+            if self.load_time is not None:
+                self.load_time.labels(self._kind(obj)).observe(perf_counter() - start)
+
+    async def asave_file(self, obj: MutableFileStorageBase):
+        """
+        Save a file without blocking the event loop, timing it if metrics are enabled. Files are saved through this
+        by their `asave()` - see `MutableFileStorageBase` for how it works.
+
+        Saves of the same file are run one at a time. If a save is already waiting for its turn, this waits for
+        that one instead of queueing another, since it'll take its snapshot later and pick up any changes made
+        since then anyway.
+        """
+
+        queued = self._queued_saves.get(obj.path)
+
+        if queued is None:
+            queued = self._queued_saves[obj.path] = asyncio.ensure_future(self._asave_file(obj))
+
+        # Shielded, so that one caller being cancelled doesn't cancel the save for everyone waiting on it
+        await asyncio.shield(queued)
+
+    async def _asave_file(self, obj: MutableFileStorageBase):
+        loop = asyncio.get_event_loop()
+
+        async with self._get_lock(obj.path):
+            # The snapshot is taken from here on, so later changes need a save of their own
+            del self._queued_saves[obj.path]
+
+            start = perf_counter()
+            func, args, executor = obj.save, (), None
+
+            if type(obj).dump is not MutableFileStorageBase.dump:
+                try:
+                    args = (type(obj), obj.path, obj.snapshot())
+                except (pickle.PicklingError, TypeError, AttributeError) as e:
+                    self.log.debug("Unable to take a snapshot of %s, saving it directly: %s", obj.path, e)
+                else:
+                    func, executor = _save_snapshot, self._get_executor(obj)
+
+            obj.dirty = False
+
+            try:
+                await loop.run_in_executor(executor, func, *args)
+            except BaseException:
+                obj.dirty = True
+                raise
+
+            if self.save_time is not None:
+                self.save_time.labels(self._kind(obj)).observe(perf_counter() - start)
+
+    # endregion
+
     def get_config(self, path: str, owner: Any=None, fmt: Optional[str]=None,
                    defaults_path: Optional[Union[str, bool]]=None,
                    *args: List[Any], **kwargs: Dict[Any, Any]
@@ -159,7 +355,7 @@ class StorageManager:
 
         try:
             obj = format_cls(owner, self, path, *args, **kwargs)
-            obj.load()
+            self._load(obj, "config")
         except FileNotFoundError:  # Handle default config files
             if defaults_path is None:
                 return self.get_config(
@@ -230,7 +426,7 @@ class StorageManager:
 
         format_cls = self.get_class(_fmt)
         obj = format_cls(owner, self, path, *args, **kwargs)
-        obj.load()
+        self._load(obj, "data")
 
         self.log.debug("Loaded new data file: %s -> %s", path, obj)
         self.data_files[path] = obj
@@ -269,7 +465,7 @@ class StorageManager:
 
         format_cls = self.get_class(_fmt)
         obj = format_cls(owner, self, url, *args, **kwargs)
-        obj.load()
+        self._load(obj, "database")
 
         self.log.debug("Loaded new database file: %s -> %s", url, obj)
         self.databases[url] = obj
@@ -388,23 +584,53 @@ class StorageManager:
         for url, obj in self.databases.copy().items():
             self.unload_database(url)
 
-    def get_class(self, package: str) -> Union[type(FileStorageBase), type(DatabaseStorageBase), None]:
+    async def flush(self) -> int:
+        """
+        Save every data file that has been changed since it was loaded or last saved, all at once. Files are saved
+        with `asave_file()`, so the event loop isn't blocked while they're written.
+
+        :return: The number of files that were saved
+        """
+
+        files = [obj for obj in self.data_files.values() if getattr(obj, "dirty", False) and obj.mutable]
+
+        if not files:
+            return 0
+
+        results = await asyncio.gather(*(self.asave_file(obj) for obj in files), return_exceptions=True)
+
+        saved = 0
+
+        for obj, result in zip(files, results):
+            if isinstance(result, Exception):
+                self.log.error("Failed to save data file %s: %s", obj.path, result)
+            else:
+                saved += 1
+
+        self.log.debug("Saved %s data files", saved)
+        return saved
+
+    def unsaved_files(self) -> List[str]:
+        """
+        Get the paths of the data files that have been changed since they were last saved, or that are waiting to be
+        saved or being saved right now.
         """
-        Load a storage object class by searching for it within a given module.
 
-        This will traverse the members of the module, looking for the first
-        class that subclasses StorageBase, and returns the class object (not
-        an instance of the class).
+        return [
+            obj.path for obj in self.data_files.values()
+            if getattr(obj, "dirty", False) or obj.path in self._queued_saves or self._get_lock(obj.path).locked()
+        ]
 
-        :param package: The module to search within
-        :return: The discovered class, or None if no eligible class was found
+    def get_class(self, package: str) -> Union[type(FileStorageBase), type(DatabaseStorageBase), None]:
         """
+        Get the storage object class defined in a given module.
 
-        module = importlib.import_module(package)
+        The module is only imported the first time one of its classes is
+        needed, and the class is looked up in the storage registry - see
+        `ultros.core.registry` and `ultros.core.storage.base.storage_registry`.
+
+        :param package: The module containing the class
+        :return: The class (not an instance of it), or None if no eligible class was found
+        """
 
-        for name, format_cls in inspect.getmembers(module):
-            if inspect.isclass(format_cls):
-                if format_cls not in BASE_CLASSES:
-                    for parent in inspect.getmro(format_cls):
-                        if parent == StorageBase:
-                            return format_cls
+        return storage_registry.get(package)
@@ -0,0 +1,369 @@
+# coding=utf-8
+
+"""
+A supervisor that spreads networks across several worker processes.
+
+Each worker runs its own `Ultros` instance, responsible for a share of the networks listed in `settings.yml`, so
+CPU-heavy plugin work on one network doesn't hold up the others. The supervisor:
+
+* Forwards SIGTERM and SIGINT (and SIGBREAK on Windows) to the workers as SIGTERM, so they shut down gracefully.
+  Workers ignore SIGINT themselves, so pressing CTRL+C doesn't shut them down twice.
+* Restarts workers that crash, waiting longer after each crash in a row - up to `max_restart_delay` - so a worker
+  that can't start doesn't spin. A worker that has been running for `stable_time` is considered healthy again.
+* Collects stats that each worker sends every `stats_interval` seconds, and logs a summary just as often.
+
+Run it with `python -m ultros.core supervise`.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection, wait
+from time import monotonic
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+__author__ = "Gareth Coles"
+
+
+def assign_networks(networks: Iterable[str], workers: int) -> List[List[str]]:
+    """
+    Split a list of networks between workers, round-robin, so each network is always given to the same worker.
+    There are never more workers than networks.
+
+    :return: A list of networks for each worker
+    """
+
+    networks = list(networks)
+    workers = max(1, min(workers, len(networks)))
+
+    return [networks[index::workers] for index in range(workers)]
+
+
+def get_worker_stats(ultros, started: float) -> Dict[str, Any]:
+    """
+    Collect the stats a worker sends to the supervisor.
+
+    :param ultros: The worker's `Ultros` instance
+    :param started: When the worker started, from `time.monotonic()`
+    """
+
+    times = os.times()
+    networks = {}
+
+    if ultros.network_manager:
+        networks = {name: status.ready for name, status in ultros.network_manager.statuses.items()}
+
+    return {
+        "pid": os.getpid(),
+        "uptime": monotonic() - started,
+        "cpu_time": times.user + times.system,
+        "networks": networks
+    }
+
+
+async def _report_stats(ultros, connection: Connection, interval: float):
+    started = monotonic()
+
+    while ultros.network_manager:
+        try:
+            connection.send(get_worker_stats(ultros, started))
+        except (BrokenPipeError, EOFError, OSError):
+            return  # The supervisor has gone away
+
+        await asyncio.sleep(interval)
+
+
+def _worker_main(target: Callable, *args: Any):
+    """
+    Run a worker's target function, after resetting the signal handlers it inherited from the supervisor.
+    """
+
+    # Forked workers inherit the supervisor's signal handlers, which must never run here - so reset them before
+    # doing anything else. Until the target sets up its own, SIGTERM just ends the process.
+    # The supervisor forwards CTRL+C to us as SIGTERM, so SIGINT is ignored.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    if hasattr(signal, "SIGBREAK"):  # Windows only
+        signal.signal(signal.SIGBREAK, signal.SIG_DFL)
+
+    target(*args)
+
+
+def run_worker(config_dir: str, data_dir: str, networks: List[str], connection: Connection,
+               stats_interval: float):
+    """
+    The entry point for a worker process - runs an `Ultros` instance for some of the networks, until it's shut
+    down with SIGTERM.
+    """
+
+    from ultros.core.main import Ultros  # Not needed by the supervisor itself
+
+    ultros = Ultros(config_dir, data_dir, handle_signals=False, network_names=networks)
+    signal.signal(signal.SIGTERM, ultros._sigterm)
+
+    ultros.setup()
+    asyncio.ensure_future(_report_stats(ultros, connection, stats_interval), loop=ultros.event_loop)
+    ultros.run()
+
+
+class Worker:
+    """
+    A worker process, and everything the supervisor knows about it.
+
+    :ivar index: The worker's position in the supervisor's list of workers
+    :ivar networks: The names of the networks the worker is responsible for
+    """
+
+    def __init__(self, index: int, networks: List[str]):
+        self.index = index
+        self.networks = networks
+
+        self.process = None  #: Optional[Process]
+        self.connection = None  #: Optional[Connection]: Our end of the pipe the worker sends stats down
+
+        self.started = None  #: Optional[float]: When the current process was started
+        self.restarts = 0  #: int: How many times the worker has been restarted
+        self.failures = 0  #: int: How many times the worker has crashed in a row
+        self.restart_at = None  #: Optional[float]: When the worker is due to be restarted, if it crashed
+        self.stats = {}  #: Dict[str, Any]: The latest stats the worker sent
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    @property
+    def name(self) -> str:
+        return "worker-{}".format(self.index)
+
+
+class Supervisor:
+    """
+    Runs the networks in several worker processes, restarting any that crash.
+
+    :param config_dir: Directory containing configuration files
+    :param data_dir: Directory to contain data files
+    :param networks: The names of the networks to run
+    :param workers: How many worker processes to spread the networks across, or None for one per CPU core. There
+                    are never more workers than networks.
+    :param restart_delay: How long to wait before restarting a worker that crashed, in seconds
+    :param max_restart_delay: The longest to wait before restarting a worker that keeps crashing, in seconds
+    :param stable_time: How long a worker needs to run before it's no longer considered to be crashing repeatedly
+    :param stats_interval: How often workers send their stats, and how often a summary is logged, in seconds
+    :param shutdown_timeout: How long to give workers to shut down before killing them, in seconds
+    :param target: The function to run in each worker process - see `run_worker()`. It's always run with the
+                   supervisor's signal handlers reset, so it only needs to install its own.
+    """
+
+    def __init__(self, config_dir: str, data_dir: str, networks: Iterable[str], workers: Optional[int]=None, *,
+                 restart_delay: float=1.0, max_restart_delay: float=60.0, stable_time: float=60.0,
+                 stats_interval: float=30.0, shutdown_timeout: float=30.0, target: Callable=run_worker):
+        self.log = logging.getLogger(__name__)  # TODO: Proper logging
+
+        self.config_dir = config_dir
+        self.data_dir = data_dir
+
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stable_time = stable_time
+        self.stats_interval = stats_interval
+        self.shutdown_timeout = shutdown_timeout
+        self.target = target
+
+        self.workers = [
+            Worker(index, names) for index, names in enumerate(assign_networks(networks, workers or os.cpu_count()))
+        ]
+
+        self.stopping = False
+        self._stop_deadline = None  #: Optional[float]: When to kill workers that haven't shut down yet
+
+    # region: Worker management
+
+    def start_worker(self, worker: Worker):
+        connection, worker_connection = Pipe(duplex=False)
+
+        worker.process = Process(
+            target=_worker_main, name=worker.name,
+            args=(self.target, self.config_dir, self.data_dir, worker.networks, worker_connection, self.stats_interval)
+        )
+
+        worker.process.start()
+        worker_connection.close()  # The worker has its own copy now
+
+        worker.connection = connection
+        worker.started = monotonic()
+        worker.restart_at = None
+
+        self.log.info("Started %s (pid %s): %s", worker.name, worker.process.pid, ", ".join(worker.networks))
+
+    def worker_exited(self, worker: Worker):
+        exitcode = worker.process.exitcode
+        worker.connection.close()
+        worker.connection = None
+
+        if self.stopping:
+            self.log.info("%s stopped", worker.name)
+            return
+
+        if exitcode == 0:
+            self.log.info("%s shut down", worker.name)
+            return
+
+        if monotonic() - worker.started >= self.stable_time:
+            worker.failures = 0
+
+        delay = min(self.max_restart_delay, self.restart_delay * 2 ** min(worker.failures, 32))
+
+        worker.failures += 1
+        worker.restart_at = monotonic() + delay
+
+        self.log.warning("%s exited with code %s; restarting in %.1fs", worker.name, exitcode, delay)
+
+    def _receive_stats(self, worker: Worker):
+        try:
+            while worker.connection.poll():
+                worker.stats = worker.connection.recv()
+        except (EOFError, OSError):
+            pass  # The worker exited; its sentinel will tell us
+
+    # endregion
+
+    # region: Signals
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGINT, self._signal)
+        signal.signal(signal.SIGTERM, self._signal)
+
+        if hasattr(signal, "SIGBREAK"):  # Windows only
+            signal.signal(signal.SIGBREAK, self._signal)
+
+    def _signal(self, signum, _):
+        self.log.debug("Signal %s caught.", signum)
+        self.stop()
+
+    def stop(self):
+        """
+        Ask every worker to shut down, and stop restarting them. Workers that haven't shut down after
+        `shutdown_timeout` seconds are killed.
+        """
+
+        if not self.stopping:
+            self.log.info("Stopping workers...")
+
+            self.stopping = True
+            self._stop_deadline = monotonic() + self.shutdown_timeout
+
+        for worker in self.workers:
+            worker.restart_at = None
+
+            if worker.alive:
+                worker.process.terminate()
+
+    # endregion
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the latest stats from every worker, along with totals.
+        """
+
+        workers = {}
+
+        for worker in self.workers:
+            workers[worker.name] = dict(
+                worker.stats, alive=worker.alive, restarts=worker.restarts, assigned=list(worker.networks)
+            )
+
+        networks = {}
+
+        for worker in self.workers:
+            if worker.alive:
+                networks.update(worker.stats.get("networks", {}))
+
+        return {
+            "workers": workers,
+            "workers_alive": sum(1 for worker in self.workers if worker.alive),
+            "networks": sum(len(worker.networks) for worker in self.workers),
+            "networks_ready": sum(1 for ready in networks.values() if ready),
+            "restarts": sum(worker.restarts for worker in self.workers),
+            "cpu_time": sum(worker.stats.get("cpu_time", 0.0) for worker in self.workers)
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+
+        self.log.info(
+            "%s/%s workers alive, %s/%s networks ready, %s restarts, %.1fs CPU time",
+            stats["workers_alive"], len(self.workers), stats["networks_ready"], stats["networks"],
+            stats["restarts"], stats["cpu_time"]
+        )
+
+    def run(self) -> int:
+        """
+        Start the workers, and supervise them until they've all shut down.
+
+        :return: An exit code for the supervisor process
+        """
+
+        if not self.workers[0].networks:
+            self.log.warning("No networks have been configured!")
+            return 0
+
+        self.install_signal_handlers()
+
+        for worker in self.workers:
+            self.start_worker(worker)
+
+        next_stats = monotonic() + self.stats_interval
+
+        while any(worker.connection is not None or worker.restart_at is not None for worker in self.workers):
+            now = monotonic()
+            deadlines = [next_stats] + [worker.restart_at for worker in self.workers if worker.restart_at]
+
+            if self._stop_deadline is not None:
+                deadlines.append(self._stop_deadline)
+
+            waiting = {}
+
+            for worker in self.workers:
+                if worker.connection is not None:
+                    waiting[worker.process.sentinel] = worker
+                    waiting[worker.connection] = worker
+
+            ready = wait(list(waiting.keys()), timeout=max(0, min(deadlines) - now))
+
+            for obj in ready:
+                worker = waiting[obj]
+
+                if worker.connection is None:
+                    continue  # Handled already
+
+                self._receive_stats(worker)
+
+                if obj is worker.process.sentinel:
+                    worker.process.join()
+                    self.worker_exited(worker)
+
+            now = monotonic()
+
+            for worker in self.workers:
+                if worker.restart_at is not None and worker.restart_at <= now:
+                    worker.restarts += 1
+                    self.start_worker(worker)
+
+            if self._stop_deadline is not None and self._stop_deadline <= now:
+                for worker in self.workers:
+                    if worker.alive:
+                        self.log.warning("%s didn't shut down in time; killing it", worker.name)
+                        os.kill(worker.process.pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+
+                self._stop_deadline = None
+
+            if next_stats <= now:
+                self.log_stats()
+                next_stats = now + self.stats_interval
+
+        self.log_stats()
+        return 0
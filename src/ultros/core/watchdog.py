@@ -0,0 +1,193 @@
+# coding=utf-8
+
+"""
+A watchdog for the event loop.
+
+Everything in Ultros shares one event loop, so anything that blocks it - a slow storage call, a regex that takes
+too long, a handler that does a lot of work at once - holds up every network, sometimes for long enough that they
+miss a PING and get disconnected. The `LoopMonitor` finds these:
+
+* A task on the event loop wakes up every `interval` seconds, and measures how late it was woken - the loop's lag.
+* A thread watches for that task being late. If the loop hasn't got round to it for `threshold` seconds past when
+  it was due, the thread takes the stack of the event loop's thread - which is whatever is blocking it - and logs it
+  as a stall. The thread only looks at the stack, so this works even while the loop is stuck.
+
+Lag and stalls are also reported as metrics, if those are enabled. For even more detail, asyncio's debug mode can be
+turned on as well, which logs every callback that takes longer than the threshold - but it slows everything down, so
+it's off by default.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import traceback
+
+from collections import deque, namedtuple
+from time import monotonic
+from typing import List, Optional
+
+from ultros.core import metrics as m
+
+__author__ = "Gareth Coles"
+
+Stall = namedtuple("Stall", ["time", "duration", "stack"])
+Stall.__doc__ = """
+A time the event loop was blocked for longer than the threshold.
+
+:ivar time: When the stall was noticed, from `time.monotonic()`
+:ivar duration: How long the loop had been blocked when the stack was taken, in seconds
+:ivar stack: The stack of the event loop's thread at that point, formatted - or None if it couldn't be taken
+"""
+
+
+class LoopMonitor:
+    """
+    Measures event loop lag, and logs the stack of whatever is blocking the loop when it stalls. See the module
+    documentation.
+
+    :param loop: The event loop to watch
+    :param interval: How often to check the loop, in seconds
+    :param threshold: How far behind the loop needs to fall to be considered stalled, in seconds
+    :param asyncio_debug: Whether to turn on asyncio's debug mode as well, which logs every slow callback
+    :param history: How many stalls to keep in `stalls`
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float=0.5, threshold: float=0.25,
+                 asyncio_debug: bool=False, history: int=10):
+        self.log = logging.getLogger(__name__)  # TODO: Proper logging
+
+        self.loop = loop
+        self.interval = interval
+        self.threshold = threshold
+        self.asyncio_debug = asyncio_debug
+
+        self.lag = 0.0  #: float: The most recent lag measured, in seconds
+        self.max_lag = 0.0  #: float: The worst lag measured, in seconds
+        self.stalls = deque(maxlen=history)  #: Deque[Stall]: The most recent stalls, oldest first
+        self.stall_count = 0  #: int: How many stalls there have been
+
+        self.lag_time = None  #: Optional[Histogram]: Lag measurements, if metrics are enabled
+
+        self._heartbeat = None  #: Optional[float]: When the task last went to sleep, from `time.monotonic()`
+        self._reported = None  #: Optional[float]: The heartbeat we last reported a stall for
+        self._loop_thread = None  #: Optional[int]: The ident of the event loop's thread
+
+        self._task = None  #: Optional[asyncio.Task]
+        self._thread = None  #: Optional[threading.Thread]
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def register_metrics(self, metrics: "m.Metrics"):
+        """
+        Start reporting the loop's lag and stalls as metrics.
+        """
+
+        self.lag_time = metrics.histogram(
+            "ultros_event_loop_lag_seconds", "How late the event loop ran the watchdog's checks",
+            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+        ).labels()
+
+        metrics.add_collector(self.collect_metrics)
+
+    def collect_metrics(self) -> List["m.Metric"]:
+        stalls = m.Counter("ultros_event_loop_stalls_total", "Times the event loop was blocked for too long")
+        max_lag = m.Gauge("ultros_event_loop_max_lag_seconds", "The worst event loop lag so far")
+
+        stalls.labels().set(self.stall_count)
+        max_lag.labels().set(self.max_lag)
+
+        return [stalls, max_lag]
+
+    def start(self):
+        """
+        Start watching the loop. This must be called from the event loop's thread.
+        """
+
+        if self._task is not None:
+            return
+
+        if self.asyncio_debug:
+            self.loop.set_debug(True)
+            self.loop.slow_callback_duration = self.threshold
+
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = monotonic()
+        self._stopping.clear()
+
+        self._task = asyncio.ensure_future(self._run(), loop=self.loop)
+        self._thread = threading.Thread(target=self._watch, name="ultros-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        self._task = None
+
+        self._stopping.set()
+        self._thread = None
+
+    async def _run(self):
+        while True:
+            self._heartbeat = monotonic()
+            await asyncio.sleep(self.interval)
+
+            lag = max(0.0, monotonic() - self._heartbeat - self.interval)
+            self.lag = lag
+
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+            if self.lag_time is not None:
+                self.lag_time.observe(lag)
+
+            if lag >= self.threshold:
+                self.log.warning("Event loop lag: %.3fs", lag)
+
+    # region: Watchdog thread
+
+    def _watch(self):
+        # Check a few times per threshold, so stalls are caught not long after they pass it
+        period = min(self.interval, self.threshold) / 2
+
+        while not self._stopping.wait(period):
+            heartbeat = self._heartbeat
+            blocked = monotonic() - heartbeat - self.interval
+
+            if blocked >= self.threshold and self._reported != heartbeat:
+                self._reported = heartbeat
+                self._report_stall(blocked)
+
+    def _report_stall(self, blocked: float):
+        stack = self.get_loop_stack()
+        self.stalls.append(Stall(monotonic(), blocked, stack))
+        self.stall_count += 1
+
+        if stack is None:
+            self.log.warning("Event loop blocked for %.3fs", blocked)
+        else:
+            self.log.warning("Event loop blocked for %.3fs, running:\n%s", blocked, stack)
+
+    def get_loop_stack(self) -> Optional[str]:
+        """
+        Get the current stack of the event loop's thread, formatted.
+        """
+
+        frames = getattr(sys, "_current_frames", None)  # Not every Python implementation has this
+
+        if frames is None:
+            return None
+
+        frame = frames().get(self._loop_thread)
+
+        if frame is None:
+            return None
+
+        return "".join(traceback.format_stack(frame))
+
+    # endregion
@@ -0,0 +1,56 @@
+# coding=utf-8
+
+"""
+Jittered exponential backoff, for reconnecting.
+
+Each failed attempt doubles (by default) the delay before the next one, up
+to a maximum. The delay is jittered, so many connections that dropped at the
+same time - for example, every connection in a pool during a netsplit -
+don't all reconnect at the same moment.
+"""
+
+import random
+
+__author__ = "Gareth Coles"
+
+
+class Backoff:
+    """
+    Works out how long to wait before each reconnection attempt.
+
+    The delay for an attempt is `initial * multiplier ** attempts`, capped at `maximum`. With a `jitter` of 0.5,
+    the actual delay is picked at random from between half of that and all of it.
+
+    :param initial: The delay before the first attempt, in seconds
+    :param maximum: The longest delay, in seconds
+    :param multiplier: How much the delay grows with each failed attempt
+    :param jitter: The fraction of each delay to randomise, from 0 to 1
+    """
+
+    __slots__ = ("initial", "maximum", "multiplier", "jitter", "attempts")
+
+    def __init__(self, initial: float=1.0, maximum: float=300.0, multiplier: float=2.0, jitter: float=0.5):
+        self.initial = initial
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """
+        Get the delay before the next attempt, and count the attempt.
+        """
+
+        # The exponent is capped so the delay can't overflow after a very long outage
+        delay = min(self.maximum, self.initial * self.multiplier ** min(self.attempts, 64))
+        self.attempts += 1
+
+        return delay - random.uniform(0, delay * self.jitter)
+
+    def reset(self):
+        """
+        Start again from the initial delay - call this once a connection has succeeded.
+        """
+
+        self.attempts = 0
@@ -0,0 +1,54 @@
+# coding=utf-8
+
+"""
+IRCv3 message batches.
+
+When the `batch` capability is enabled, servers may group related lines -
+the QUITs from a netsplit, the JOINs when it heals, or chat history being
+played back - between `BATCH +reference` and `BATCH -reference` lines. Each
+line in the batch carries a `batch=reference` tag.
+
+The connector collects these lines into a `Batch` instead of dispatching them
+one at a time, and hands the whole batch to a single handler once it ends.
+Batches may be nested, in which case the inner batch is stored in the outer
+batch's `messages` in the position it was opened.
+"""
+
+from typing import List, Optional, Union
+
+from ultros.networks.irc.parser import IRCMessage
+
+__author__ = "Gareth Coles"
+
+
+class Batch:
+    """
+    A batch of lines from the server.
+
+    :ivar reference: The batch's reference tag, as given by the server
+    :ivar type: The type of batch, eg "netsplit" or "chathistory"
+    :ivar params: Any extra parameters for the batch type
+    :ivar message: The `BATCH` line that opened the batch, for its tags
+    :ivar parent: The reference tag of the batch this one is nested inside, or None
+    :ivar messages: The lines (and nested batches) in the batch, in the order they arrived
+    """
+
+    __slots__ = ("reference", "type", "params", "message", "parent", "messages")
+
+    def __init__(self, reference: str, type: str, params: List[str], message: IRCMessage,
+                 parent: Optional[str]=None):
+        self.reference = reference
+        self.type = type
+        self.params = params
+        self.message = message
+        self.parent = parent
+
+        self.messages = []  # type: List[Union[IRCMessage, Batch]]
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __repr__(self):
+        return "<Batch {} type={!r} params={!r} ({} messages)>".format(
+            self.reference, self.type, self.params, len(self.messages)
+        )
@@ -0,0 +1,117 @@
+# coding=utf-8
+
+"""
+Case-insensitive comparison of IRC nicks and channel names.
+
+IRC servers compare names case-insensitively, using the case mapping they
+advertise with `CASEMAPPING` in RPL_ISUPPORT. Under `rfc1459`, the default,
+`[]\\~` are the upper case forms of `{}|^` as well.
+
+Names are compared by folding them into keys with `str.translate()`. The
+same few names tend to be folded over and over - our own nick, busy channels,
+active users - so each case mapping keeps a bounded LRU cache of folded keys,
+and keys are interned so dict lookups with them are cheap.
+
+>>> mapping = get_casemapping("rfc1459")
+>>> mapping.fold("Nick[Away]")
+'nick{away}'
+>>> mapping.equals("#Ultros", "#ultros")
+True
+"""
+
+import sys
+
+from functools import lru_cache
+from typing import Dict, Optional
+
+__author__ = "Gareth Coles"
+
+_ASCII_UPPER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_ASCII_LOWER = "abcdefghijklmnopqrstuvwxyz"
+
+TABLES = {
+    "ascii": str.maketrans(_ASCII_UPPER, _ASCII_LOWER),
+    "rfc1459": str.maketrans(_ASCII_UPPER + "[]\\~", _ASCII_LOWER + "{}|^"),
+    "strict-rfc1459": str.maketrans(_ASCII_UPPER + "[]\\", _ASCII_LOWER + "{}|"),
+}  #: Dict[str, dict]: Translation tables for each supported case mapping
+
+DEFAULT_CASEMAPPING = "rfc1459"
+DEFAULT_CACHE_SIZE = 8192
+
+_casemappings = {}  # type: Dict[str, CaseMapping]
+
+
+class CaseMapping:
+    """
+    A case mapping, with a cache of folded keys.
+
+    Use `get_casemapping()` rather than creating these directly, so that connections to the same kind of server
+    share a cache.
+
+    :param name: The name of the case mapping, as given in `CASEMAPPING`
+    :param cache_size: How many folded keys to keep
+    """
+
+    __slots__ = ("name", "table", "fold")
+
+    def __init__(self, name: str, cache_size: int=DEFAULT_CACHE_SIZE):
+        if name not in TABLES:
+            raise ValueError("Unknown case mapping: {}".format(name))
+
+        table = TABLES[name]
+        intern = sys.intern
+
+        @lru_cache(maxsize=cache_size)
+        def fold(value: str) -> str:
+            """
+            Fold a nick or channel name into a key that can be compared or hashed.
+            """
+
+            return intern(value.translate(table))
+
+        self.name = name
+        self.table = table
+        self.fold = fold
+
+    def equals(self, left: str, right: str) -> bool:
+        """
+        Check whether two nicks or channel names are the same under this case mapping.
+        """
+
+        return left == right or self.fold(left) == self.fold(right)
+
+    def cache_info(self):
+        """
+        Get the hits, misses and size of the folded key cache.
+        """
+
+        return self.fold.cache_info()
+
+    def __repr__(self):
+        return "<CaseMapping {}>".format(self.name)
+
+
+def get_casemapping(name: Optional[str]=DEFAULT_CASEMAPPING) -> Optional[CaseMapping]:
+    """
+    Get the shared `CaseMapping` for a case mapping name.
+
+    :return: The case mapping, or None if it isn't one we support
+    """
+
+    if name not in TABLES:
+        return None
+
+    mapping = _casemappings.get(name)
+
+    if mapping is None:
+        mapping = _casemappings[name] = CaseMapping(name)
+
+    return mapping
+
+
+def casefold(value: str, casemapping: str=DEFAULT_CASEMAPPING) -> str:
+    """
+    Fold a nick or channel name using the named case mapping.
+    """
+
+    return get_casemapping(casemapping).fold(value)
@@ -1,194 +1,653 @@
 # coding=utf-8
 import asyncio
 
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from ultros.core import metrics as m
+from ultros.core.events.definitions.general import Event
 from ultros.core.networks.base.connectors.tcp_connector import TCPConnector
+from ultros.networks.irc.batch import Batch
+from ultros.networks.irc.events import IRCBatchEvent
+from ultros.networks.irc.framing import LineFramer
+from ultros.networks.irc.messages import MAX_HOST_LENGTH, MAX_LINE_LENGTH, get_target_limits, group_targets, split_text
+from ultros.networks.irc.outbound import OutboundQueue, Priority
+from ultros.networks.irc.parser import IRCMessage, parse_line, split_prefix
 from ultros.networks.irc.servers import irc as irc_server
+from ultros.networks.irc.state import IRCState
 
 __author__ = "Gareth Coles"
 
 
 class BaseIRCConnector(TCPConnector):
-    def __init__(self, name: str, network, server, *, host=None, port=6667, encoding="UTF-8"):
+    """
+    Base class for IRC connectors.
+
+    Incoming lines are dispatched to coroutine methods named after the command or numeric, such as `irc_PRIVMSG`
+    or `irc_001`. These are collected into a table once per class, and bound once per instance, so there's no
+    attribute lookup for each line. Extra handlers may be added to the table with `add_command_handler()`, and
+    lines with no handlers at all go to `irc_UNHANDLED`.
+
+    Lines are dispatched strictly in the order they were received, by a single dispatch loop per connection, and
+    each line's handlers finish before the next line's are called. This means that handlers must never wait for
+    a later line to arrive - start a separate task if you need to do that. If lines arrive faster than they can be
+    handled, reading from the transport is paused once `dispatch_high_water` lines are waiting, and resumed once
+    the queue has drained to `dispatch_low_water`.
+
+    Channels, their members and their modes are tracked in `state`; see the `state` module.
+
+    The IRCv3 capabilities listed in `wanted_capabilities` are requested when the server supports them. Lines in a
+    server batch (see the `batch` module) are collected and handed to a single batch handler when the batch ends,
+    instead of being dispatched one at a time. Batch handlers are coroutine methods named after the batch type, such
+    as `batch_netsplit`, and more may be added with `add_batch_handler()`. Batches of a type with no handler have
+    their lines dispatched individually. An `IRCBatchEvent` is fired for every batch that was handled as a whole.
+
+    Outgoing lines are queued with a priority and sent under flood control; see the `outbound` module. The
+    `flood_rate` (lines per second) and `flood_burst` (lines) parameters control how fast lines may be sent - set
+    `flood_rate` to None to turn flood control off entirely.
+    """
+
+    _command_handler_names = None  #: Dict[str, str]: Command -> handler method name, per class
+    _batch_handler_names = None  #: Dict[str, str]: Batch type -> handler method name, per class
+
+    wanted_capabilities = (
+        "batch", "cap-notify", "chathistory", "draft/chathistory", "message-tags", "server-time"
+    )  #: Tuple[str, ...]: Capabilities to request, if the server supports them
+
+    dispatch_high_water = 1000  #: int: Pause reading when this many lines are waiting to be dispatched
+    dispatch_low_water = 100  #: int: Resume reading when this few lines are waiting to be dispatched
+
+    def __init__(self, name: str, network, server, *, host=None, port=6667, encoding="UTF-8",
+                 flood_rate: Optional[float]=0.5, flood_burst: int=5, nickname: str="Testros", ident: str="test",
+                 quit_message: str="Shutting down"):
         super().__init__(name, network, server)
 
+        self.command_handlers = {
+            command: (getattr(self, function_name),)
+            for command, function_name in self.get_command_handler_names().items()
+        }  #: Dict[str, Tuple[Callable[[IRCMessage], Awaitable], ...]]
+
+        self.batch_handlers = {
+            batch_type: (getattr(self, function_name),)
+            for batch_type, function_name in self.get_batch_handler_names().items()
+        }  #: Dict[str, Tuple[Callable[[Batch], Awaitable], ...]]
+
         self.host = host
         self.port = port
         self.encoding = encoding
 
+        self.nickname = nickname
+        self.ident = ident
+        self.quit_message = quit_message
+        self.userhost = None  #: str: Our "user@host", as the server shows it to others, once we know it
+        self.registered = False  #: bool: Whether we've connected and received RPL_WELCOME
+
         self.server_capabilities = []
+        self.enabled_capabilities = set()
+        self.negotiating_capabilities = False
+        self.open_batches = {}  #: Dict[str, Batch]: Batches that haven't ended yet, by reference tag
+        self.server_info = {}  #: Dict[str, str]: Server name, version and modes, from RPL_MYINFO
         self.supported_features = {}
+        self.target_limits = {}  #: Dict[str, Optional[int]]: Command -> maximum targets, from RPL_ISUPPORT
+
+        self.framer = LineFramer()
+        self.state = IRCState()
+
+        self.dispatch_queue = None  #: asyncio.Queue: Parsed lines waiting to be dispatched
+        self.dispatch_task = None  #: asyncio.Task: The dispatch loop for the current connection
+        self.dispatch_time = None  #: Optional[HistogramValue]: Time taken to dispatch each line, if metrics are on
+        self.reading_paused = False
+
+        self.lines_received = 0  #: int: Lines received since creation
+        self.parse_failures = 0  #: int: Lines received that couldn't be parsed
 
-        self.buffer = b""
+        self.outbound = OutboundQueue(flood_rate, flood_burst)
 
     @property
     def server(self) -> "irc_server.IRCServer":
         return self._server()
 
+    @classmethod
+    def get_command_handler_names(cls) -> Dict[str, str]:
+        """
+        Get a dict mapping each command to the name of the method that handles it, for this class. This is only
+        worked out once per class.
+        """
+
+        if "_command_handler_names" not in cls.__dict__:
+            cls._command_handler_names = {
+                name[4:]: name for name in dir(cls)
+                if name.startswith("irc_") and name != "irc_UNHANDLED"
+            }
+
+        return cls._command_handler_names
+
+    @classmethod
+    def get_batch_handler_names(cls) -> Dict[str, str]:
+        """
+        Get a dict mapping each batch type to the name of the method that handles it, for this class. This is only
+        worked out once per class.
+        """
+
+        if "_batch_handler_names" not in cls.__dict__:
+            cls._batch_handler_names = {
+                name[6:]: name for name in dir(cls) if name.startswith("batch_")
+            }
+
+        return cls._batch_handler_names
+
+    def add_command_handler(self, command: str, handler: Callable[[IRCMessage], Awaitable]):
+        """
+        Add a handler for a command or numeric. Handlers are coroutine functions that take an `IRCMessage`, and
+        are called in the order they were added, after any built-in handler.
+
+        :param command: The command or numeric to handle, eg "PRIVMSG" or "001"
+        :param handler: The coroutine function to call
+        """
+
+        command = command.upper()
+
+        # Tuples are replaced rather than modified, so lines being dispatched aren't affected
+        self.command_handlers[command] = self.command_handlers.get(command, ()) + (handler,)
+
+    def remove_command_handler(self, command: str, handler: Callable[[IRCMessage], Awaitable]) -> bool:
+        """
+        Remove a handler that was added with `add_command_handler()`.
+
+        :return: True if the handler was removed, False if it wasn't found
+        """
+
+        command = command.upper()
+        handlers = self.command_handlers.get(command, ())
+
+        if handler not in handlers:
+            return False
+
+        handlers = tuple(h for h in handlers if h != handler)
+
+        if handlers:
+            self.command_handlers[command] = handlers
+        else:
+            del self.command_handlers[command]
+
+        return True
+
+    def add_batch_handler(self, batch_type: str, handler: Callable[[Batch], Awaitable]):
+        """
+        Add a handler for a type of batch. Handlers are coroutine functions that take a `Batch`, and are called in
+        the order they were added, after any built-in handler.
+
+        :param batch_type: The type of batch to handle, eg "netsplit" or "draft/example"
+        :param handler: The coroutine function to call
+        """
+
+        self.batch_handlers[batch_type] = self.batch_handlers.get(batch_type, ()) + (handler,)
+
+    def remove_batch_handler(self, batch_type: str, handler: Callable[[Batch], Awaitable]) -> bool:
+        """
+        Remove a handler that was added with `add_batch_handler()`.
+
+        :return: True if the handler was removed, False if it wasn't found
+        """
+
+        handlers = self.batch_handlers.get(batch_type, ())
+
+        if handler not in handlers:
+            return False
+
+        handlers = tuple(h for h in handlers if h != handler)
+
+        if handlers:
+            self.batch_handlers[batch_type] = handlers
+        else:
+            del self.batch_handlers[batch_type]
+
+        return True
+
     def connection_made(self, transport):
+        self.framer.clear()
+        self.reading_paused = False
+        self.registered = False
+
+        self.server_capabilities = []
+        self.enabled_capabilities = set()
+        self.negotiating_capabilities = True
+        self.open_batches = {}
+
+        self.dispatch_queue = asyncio.Queue()
+        self.dispatch_task = asyncio.ensure_future(self.dispatch_loop(self.dispatch_queue))
+
+        ultros = self.network.ultros
+
+        if ultros is not None and ultros.metrics.enabled:
+            self.dispatch_time = ultros.metrics.histogram(
+                "ultros_irc_dispatch_seconds", "Time taken to handle each line received", ["network", "connector"]
+            ).labels(self.network.name, self.name)
+
         super().connection_made(transport)
 
-        self.write_line("CAP LS 302")
-        self.write_line("NICK Testros")
-        self.write_line("USER test 0 * :Ultros 3K")
+        self.outbound.start(transport.write)
+
+        self.write_line("CAP LS 302", Priority.URGENT)
+        self.write_line("NICK {}".format(self.nickname), Priority.URGENT)
+        self.write_line("USER {} 0 * :Ultros 3K".format(self.ident), Priority.URGENT)
+
+    async def do_disconnect(self, message: Optional[str]=None):
+        """
+        Disconnect gracefully - stop reading, send everything that's queued, then send QUIT and close the
+        connection. Cancel this to stop waiting for the queue; QUIT is still sent, and the connection closed.
+
+        :param message: The quit message, or None for `quit_message`
+        """
+
+        transport = self.transport
+
+        if transport is None or transport.is_closing():
+            return
+
+        # Stop taking in new lines, so nothing new is queued while we drain
+        transport.pause_reading()
+        self.reading_paused = False  # So the dispatch loop doesn't resume reading
+
+        try:
+            if self.registered:
+                await self.outbound.flush()
+        finally:
+            if self.registered:
+                # Straight to the transport, so flood control can't hold it up
+                quit_line = "QUIT :{}".format(message or self.quit_message).encode(self.encoding)
+                transport.write(quit_line + b"\r\n")
 
-    async def do_disconnect(self):
-        self.transport.close()
+                self.logger.debug("-> %r", quit_line)
+
+            transport.close()
+
+    def write_line(self, line: str, priority: Priority=Priority.NORMAL):
+        """
+        Queue a line to be sent to the server, subject to flood control.
+
+        :param line: The line to send, without a line ending
+        :param priority: Which priority lane to queue the line in
+        """
 
-    def write_line(self, line):
         bytes_line = line.encode(self.encoding)
-        self.transport.write(
-            bytes_line + b"\r\n"
-        )
+        self.outbound.put(bytes_line + b"\r\n", priority)
 
-        self.logger.debug("-> {}".format(repr(bytes_line)))
+        self.logger.debug("-> %r", bytes_line)
 
     def data_received(self, data: bytes):
-        self.buffer += data
+        queue = self.dispatch_queue
 
-        while b"\r\n" in self.buffer:
-            line, self.buffer = self.buffer.split(b"\r\n", 1)
+        for line in self.framer.feed(data):
+            self.lines_received += 1
 
             try:
                 parsed = self.parse_line(line.decode(self.encoding))
             except Exception:
+                self.parse_failures += 1
                 self.logger.exception("Failed to parse line")
                 self.logger.error(line)
             else:
-                self.logger.debug("<- {}".format(repr(line)))
-                asyncio.ensure_future(self.dispatch_line(parsed))
+                self.logger.debug("<- %r", line)
+                queue.put_nowait(parsed)
+
+        if not self.reading_paused and queue.qsize() >= self.dispatch_high_water:
+            self.logger.debug("%s lines waiting to be dispatched; pausing reading", queue.qsize())
+
+            self.reading_paused = True
+            self.transport.pause_reading()
 
     def eof_received(self):
         return False  # Closes the transport automatically
 
-    async def dispatch_line(self, data: dict):
-        function_name = "irc_{}".format(data["command"])
-        if not hasattr(self, function_name):
-            function_name = "irc_UNHANDLED"
-        await getattr(self, function_name)(**data)
-
-    def parse_line(self, line) -> dict:
-        # TODO: There's probably a lot of validation I missed
-        data = {
-            "tags": {},
-            "prefix": None,
-            "command": None,
-            "params": []
-        }
-
-        if line[0] == "@":
-            tags, line = line.split(" ", 1)
-
-            for tag in tags.split(";"):
-                if "=" in tag:
-                    key, value = tag.split("=", 1)
-                else:
-                    key, value = tag, None
+    def connection_lost(self, exc):
+        self.registered = False
 
-                if key not in data["tags"]:
-                    data["tags"][key] = value
+        if self.dispatch_queue is not None:
+            # Let the dispatch loop finish off any lines that were already received, then stop
+            self.dispatch_queue.put_nowait(None)
 
-        if line[0] == ":":
-            prefix, line = line.split(" ", 1)
-            data["prefix"] = prefix[1:]
+        self.outbound.stop()
 
-        command, line = line.split(" ", 1)
-        data["command"] = command.upper()
+        super().connection_lost(exc)
 
-        while line:  # Params to do!
-            if " " in line:
-                param, line = line.split(" ", 1)
-            else:
-                param, line = line, ""
+    async def dispatch_loop(self, queue: asyncio.Queue):
+        """
+        Dispatch lines from a queue, in order, until None is taken from it.
+
+        This is started automatically for each connection.
+        """
+
+        while True:
+            message = await queue.get()
 
-            if param[0] == ":":
-                data["params"].append(param[1:] + " " + line)
+            if message is None:
                 break
 
-            data["params"].append(param)
+            dispatch_time = self.dispatch_time
+
+            try:
+                if dispatch_time is None:
+                    await self.dispatch_line(message)
+                else:
+                    start = perf_counter()
+                    await self.dispatch_line(message)
+                    dispatch_time.observe(perf_counter() - start)
+            except Exception:
+                self.logger.exception("Error while handling line: %r", message)
+
+            if self.reading_paused and queue is self.dispatch_queue and queue.qsize() <= self.dispatch_low_water:
+                self.logger.debug("Dispatch queue drained; resuming reading")
+
+                self.reading_paused = False
+                self.transport.resume_reading()
+
+    def collect_metrics(self) -> Iterable["m.Metric"]:
+        labels = ("network", "connector")
+        values = (self.network.name, self.name)
+        outbound = self.outbound.stats()
+
+        for cls, name, documentation, value in (
+            (m.Counter, "ultros_irc_lines_received_total", "Lines received", self.lines_received),
+            (m.Counter, "ultros_irc_parse_failures_total", "Lines received that couldn't be parsed",
+             self.parse_failures),
+            (m.Counter, "ultros_irc_lines_sent_total", "Lines sent", outbound["lines_sent"]),
+            (m.Counter, "ultros_irc_writes_total", "Writes to the connection", outbound["writes"]),
+            (m.Gauge, "ultros_irc_outbound_depth", "Lines waiting to be sent", outbound["depth"]),
+            (m.Gauge, "ultros_irc_outbound_max_wait_seconds", "Longest time a line has waited to be sent",
+             outbound["max_wait"]),
+            (m.Gauge, "ultros_irc_dispatch_backlog", "Lines waiting to be dispatched",
+             self.dispatch_queue.qsize() if self.dispatch_queue is not None else 0),
+            (m.Gauge, "ultros_irc_registered", "Whether the connector is connected and registered",
+             int(self.registered))
+        ):
+            metric = cls(name, documentation, labels)
+            metric.labels(*values).set(value)
+
+            yield metric
+
+    async def dispatch_line(self, message: IRCMessage):
+        if self.open_batches and message.raw_tags and message.command != "BATCH":
+            batch = self.open_batches.get(message.tags.get("batch"))
+
+            if batch is not None:
+                batch.messages.append(message)
+                return
+
+        handlers = self.command_handlers.get(message.command)
+
+        if handlers is None:
+            await self.irc_UNHANDLED(message)
+            return
+
+        for handler in handlers:
+            await handler(message)
+
+    async def dispatch_batch(self, batch: Batch):
+        """
+        Pass a finished batch to its handlers, or dispatch its lines one by one if it has none.
+        """
+
+        handlers = self.batch_handlers.get(batch.type)
 
-        return data
+        if handlers is None:
+            for message in batch.messages:
+                if isinstance(message, Batch):
+                    await self.dispatch_batch(message)
+                else:
+                    await self.dispatch_line(message)
+
+            return
+
+        for handler in handlers:
+            await handler(batch)
+
+        await self.fire_event(IRCBatchEvent(self, batch))
+
+    async def fire_event(self, event: Event):
+        """
+        Fire an event with Ultros' event manager, if there is one.
+        """
+
+        ultros = self.network.ultros
+
+        if ultros is not None and ultros.event_manager is not None:
+            await ultros.event_manager.fire_event(event)
+
+    def parse_line(self, line: str) -> IRCMessage:
+        return parse_line(line)
 
     # region: Non-numerics
 
-    async def irc_UNHANDLED(self, tags, prefix, command, params):
+    async def irc_UNHANDLED(self, message: IRCMessage):
         self.logger.debug(
             "Unhandled line: tags={} / prefix={} / command={} / params={}".format(
-                repr(tags), repr(prefix), repr(command), repr(params)
+                repr(message.raw_tags), repr(message.prefix), repr(message.command), repr(message.params)
             )
         )
 
-    async def irc_PING(self, tags, prefix, command, params):
-        self.write_line("PONG :{}".format(params[0]))
+    async def irc_PING(self, message: IRCMessage):
+        self.write_line("PONG :{}".format(message.params[0]), Priority.URGENT)
+
+    async def irc_CAP(self, message: IRCMessage):
+        subcommand = message.params[1].upper()
+        capabilities = message.params[-1].split()
+
+        if subcommand in ("LS", "NEW"):
+            for capability in capabilities:
+                name = capability.split("=", 1)[0]  # CAP 302 values aren't used yet
+
+                if name not in self.server_capabilities:
+                    self.server_capabilities.append(name)
+
+            if subcommand == "LS" and len(message.params) > 3 and message.params[2] == "*":
+                return  # More to come
 
-    async def irc_CAP(self, tags, prefix, command, params):
-        if params[0] == "*" and params[1] == "LS":
-            if params[2] == "*":
-                for cap in params[3].split(" "):
-                    self.server_capabilities.append(cap)
+            self.logger.debug("Capabilities: {}".format(", ".join(self.server_capabilities)))
+            self.request_capabilities()
+        elif subcommand == "ACK":
+            for capability in capabilities:
+                if capability.startswith("-"):
+                    self.enabled_capabilities.discard(capability[1:])
+                else:
+                    self.enabled_capabilities.add(capability)
+
+            self.logger.debug("Enabled capabilities: {}".format(", ".join(sorted(self.enabled_capabilities))))
+            self.end_capabilities()
+        elif subcommand == "NAK":
+            self.logger.debug("Capabilities refused: {}".format(", ".join(capabilities)))
+            self.end_capabilities()
+        elif subcommand == "DEL":
+            for capability in capabilities:
+                self.enabled_capabilities.discard(capability)
+
+                if capability in self.server_capabilities:
+                    self.server_capabilities.remove(capability)
+
+    def request_capabilities(self):
+        """
+        Request any capabilities in `wanted_capabilities` that the server supports and we haven't enabled yet, or
+        finish negotiating if there are none.
+        """
+
+        wanted = [
+            capability for capability in self.wanted_capabilities
+            if capability in self.server_capabilities and capability not in self.enabled_capabilities
+        ]
+
+        if wanted:
+            self.write_line("CAP REQ :{}".format(" ".join(wanted)), Priority.URGENT)
+        else:
+            self.end_capabilities()
+
+    def end_capabilities(self):
+        if self.negotiating_capabilities:
+            self.negotiating_capabilities = False
+            self.write_line("CAP END", Priority.URGENT)
+
+    async def irc_BATCH(self, message: IRCMessage):
+        reference = message.params[0]
+
+        if reference[:1] == "+":
+            parent = self.open_batches.get(message.tags.get("batch")) if message.raw_tags else None
+
+            batch = Batch(
+                reference[1:], message.params[1] if len(message.params) > 1 else "", message.params[2:], message,
+                parent.reference if parent is not None else None
+            )
+
+            self.open_batches[batch.reference] = batch
+
+            if parent is not None:
+                parent.messages.append(batch)
+        elif reference[:1] == "-":
+            batch = self.open_batches.pop(reference[1:], None)
+
+            if batch is not None and batch.parent is None:
+                # Nested batches are handled along with their parent
+                await self.dispatch_batch(batch)
+
+    def is_self(self, nick: str) -> bool:
+        """
+        Check whether a nick is ours, using the server's case mapping (see the `casemapping` module).
+        """
+
+        return self.state.key(nick) == self.state.key(self.nickname)
+
+    def is_channel(self, target: str) -> bool:
+        chantypes = (self.supported_features.get("CHANTYPES") or [None])[0] or "#&"
+
+        return target[:1] in chantypes
+
+    async def irc_JOIN(self, message: IRCMessage):
+        nick, ident, host = split_prefix(message.prefix)
+        is_self = self.is_self(nick)
+
+        if is_self and ident and host:
+            self.userhost = "{}@{}".format(ident, host)
+
+        for channel in message.params[0].split(","):
+            self.state.join(channel, nick, ident, host, is_self)
+
+    async def irc_PART(self, message: IRCMessage):
+        nick, _, _ = split_prefix(message.prefix)
+        is_self = self.is_self(nick)
+
+        for channel in message.params[0].split(","):
+            self.state.part(channel, nick, is_self)
+
+    async def irc_KICK(self, message: IRCMessage):
+        for nick in message.params[1].split(","):
+            self.state.part(message.params[0], nick, self.is_self(nick))
+
+    async def irc_QUIT(self, message: IRCMessage):
+        nick, _, _ = split_prefix(message.prefix)
+        self.state.quit(nick)
+
+    async def irc_NICK(self, message: IRCMessage):
+        nick, _, _ = split_prefix(message.prefix)
+
+        if self.is_self(nick):
+            self.nickname = message.params[0]
+
+        self.state.nick(nick, message.params[0])
+
+    async def irc_MODE(self, message: IRCMessage):
+        if len(message.params) > 1 and self.is_channel(message.params[0]):
+            self.state.mode(message.params[0], message.params[1], message.params[2:])
+
+    async def irc_TOPIC(self, message: IRCMessage):
+        self.state.topic(message.params[0], message.params[-1] if len(message.params) > 1 else None)
+
+    # endregion
+
+    # region: Batches
+
+    async def batch_netsplit(self, batch: Batch):
+        """
+        Users that quit because of a netsplit. State is updated in one go, rather than dispatching every QUIT.
+        """
+
+        for message in batch.messages:
+            if isinstance(message, Batch):
+                await self.dispatch_batch(message)
+            elif message.command == "QUIT":
+                self.state.quit(split_prefix(message.prefix)[0])
             else:
-                for cap in params[2].split(" "):
-                    self.server_capabilities.append(cap)
+                await self.dispatch_line(message)
 
-                self.logger.debug("Capabilities: {}".format(", ".join(self.server_capabilities)))
-                self.write_line("CAP END")
+    async def batch_netjoin(self, batch: Batch):
+        """
+        Users rejoining after a netsplit. State is updated in one go, rather than dispatching every JOIN.
+        """
+
+        for message in batch.messages:
+            if isinstance(message, Batch):
+                await self.dispatch_batch(message)
+            elif message.command == "JOIN":
+                nick, ident, host = split_prefix(message.prefix)
+
+                for channel in message.params[0].split(","):
+                    self.state.join(channel, nick, ident, host)
+            else:
+                await self.dispatch_line(message)
+
+    async def batch_chathistory(self, batch: Batch):
+        """
+        Chat history playback. These lines are in the past, so they don't touch our state - they're only passed on
+        with the batch event.
+        """
 
     # endregion
 
     # region: Numerics
 
-    async def irc_001(self, tags, prefix, command, params):
+    async def irc_001(self, message: IRCMessage):
         """
         RPL_WELCOME
         """
 
-        if len(params) > 1:
-            self.logger.info(params[1])
-        elif params:
-            self.logger.info(params[0])
+        if len(message.params) > 1:
+            self.logger.info(message.params[1])
+        elif message.params:
+            self.logger.info(message.params[0])
         else:
             self.logger.info("Received WELCOME message.")
 
-        await self.server.on_ready()
-        # self.write_line("JOIN #ultros-test")
+        if message.params:
+            self.nickname = message.params[0]  # The server may have truncated or changed it
 
-    async def irc_002(self, tags, prefix, command, params):
+    async def irc_002(self, message: IRCMessage):
         """
         RPL_YOURHOST
         """
 
-        if len(params) > 1:
-            self.logger.info(params[1])
-        elif params:
-            self.logger.info(params[0])
+        if len(message.params) > 1:
+            self.logger.info(message.params[1])
+        elif message.params:
+            self.logger.info(message.params[0])
 
-    async def irc_003(self, tags, prefix, command, params):
+    async def irc_003(self, message: IRCMessage):
         """
         RPL_CREATED
         """
 
-        if len(params) > 1:
-            self.logger.info(params[1])
-        elif params:
-            self.logger.info(params[0])
+        if len(message.params) > 1:
+            self.logger.info(message.params[1])
+        elif message.params:
+            self.logger.info(message.params[0])
 
-    async def irc_004(self, tags, prefix, command, params):
+    async def irc_004(self, message: IRCMessage):
         """
         RPL_MYINFO
 
         We should use RPL_ISUPPORT (005) to discover features instead of using the mode letters listed here
         """
 
-        server_name = params[1]
-        server_version = params[2]
-        user_modes = params[3]
-        chanel_modes = params[4]
-
-        if len(params) > 5:
-            channel_modes_with_parameter = params[5]
-        else:
-            channel_modes_with_parameter = ""
+        keys = ("server_name", "server_version", "user_modes", "channel_modes", "channel_modes_with_parameter")
+        self.server_info = dict(zip(keys, message.params[1:6]))
 
-    async def irc_005(self, tags, prefix, command, params):
+    async def irc_005(self, message: IRCMessage):
         """
         RPL_ISUPPORT
 
@@ -218,9 +677,7 @@ class BaseIRCConnector(TCPConnector):
         TOPICLEN=<number>
         """
 
-        params = params[1:-1]
-
-        for param in params:
+        for param in message.params[1:-1]:
             if "=" in param:
                 left, right = param.split("=", 1)
 
@@ -241,7 +698,10 @@ class BaseIRCConnector(TCPConnector):
 
             self.supported_features[param] = [None]
 
-    async def irc_010(self, tags, prefix, command, params):
+        self.target_limits = get_target_limits(self.supported_features)
+        self.state.update_features(self.supported_features)
+
+    async def irc_010(self, message: IRCMessage):
         """
         RPL_BOUNCE
 
@@ -249,151 +709,151 @@ class BaseIRCConnector(TCPConnector):
         We should think about whether we implement this, and if so, how.
         """
 
-        hostname, port, info = params[1, 2, 3:]
+        hostname, port, info = message.params[1, 2, 3:]
 
-    async def irc_221(self, tags, prefix, command, params):
+    async def irc_221(self, message: IRCMessage):
         """
         RPL_UMODEIS
         """
 
-        umodes = params[1]
+        umodes = message.params[1]
 
-    async def irc_250(self, tags, prefix, command, params):
+    async def irc_250(self, message: IRCMessage):
         """
         Unknown numeric, used by Esper
         """
 
-        self.logger.info(params[1])
+        self.logger.info(message.params[1])
 
-    async def irc_251(self, tags, prefix, command, params):
+    async def irc_251(self, message: IRCMessage):
         """
         RPL_LUSERCLIENT
         """
 
-        self.logger.info(params[1])
+        self.logger.info(message.params[1])
 
-    async def irc_252(self, tags, prefix, command, params):
+    async def irc_252(self, message: IRCMessage):
         """
         RPL_LUSEROP
         """
 
-        self.logger.info(" ".join(params[1:]))
+        self.logger.info(" ".join(message.params[1:]))
 
-    async def irc_253(self, tags, prefix, command, params):
+    async def irc_253(self, message: IRCMessage):
         """
         RPL_LUSERUNKNOWN
         """
 
-        self.logger.info(" ".join(params[1:]))
+        self.logger.info(" ".join(message.params[1:]))
 
-    async def irc_254(self, tags, prefix, command, params):
+    async def irc_254(self, message: IRCMessage):
         """
         RPL_LUSERCHANNELS
         """
 
-        self.logger.info(" ".join(params[1:]))
+        self.logger.info(" ".join(message.params[1:]))
 
-    async def irc_255(self, tags, prefix, command, params):
+    async def irc_255(self, message: IRCMessage):
         """
         RPL_LUSERME
         """
 
-        self.logger.info(params[1])
+        self.logger.info(message.params[1])
 
-    async def irc_256(self, tags, prefix, command, params):
+    async def irc_256(self, message: IRCMessage):
         """
         RPL_ADMINME
         """
 
-        if len(params) > 2:  # Server can be specified, but it's in the prefix anyway
-            self.logger.info(params[2])
+        if len(message.params) > 2:  # Server can be specified, but it's in the prefix anyway
+            self.logger.info(message.params[2])
         else:
-            self.logger.info(params[1])
+            self.logger.info(message.params[1])
 
-        self.logger.info(" ".join(params[1:]))
+        self.logger.info(" ".join(message.params[1:]))
 
-    async def irc_257(self, tags, prefix, command, params):
+    async def irc_257(self, message: IRCMessage):
         """
         RPL_ADMINLOC1
         """
 
-        self.logger.info(params[1])
+        self.logger.info(message.params[1])
 
-    async def irc_258(self, tags, prefix, command, params):
+    async def irc_258(self, message: IRCMessage):
         """
         RPL_ADMINLOC2
         """
 
-        self.logger.info(params[1])
+        self.logger.info(message.params[1])
 
-    async def irc_259(self, tags, prefix, command, params):
+    async def irc_259(self, message: IRCMessage):
         """
         RPL_ADMINEMAIL
         """
 
-        self.logger.info(params[1])
+        self.logger.info(message.params[1])
 
-    async def irc_263(self, tags, prefix, command, params):
+    async def irc_263(self, message: IRCMessage):
         """
         RPL_TRYAGAIN
         """
 
-        self.logger.info("%s | %s", params[1], params[2])
+        self.logger.info("%s | %s", message.params[1], message.params[2])
 
-    async def irc_265(self, tags, prefix, command, params):
+    async def irc_265(self, message: IRCMessage):
         """
         RPL_LOCALUSERS
         """
 
-        if len(params) > 2:
-            current, max = params[1], params[2]  # Optional at the moment
+        if len(message.params) > 2:
+            current, max = message.params[1], message.params[2]  # Optional at the moment
         else:
             # TODO: Validation/error handling
-            split = params[1].split(" ")
+            split = message.params[1].split(" ")
             current, max = int(split[-3][:-1]), int(split[-1])
 
-        self.logger.info(params[-1])
+        self.logger.info(message.params[-1])
 
-    async def irc_266(self, tags, prefix, command, params):
+    async def irc_266(self, message: IRCMessage):
         """
         RPL_GLOBALUSERS
         """
 
-        if len(params) > 2:
-            current, max = params[1], params[2]  # Optional at the moment
+        if len(message.params) > 2:
+            current, max = message.params[1], message.params[2]  # Optional at the moment
         else:
             # TODO: Validation/error handling
-            split = params[1].split(" ")
+            split = message.params[1].split(" ")
             current, max = int(split[-3][:-1]), int(split[-1])
 
-        self.logger.info(params[-1])
+        self.logger.info(message.params[-1])
 
-    async def irc_276(self, tags, prefix, command, params):
+    async def irc_276(self, message: IRCMessage):
         """
         RPL_WHOISCERTFP
         """
 
-        nick = params[1]
-        fingerprint = params[2].split(" ")[-1]
+        nick = message.params[1]
+        fingerprint = message.params[2].split(" ")[-1]
 
-        self.logger.info(" ".join(params[1:]))
+        self.logger.info(" ".join(message.params[1:]))
 
-    async def irc_300(self, tags, prefix, command, params):
+    async def irc_300(self, message: IRCMessage):
         """
         RPL_NONE
         """
 
-    async def irc_301(self, tags, prefix, command, params):
+    async def irc_301(self, message: IRCMessage):
         """
         RPL_AWAY
         """
 
-        nick = params[1]
-        message = params[2]
+        nick = message.params[1]
+        away_message = message.params[2]
 
-        self.logger.info(" ".join(params[1:]))
+        self.logger.info("%s is away: %s", nick, away_message)
 
-    async def irc_302(self, tags, prefix, command, params):
+    async def irc_302(self, message: IRCMessage):
         """
         RPL_USERHOST
         """
@@ -401,14 +861,180 @@ class BaseIRCConnector(TCPConnector):
         # TODO: Parse as follows:
         # ["<nickname> [*] = <+/-> <hostname>", ...]
 
+    async def irc_332(self, message: IRCMessage):
+        """
+        RPL_TOPIC
+        """
+
+        self.state.topic(message.params[1], message.params[2])
+
+    async def irc_353(self, message: IRCMessage):
+        """
+        RPL_NAMREPLY
+        """
+
+        self.state.names(message.params[2], message.params[3].split(" "))
+
+    async def irc_366(self, message: IRCMessage):
+        """
+        RPL_ENDOFNAMES
+        """
+
+        self.state.names_end(message.params[1])
+
+    async def irc_376(self, message: IRCMessage):
+        """
+        RPL_ENDOFMOTD
+
+        Registration is finished and RPL_ISUPPORT has been received by now, so this is when we're ready to join
+        channels.
+        """
+
+        if not self.registered:
+            self.registered = True
+            await self.server.on_ready(self)
+
+    async def irc_422(self, message: IRCMessage):
+        """
+        ERR_NOMOTD
+        """
+
+        await self.irc_376(message)
+
+    async def irc_396(self, message: IRCMessage):
+        """
+        RPL_HOSTHIDDEN
+        """
+
+        if self.userhost and len(message.params) > 1:
+            self.userhost = "{}@{}".format(self.userhost.split("@", 1)[0], message.params[1])
+
+        self.logger.info(" ".join(message.params[1:]))
+
+    async def irc_474(self, message: IRCMessage):
+        """
+        ERR_BANNEDFROMCHAN
+
+        Also handles the other reasons a JOIN can fail - ERR_NOSUCHCHANNEL (403), ERR_TOOMANYCHANNELS (405),
+        ERR_CHANNELISFULL (471), ERR_INVITEONLYCHAN (473) and ERR_BADCHANNELKEY (475). If we were rejoining the
+        channel after reconnecting, we stop tracking it.
+        """
+
+        if len(message.params) > 1:
+            self.state.part(message.params[1], self.nickname, is_self=True)
+
+        self.logger.info(" ".join(message.params[1:]))
+
+    irc_403 = irc_405 = irc_471 = irc_473 = irc_475 = irc_474
+
     # TODO: The rest of the numerics
 
     # endregion
 
     # region: Higher-level API functions
 
-    def send_join(self, channel):
-        self.write_line("JOIN {}".format(channel))
+    def send_join(self, channels: Union[str, Iterable[str]]) -> int:
+        """
+        Join one or more channels, combining them into as few JOIN lines as the server allows (via TARGMAX).
+
+        :return: The number of lines queued
+        """
+
+        if isinstance(channels, str):
+            channels = [channels]
+
+        if "TARGMAX" in self.supported_features:
+            limit = self.target_limits.get("JOIN", 1)
+        else:
+            limit = None
+
+        lines = 0
+
+        # "JOIN <channels>\r\n"
+        for group in group_targets(channels, limit, MAX_LINE_LENGTH - 7, self.encoding):
+            self.write_line("JOIN {}".format(group))
+            lines += 1
+
+        return lines
+
+    def request_history(self, target: str, limit: int=100) -> bool:
+        """
+        Ask the server to play back the latest messages for a channel or nick, as a chathistory batch.
+
+        :param target: The channel or nick to get the history for
+        :param limit: The most messages to ask for. This is capped at the server's CHATHISTORY limit, if it has one
+        :return: False if the server doesn't support chat history, True otherwise
+        """
+
+        if not self.enabled_capabilities & {"chathistory", "draft/chathistory"}:
+            return False
+
+        maximum = (self.supported_features.get("CHATHISTORY") or [None])[0]
+
+        if maximum and maximum.isdigit() and int(maximum) > 0:
+            limit = min(limit, int(maximum))
+
+        self.write_line("CHATHISTORY LATEST {} * {}".format(target, limit), Priority.LOW)
+        return True
+
+    def get_prefix_length(self) -> int:
+        """
+        Get the length, in bytes, of the prefix the server adds to our lines when relaying them to other clients.
+
+        If we haven't seen our own hostname yet, this is a worst-case estimate.
+        """
+
+        if self.userhost:
+            return len(":{}!{} ".format(self.nickname, self.userhost).encode(self.encoding))
+
+        # ":" + nick + "!~" + ident + "@" + host + " "
+        return len(self.nickname.encode(self.encoding)) + len(self.ident.encode(self.encoding)) + MAX_HOST_LENGTH + 5
+
+    def send_message(self, targets: Union[str, Iterable[str]], text: str, *, notice: bool=False,
+                     priority: Priority=Priority.NORMAL) -> int:
+        """
+        Send a message to one or more targets, splitting it up as needed to fit within the line length limit.
+
+        Text is split at line breaks, and then on character boundaries (preferring spaces) so that each line fits
+        in 512 bytes once the server adds our prefix. Where the server allows it (via TARGMAX or MAXTARGETS in
+        RPL_ISUPPORT), several targets are combined into each line.
+
+        :param targets: A target (channel or nick), or an iterable of them
+        :param text: The message to send
+        :param notice: Send a NOTICE instead of a PRIVMSG
+        :param priority: Which priority lane to queue the lines in
+        :return: The number of lines queued
+        """
+
+        command = "NOTICE" if notice else "PRIVMSG"
+
+        if isinstance(targets, str):
+            targets = [targets]
+        else:
+            # Don't send to the same target twice, however it's been capitalised
+            keys = set()
+            unique = []
+
+            for target in targets:
+                key = self.state.key(target)
+
+                if key not in keys:
+                    keys.add(key)
+                    unique.append(target)
+
+            targets = unique
+
+        # "<command> <targets> :<text>\r\n", after the prefix
+        available = MAX_LINE_LENGTH - self.get_prefix_length() - len(command) - 5
+
+        lines = 0
+
+        for group in group_targets(targets, self.target_limits.get(command, 1), available // 2, self.encoding):
+            for chunk in split_text(text, available - len(group.encode(self.encoding)), self.encoding):
+                self.write_line("{} {} :{}".format(command, group, chunk), priority)
+                lines += 1
+
+        return lines
 
     # endregion
 
@@ -0,0 +1,28 @@
+# coding=utf-8
+
+"""
+Events fired by IRC connectors
+"""
+
+from ultros.core.events.definitions.general import NetworkEvent
+from ultros.networks.irc import batch as irc_batch
+
+__author__ = "Gareth Coles"
+
+
+class IRCEvent(NetworkEvent):
+    """
+    An event fired by an IRC connector. `protocol` is the connector.
+    """
+
+
+class IRCBatchEvent(IRCEvent):
+    """
+    A batch of lines from the server has been received and handled, for example a netsplit or a chat history
+    playback. Every line in the batch is delivered at once, in `batch.messages`.
+    """
+
+    def __init__(self, protocol, batch: "irc_batch.Batch"):
+        super().__init__(protocol)
+
+        self.batch = batch
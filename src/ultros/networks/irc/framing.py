@@ -0,0 +1,104 @@
+# coding=utf-8
+
+"""
+Incremental line framing for IRC connections.
+
+Data arrives from the transport in arbitrarily-sized chunks, which need to be
+split up into lines. The naive approach (appending to a `bytes` buffer and
+calling `split()` for each line) copies the remainder of the buffer for every
+line found, which is quadratic on large bursts such as NAMES or WHO replies.
+
+The framer here keeps a single `bytearray`, remembers where the last
+delimiter search stopped, and only removes consumed data from the front of
+the buffer when it's been fully drained or enough of it has been consumed.
+Each line is copied out of the buffer exactly once.
+"""
+
+from typing import List
+
+__author__ = "Gareth Coles"
+
+
+class LineFramer:
+    """
+    Splits a stream of bytes into delimited lines.
+
+    Feed it data as it arrives, and it will return any complete lines, without
+    their delimiters. Incomplete lines are kept until the rest of the line
+    arrives.
+
+    :param delimiter: The line delimiter to split on
+    :param compact_threshold: How many consumed bytes may sit at the front of
+                              the buffer before they're removed
+    """
+
+    __slots__ = ("delimiter", "compact_threshold", "_buffer", "_start", "_scan")
+
+    def __init__(self, delimiter: bytes=b"\r\n", compact_threshold: int=65536):
+        self.delimiter = delimiter
+        self.compact_threshold = compact_threshold
+
+        self._buffer = bytearray()
+        self._start = 0  # Offset of the first byte that hasn't been returned yet
+        self._scan = 0  # Offset to resume searching for a delimiter from
+
+    def __len__(self):
+        """
+        The number of buffered bytes that haven't been returned as a line yet.
+        """
+
+        return len(self._buffer) - self._start
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        Add some data to the buffer, and return any lines that are now
+        complete.
+
+        :param data: The data that was received
+        :return: A list of complete lines, which may be empty
+        """
+
+        buffer = self._buffer
+        buffer += data
+
+        delimiter = self.delimiter
+        delimiter_length = len(delimiter)
+        find = buffer.find
+
+        lines = []
+        start = self._start
+        position = find(delimiter, self._scan)
+
+        if position != -1:
+            # The view must be released before the buffer is resized again
+            with memoryview(buffer) as view:
+                while position != -1:
+                    lines.append(view[start:position].tobytes())
+
+                    start = position + delimiter_length
+                    position = find(delimiter, start)
+
+        # A partial delimiter may be sitting at the end of the buffer, so back up enough to catch it next time
+        scan = max(start, len(buffer) - delimiter_length + 1)
+
+        if start == len(buffer):
+            buffer.clear()
+            start = scan = 0
+        elif start >= self.compact_threshold:
+            del buffer[:start]
+            scan -= start
+            start = 0
+
+        self._start = start
+        self._scan = scan
+
+        return lines
+
+    def clear(self):
+        """
+        Throw away everything in the buffer - for example, after a disconnection.
+        """
+
+        self._buffer.clear()
+        self._start = 0
+        self._scan = 0
@@ -0,0 +1,133 @@
+# coding=utf-8
+
+"""
+Helpers for fitting outgoing messages into IRC's line length limit.
+
+An IRC line may be at most 512 bytes long, including the trailing CR LF and
+the prefix (`:nick!user@host `) that the server adds when relaying it to
+other clients. Text is split on byte boundaries - never in the middle of a
+character - preferring to split at spaces, and messages for several targets
+are combined into one line where the server allows it.
+"""
+
+import codecs
+
+from typing import Dict, Iterable, List, Optional
+
+__author__ = "Gareth Coles"
+
+MAX_LINE_LENGTH = 512  #: The maximum length of a line in bytes, including the line ending
+MAX_HOST_LENGTH = 63  #: The longest hostname we assume a server will give us, when we don't know our own
+
+
+def get_target_limits(supported_features: Dict[str, list]) -> Dict[str, Optional[int]]:
+    """
+    Work out how many targets each command accepts, from a connector's RPL_ISUPPORT features.
+
+    :return: A dict mapping commands to their target limit, or None for commands with no limit. Commands that
+             aren't listed should be sent to one target at a time.
+    """
+
+    limits = {}
+
+    if "MAXTARGETS" in supported_features:
+        # MAXTARGETS only applies to PRIVMSG and NOTICE, and is overridden by TARGMAX
+        value = supported_features["MAXTARGETS"][0]
+        limit = int(value) if value else None
+
+        limits["PRIVMSG"] = limit
+        limits["NOTICE"] = limit
+
+    for entry in supported_features.get("TARGMAX") or []:
+        if not entry or ":" not in entry:
+            continue
+
+        command, value = entry.split(":", 1)
+        limits[command.upper()] = int(value) if value else None
+
+    return limits
+
+
+def group_targets(targets: Iterable[str], limit: Optional[int], max_bytes: int,
+                  encoding: str="UTF-8") -> List[str]:
+    """
+    Combine targets into comma-separated groups.
+
+    :param targets: The targets to combine
+    :param limit: The most targets a group may contain, or None for no limit
+    :param max_bytes: The most bytes a group may contain once encoded, unless it only has one target
+    :param encoding: The encoding the groups will be sent in
+    """
+
+    groups = []
+    group = []
+    length = 0
+
+    for target in targets:
+        size = len(target.encode(encoding))
+
+        if group and ((limit and len(group) >= limit) or length + 1 + size > max_bytes):
+            groups.append(",".join(group))
+            group = []
+            length = 0
+
+        length += size + (1 if group else 0)
+        group.append(target)
+
+    if group:
+        groups.append(",".join(group))
+
+    return groups
+
+
+def split_text(text: str, max_bytes: int, encoding: str="UTF-8") -> List[str]:
+    """
+    Split some text into chunks that are no longer than `max_bytes` once encoded.
+
+    Characters are never split, and chunks are split at a space when there is one in the second half of the
+    chunk. Line breaks always start a new chunk, and empty lines are dropped.
+
+    The encoding must be ASCII-compatible, as IRC itself requires.
+    """
+
+    if max_bytes < 1:
+        raise ValueError("max_bytes must be at least 1, not {}".format(max_bytes))
+
+    is_utf8 = codecs.lookup(encoding).name == "utf-8"
+    chunks = []
+
+    for line in text.splitlines():
+        data = line.encode(encoding)
+
+        while len(data) > max_bytes:
+            cut = max_bytes
+
+            if is_utf8:
+                # Back up over continuation bytes to the start of a character
+                while cut > 0 and (data[cut] & 0xC0) == 0x80:
+                    cut -= 1
+            else:
+                while cut > 0:
+                    try:
+                        data[:cut].decode(encoding)
+                    except UnicodeDecodeError:
+                        cut -= 1
+                    else:
+                        break
+
+            if cut == 0:
+                raise ValueError("max_bytes ({}) is too small to fit a single character".format(max_bytes))
+
+            space = data.rfind(b" ", 0, cut + 1)
+
+            if space > max_bytes // 2:
+                chunks.append(data[:space].decode(encoding))
+                data = data[space + 1:]
+            else:
+                chunks.append(data[:cut].decode(encoding))
+                data = data[cut:]
+
+        if data:
+            chunks.append(data.decode(encoding))
+
+    return chunks
@@ -1,23 +1,34 @@
 # coding=utf-8
+import asyncio
+
 from typing import Optional
 
-from ultros.core.networks.base.networks.base import BaseNetwork
+from ultros.core.networks.base.networks.base import BaseNetwork, network_registry
 from ultros.networks.irc.connectors.plain import PlainIRCConnector
 from ultros.networks.irc.servers.irc import IRCServer
 
 __author__ = "Gareth Coles"
 
 
+@network_registry.register()
 class IRCNetwork(BaseNetwork):
     type = "irc"
 
     def create_server(self, name: str, *args, **kwargs):
-        server = IRCServer(name, self)
+        reconnect = self.config.get("reconnect", {})
+
+        if reconnect is not None and not isinstance(reconnect, dict):
+            reconnect = {} if reconnect else None  # Allow `reconnect: true` and `reconnect: false`
+
+        server = IRCServer(name, self, self.config.get("channels") or [], reconnect)
 
         self._create_server(server)
         return server
 
     async def shutdown(self):
+        for server in self._servers.values():
+            server.close()
+
         await self._shutdown()
 
     async def setup(self):
@@ -26,13 +37,38 @@ class IRCNetwork(BaseNetwork):
         encoding = self.config.get("encoding") or self.ultros.config["default_encoding"]
 
         server = self.create_server(host)
-        connector = self.create_connector(host, port, encoding, server=server)
+        connectors = [
+            self.create_connector(host, port, encoding, server=server, index=index)
+            for index in range(max(1, self.config.get("connections") or 1))
+        ]
+
+        await asyncio.gather(*(connector.do_connect() for connector in connectors))
 
-        await connector.do_connect()
+    def create_connector(self, *args, server=None, index: int=0, **kwargs):
+        """
+        Create a connector. Every connector after the first in a pool (`index` above 0) is given a name and nick
+        with the index added to the end.
+        """
 
-    def create_connector(self, *args, server=None, **kwargs):
         host, port, encoding = args[0], args[1], args[2]
-        connector = PlainIRCConnector(host, self, server, host=host, port=port, encoding=encoding)
+        flood = self.config.get("flood") or {}
+        nickname = self.config.get("nick", "Testros")
+        name = host
+
+        if index:
+            nickname = "{}{}".format(nickname, index)
+            name = "{}/{}".format(host, index)
+
+        connector = PlainIRCConnector(
+            name, self, server, host=host, port=port, encoding=encoding,
+            flood_rate=flood.get("rate", 0.5), flood_burst=flood.get("burst", 5),
+            nickname=nickname, ident=self.config.get("ident", "test"),
+            quit_message=self.config.get("quit_message") or "Shutting down"
+        )
 
         self._create_connector(connector, server)
+
+        if server is not None:
+            server.add_connector(connector)
+
         return connector
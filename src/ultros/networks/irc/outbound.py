@@ -0,0 +1,234 @@
+# coding=utf-8
+
+"""
+Outbound line scheduling and flood control for IRC connections.
+
+IRC servers will throttle or disconnect clients that send too many lines too
+quickly, so lines aren't written to the transport directly. Instead, they're
+placed into one of several priority lanes, and drained by a background task
+at a rate controlled by a token bucket. Every line costs one token; the
+bucket holds up to `burst` tokens and refills at `rate` tokens per second.
+
+Lines that are ready to go out at the same time are joined together and sent
+with a single `transport.write()` call.
+"""
+
+import asyncio
+
+from collections import deque
+from enum import IntEnum
+from time import monotonic
+from typing import Callable, Dict, Optional
+
+__author__ = "Gareth Coles"
+
+
+class Priority(IntEnum):
+    """
+    Priorities for outbound lines. Lower priorities are sent first.
+
+    :ivar URGENT: Protocol replies and registration, eg PONG
+    :ivar NORMAL: Messages and commands
+    :ivar LOW: Bulk sends that can wait behind everything else
+    """
+
+    URGENT = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class TokenBucket:
+    """
+    A simple token bucket.
+
+    :param rate: How many tokens are added per second, or None for no limit
+    :param capacity: The maximum number of tokens the bucket can hold
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: Optional[float], capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+
+        self.tokens = float(capacity)
+        self.updated = monotonic()
+
+    def _refill(self):
+        now = monotonic()
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, wanted: int) -> int:
+        """
+        Take up to `wanted` whole tokens from the bucket.
+
+        :return: The number of tokens that were taken
+        """
+
+        if not self.rate:
+            return wanted
+
+        self._refill()
+
+        taken = min(wanted, int(self.tokens))
+        self.tokens -= taken
+
+        return taken
+
+    def delay(self) -> float:
+        """
+        How long to wait, in seconds, before another token is available.
+        """
+
+        if not self.rate:
+            return 0.0
+
+        self._refill()
+
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class OutboundQueue:
+    """
+    A prioritised, flood-controlled queue of lines waiting to be written.
+
+    Call `start()` with the function to write data with once connected, and `stop()` when disconnected. Lines
+    may be queued at any time, but are thrown away when the queue is stopped.
+
+    :param rate: Lines per second to send once the burst has been used up, or None for no limit
+    :param burst: How many lines may be sent at once
+    """
+
+    def __init__(self, rate: Optional[float]=0.5, burst: int=5):
+        self.bucket = TokenBucket(rate, burst)
+        self.lanes = tuple(deque() for _ in Priority)
+
+        self._write = None  #: Callable[[bytes], None]
+        self._task = None  #: asyncio.Task
+        self._wakeup = None  #: asyncio.Event
+        self._drained = None  #: asyncio.Event
+
+        self.lines_sent = 0  #: int: Lines written since creation
+        self.writes = 0  #: int: Calls to the write function since creation
+        self.total_wait = 0.0  #: float: Total seconds spent queued by all lines written
+        self.max_wait = 0.0  #: float: Longest time spent queued by a single line
+
+    def __len__(self):
+        """
+        The total number of lines waiting to be sent.
+        """
+
+        return sum(len(lane) for lane in self.lanes)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def put(self, line: bytes, priority: Priority=Priority.NORMAL):
+        """
+        Queue a line to be sent. It should already include the line ending.
+        """
+
+        self.lanes[priority].append((line, monotonic()))
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+            self._drained.clear()
+
+    def start(self, write: Callable[[bytes], None]):
+        """
+        Start draining the queue, using `write` to send data.
+        """
+
+        if self._task is not None:
+            self.stop()
+
+        self._write = write
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+
+        if len(self):
+            self._wakeup.set()
+        else:
+            self._drained.set()
+
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        """
+        Stop draining the queue, and throw away any lines that are waiting.
+        """
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        for lane in self.lanes:
+            lane.clear()
+
+        if self._drained is not None:
+            self._drained.set()
+
+        self._write = None
+        self._wakeup = None
+
+    async def flush(self):
+        """
+        Wait until every queued line has been written, or the queue is stopped.
+        """
+
+        if self._drained is not None:
+            await self._drained.wait()
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get a dict of metrics describing the queue - the current depth (overall and for each priority), how many
+        lines and writes have been sent, and how long lines have spent waiting.
+        """
+
+        return {
+            "depth": len(self),
+            "depth_by_priority": {priority.name: len(self.lanes[priority]) for priority in Priority},
+            "lines_sent": self.lines_sent,
+            "writes": self.writes,
+            "average_wait": self.total_wait / self.lines_sent if self.lines_sent else 0.0,
+            "max_wait": self.max_wait
+        }
+
+    async def _run(self):
+        while True:
+            if not len(self):
+                self._drained.set()
+                self._wakeup.clear()
+
+                await self._wakeup.wait()
+
+                # Give anything else queued during this iteration of the event loop a chance to join the batch
+                await asyncio.sleep(0)
+
+            taken = self.bucket.take(len(self))
+
+            if not taken:
+                await asyncio.sleep(self.bucket.delay())
+                continue
+
+            now = monotonic()
+            batch = []
+
+            for lane in self.lanes:
+                while lane and len(batch) < taken:
+                    line, queued = lane.popleft()
+                    batch.append(line)
+
+                    waited = now - queued
+                    self.total_wait += waited
+
+                    if waited > self.max_wait:
+                        self.max_wait = waited
+
+            self._write(b"".join(batch))
+
+            self.lines_sent += len(batch)
+            self.writes += 1
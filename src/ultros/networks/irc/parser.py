@@ -0,0 +1,200 @@
+# coding=utf-8
+
+"""
+Parsing for IRC lines.
+
+Lines are parsed into `IRCMessage` objects by partitioning the line at the
+boundaries between its parts once each, rather than splitting it up
+repeatedly. IRCv3 message tags are kept as a raw string until they're
+actually needed - most handlers never look at them - and are unescaped as
+described in the `message-tags` specification when they are.
+"""
+
+import re
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+__author__ = "Gareth Coles"
+
+_TAG_ESCAPES = {
+    ":": ";",
+    "s": " ",
+    "\\": "\\",
+    "r": "\r",
+    "n": "\n"
+}
+
+_TAG_UNESCAPES = {value: "\\" + key for key, value in _TAG_ESCAPES.items()}
+
+_TAG_ESCAPE_RE = re.compile(r"\\(.?)", re.DOTALL)
+_TAG_UNESCAPE_RE = re.compile(r"[; \\\r\n]")
+
+
+def unescape_tag_value(value: str) -> str:
+    """
+    Unescape the value of a message tag.
+
+    Unknown escapes are replaced with the escaped character, and a lone
+    backslash at the end of the value is dropped.
+    """
+
+    if "\\" not in value:
+        return value
+
+    return _TAG_ESCAPE_RE.sub(lambda match: _TAG_ESCAPES.get(match.group(1), match.group(1)), value)
+
+
+def escape_tag_value(value: str) -> str:
+    """
+    Escape a value so it can be sent as the value of a message tag.
+    """
+
+    return _TAG_UNESCAPE_RE.sub(lambda match: _TAG_UNESCAPES[match.group(0)], value)
+
+
+def parse_tags(raw_tags: str) -> Dict[str, Optional[str]]:
+    """
+    Parse a raw string of message tags - without the leading `@` - into a
+    dict.
+
+    Tags without a value, or with an empty value, are given a value of None.
+    If a tag is present more than once, the last value is used.
+    """
+
+    tags = {}
+
+    for tag in raw_tags.split(";"):
+        if not tag:
+            continue
+
+        key, _, value = tag.partition("=")
+        tags[key] = unescape_tag_value(value) if value else None
+
+    return tags
+
+
+class IRCMessage:
+    """
+    A single parsed IRC line.
+
+    :ivar raw_tags: The message tags as they were received, without the
+                    leading `@`, or None if there weren't any
+    :ivar prefix: The message prefix, without the leading `:`, or None
+    :ivar command: The command or numeric, in upper case
+    :ivar params: A list of the message parameters, including the trailing
+                  parameter if there was one
+    """
+
+    __slots__ = ("raw_tags", "prefix", "command", "params", "_tags")
+
+    def __init__(self, raw_tags: Optional[str], prefix: Optional[str], command: str, params: List[str]):
+        self.raw_tags = raw_tags
+        self.prefix = prefix
+        self.command = command
+        self.params = params
+
+        self._tags = None
+
+    @property
+    def tags(self) -> Dict[str, Optional[str]]:
+        """
+        The message tags, parsed and unescaped the first time they're needed.
+        """
+
+        if self._tags is None:
+            if self.raw_tags:
+                self._tags = parse_tags(self.raw_tags)
+            else:
+                self._tags = {}
+
+        return self._tags
+
+    @property
+    def server_time(self) -> Optional[datetime]:
+        """
+        When the server says the message was sent, from the `server-time`
+        tag, or None if it wasn't tagged.
+        """
+
+        if not self.raw_tags:
+            return None
+
+        return parse_server_time(self.tags.get("time"))
+
+    def __repr__(self):
+        return "<IRCMessage tags={!r} prefix={!r} command={!r} params={!r}>".format(
+            self.raw_tags, self.prefix, self.command, self.params
+        )
+
+
+def parse_server_time(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse the value of a `server-time` tag, eg "2011-10-19T16:40:51.620Z",
+    into a timezone-aware datetime in UTC.
+
+    :return: The datetime, or None if the value is missing or invalid
+    """
+
+    if not value:
+        return None
+
+    for time_format in ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"):
+        try:
+            return datetime.strptime(value, time_format).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+
+    return None
+
+
+def split_prefix(prefix: Optional[str]) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Split a message prefix into a nick (or server name), ident and host. The ident and host are None if they
+    aren't present.
+    """
+
+    if not prefix:
+        return "", None, None
+
+    nick, _, userhost = prefix.partition("!")
+    ident, _, host = userhost.partition("@")
+
+    if not host and "@" in nick:
+        nick, _, host = nick.partition("@")
+
+    return nick, ident or None, host or None
+
+
+def parse_line(line: str) -> IRCMessage:
+    """
+    Parse a single line, without its line ending, into an `IRCMessage`.
+
+    :raises ValueError: If the line doesn't contain a command
+    """
+
+    raw_tags = None
+    prefix = None
+
+    if line[:1] == "@":
+        raw_tags, _, line = line.partition(" ")
+        raw_tags = raw_tags[1:]
+        line = line.lstrip(" ")
+
+    if line[:1] == ":":
+        prefix, _, line = line.partition(" ")
+        prefix = prefix[1:]
+
+    middle, trailing_found, trailing = line.partition(" :")
+    params = middle.split()
+
+    if not params or middle[:1] == ":":
+        raise ValueError("No command found in line: {!r}".format(line))
+
+    command = params[0].upper()
+    del params[0]
+
+    if trailing_found:
+        params.append(trailing)
+
+    return IRCMessage(raw_tags, prefix, command, params)
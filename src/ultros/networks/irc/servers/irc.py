@@ -1,30 +1,221 @@
 # coding=utf-8
+import asyncio
+
 from _weakref import ref
+from typing import Dict, Iterable, List, Optional, Union
+from zlib import crc32
 
+from ultros.core.networks.base.networks import base as base_network
 from ultros.core.networks.base.servers.base import BaseServer
+from ultros.networks.irc.backoff import Backoff
+from ultros.networks.irc.casemapping import casefold
+from ultros.networks.irc.connectors import base as irc_connector
+from ultros.networks.irc.outbound import Priority
 
 __author__ = "Gareth Coles"
 
 
 class IRCServer(BaseServer):
-    _connector = None
+    """
+    An IRC server, reached through a pool of one or more connections.
+
+    Each channel is assigned to one connection in the pool by hashing its (case-folded) name, so the channel list
+    is split evenly between connections and a channel always goes to the same one. Messages are sent through a
+    connection that's in the target channel, or for nicks, whichever connection has the fewest lines waiting to be
+    sent. Each connection has its own flood limits, so the pool as a whole can send that many times faster.
+
+    Connections that drop are reconnected after a jittered, exponentially increasing delay; see the `backoff`
+    module. The connector's channel state is kept while it's disconnected, and it rejoins its channels (in as few
+    JOIN lines as possible) once it's registered again.
+
+    :param reconnect: Keyword arguments for `Backoff`, or None to turn reconnecting off
+    """
 
-    def __init__(self, name: str, network: "base_network.BaseNetwork"):
+    def __init__(self, name: str, network: "base_network.BaseNetwork", channels: Iterable[str]=(),
+                 reconnect: Optional[dict]=None):
         super().__init__(name, network)
 
+        self.channels = list(channels)  #: List[str]: Channels to join once connected
         self.server_capabilities = []
 
+        self.reconnect = reconnect
+        self.closing = False
+
+        self._connectors = []  #: List[ref]: The pool of connectors, in the order they were added
+        self._backoffs = {}  #: Dict[str, Backoff]: Connector name -> backoff
+        self._reconnect_tasks = {}  #: Dict[str, asyncio.Task]: Connector name -> pending reconnection
+
     @property
-    def connector(self):
-        if self._connector:
-            return self._connector()
-        return None
+    def connectors(self) -> List["irc_connector.BaseIRCConnector"]:
+        """
+        Every connector in the pool, whether it's connected or not.
+        """
+
+        return [connector for connector in (r() for r in self._connectors) if connector is not None]
+
+    @property
+    def ready_connectors(self) -> List["irc_connector.BaseIRCConnector"]:
+        """
+        The connectors in the pool that are connected and registered.
+        """
+
+        return [connector for connector in self.connectors if connector.registered]
+
+    @property
+    def connector(self) -> Optional["irc_connector.BaseIRCConnector"]:
+        """
+        The first ready connector in the pool, or None if none are ready.
+        """
+
+        ready = self.ready_connectors
+        return ready[0] if ready else None
+
+    def add_connector(self, connector: "irc_connector.BaseIRCConnector"):
+        """
+        Add a connector to the pool. This changes which connector most channels are assigned to, so the pool
+        should be filled before connecting.
+        """
+
+        if connector not in self.connectors:
+            self._connectors.append(ref(connector))
+
+    def get_shard(self, channel: str) -> Optional["irc_connector.BaseIRCConnector"]:
+        """
+        Get the connector a channel is assigned to, whether it's ready or not.
+        """
+
+        connectors = self.connectors
+
+        if not connectors:
+            return None
+
+        # crc32 rather than hash(), so channels stay on the same connection between runs. The key is always folded
+        # with rfc1459 rather than the server's case mapping, which is only known after RPL_ISUPPORT - otherwise a
+        # channel could be assigned to different connections before and after it arrives. Names that are the same
+        # under ascii or strict-rfc1459 are the same under rfc1459 too.
+        key = casefold(channel, "rfc1459")
+        return connectors[crc32(key.encode("UTF-8")) % len(connectors)]
+
+    def get_channel_connector(self, channel: str) -> Optional["irc_connector.BaseIRCConnector"]:
+        """
+        Get the best ready connector to send to a channel with - the least busy connector that's in the channel,
+        or the channel's assigned connector if none are in it.
+        """
+
+        in_channel = [
+            connector for connector in self.ready_connectors if connector.state.get_channel(channel) is not None
+        ]
+
+        if in_channel:
+            return min(in_channel, key=lambda c: len(c.outbound))
+
+        shard = self.get_shard(channel)
+
+        if shard is not None and shard.registered:
+            return shard
+
+        return self.get_least_busy_connector()
+
+    def get_least_busy_connector(self) -> Optional["irc_connector.BaseIRCConnector"]:
+        """
+        Get the ready connector with the fewest lines waiting to be sent.
+        """
 
-    async def on_ready(self):
-        self.connector.send_join("#Ultros-test")
+        ready = self.ready_connectors
+
+        if not ready:
+            return None
+
+        return min(ready, key=lambda c: len(c.outbound))
+
+    def send_message(self, targets: Union[str, Iterable[str]], text: str, *, notice: bool=False,
+                     priority: Priority=Priority.NORMAL) -> int:
+        """
+        Send a message to one or more channels or nicks, spreading the lines across the pool. See
+        `BaseIRCConnector.send_message()`.
+
+        :return: The number of lines queued
+        """
+
+        if isinstance(targets, str):
+            targets = [targets]
+
+        least_busy = self.get_least_busy_connector()
+
+        if least_busy is None:
+            raise RuntimeError("No connections to {} are ready".format(self.name))
+
+        groups = {}  # type: Dict[irc_connector.BaseIRCConnector, List[str]]
+
+        for target in targets:
+            if least_busy.is_channel(target):
+                connector = self.get_channel_connector(target)
+            else:
+                connector = least_busy
+
+            groups.setdefault(connector, []).append(target)
+
+        return sum(
+            connector.send_message(group, text, notice=notice, priority=priority)
+            for connector, group in groups.items()
+        )
+
+    async def on_ready(self, connector: "irc_connector.BaseIRCConnector"):
+        if connector.name in self._backoffs:
+            self._backoffs[connector.name].reset()
+
+        # Channels we were in before reconnecting, then the channels assigned to this connector
+        channels = {key: channel.name for key, channel in connector.state.channels.items()}
+
+        for channel in self.channels:
+            key = connector.state.key(channel)
+
+            if key not in channels and self.get_shard(channel) is connector:
+                channels[key] = channel
+
+        if channels:
+            connector.send_join(channels.values())
 
     async def connector_connected(self, connector):
-        self._connector = ref(connector)
+        self.add_connector(connector)
 
     async def connector_disconnected(self, connector, exc):
-        pass
+        if self.closing or self.reconnect is None:
+            return
+
+        if connector.name in self._reconnect_tasks:
+            return  # Already reconnecting
+
+        backoff = self._backoffs.get(connector.name)
+
+        if backoff is None:
+            backoff = self._backoffs[connector.name] = Backoff(**self.reconnect)
+
+        delay = backoff.next_delay()
+
+        self.logger.warning("Connection %s lost (%s); reconnecting in %.1fs", connector.name, exc, delay)
+        self._reconnect_tasks[connector.name] = asyncio.ensure_future(self._reconnect(connector, delay))
+
+    async def _reconnect(self, connector: "irc_connector.BaseIRCConnector", delay: float):
+        try:
+            await asyncio.sleep(delay)
+            await connector.do_connect()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            del self._reconnect_tasks[connector.name]
+            await self.connector_disconnected(connector, e)
+        else:
+            del self._reconnect_tasks[connector.name]
+
+    def close(self):
+        """
+        Stop reconnecting - call this before disconnecting on purpose.
+        """
+
+        self.closing = True
+
+        for task in self._reconnect_tasks.values():
+            task.cancel()
+
+        self._reconnect_tasks.clear()
@@ -0,0 +1,455 @@
+# coding=utf-8
+
+"""
+Channel and user state tracking for IRC connections.
+
+`IRCState` keeps track of the channels a connection is in, the users in
+those channels and their prefix modes (op, voice, etc), and channel modes and
+topics. It's updated by the connector as lines arrive.
+
+This is designed to stay small with tens of thousands of users:
+
+* Users are `__slots__` records, and are shared between every channel they're
+  in. They're forgotten as soon as they no longer share a channel with us.
+* Nicks, hosts and member mode strings are interned, so repeated values (such
+  as cloaked hosts, or the many members with no modes) share one string.
+* Channels and users are stored under case-folded keys, using the case mapping
+  the server gives us in RPL_ISUPPORT, so lookups don't need to compare names
+  case-insensitively. Keys come from the shared caches in the `casemapping`
+  module, so folding a name that's been seen recently is a dict lookup.
+"""
+
+import sys
+
+from typing import Dict, Iterable, List, Optional
+
+from ultros.networks.irc.casemapping import DEFAULT_CASEMAPPING, get_casemapping
+
+__author__ = "Gareth Coles"
+
+intern = sys.intern
+
+DEFAULT_CHANMODES = ("beI", "k", "l", "imnpst")  # List modes, always a parameter, parameter when set, never
+DEFAULT_PREFIX = ("ov", "@+")  # Modes, and their symbols
+
+
+class User:
+    """
+    A user that shares at least one channel with us.
+
+    :ivar nick: The user's current nick
+    :ivar ident: The user's ident (the "user" part of their hostmask), if known
+    :ivar host: The user's host, if known
+    :ivar channels: A set of keys for the channels the user is in
+    """
+
+    __slots__ = ("nick", "ident", "host", "channels")
+
+    def __init__(self, nick: str, ident: Optional[str]=None, host: Optional[str]=None):
+        self.nick = intern(nick)
+        self.ident = intern(ident) if ident else None
+        self.host = intern(host) if host else None
+        self.channels = set()
+
+    def __repr__(self):
+        return "<User {}!{}@{}>".format(self.nick, self.ident, self.host)
+
+
+class Channel:
+    """
+    A channel that we're in.
+
+    :ivar name: The channel's name, as we were told it when we joined
+    :ivar topic: The channel topic, if known
+    :ivar modes: A dict of the channel's (non-list) modes, mapping to their parameter or None
+    :ivar members: A dict mapping the keys of the users in the channel to a string of their prefix modes
+    """
+
+    __slots__ = ("name", "topic", "modes", "members", "_pending_members")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.topic = None
+        self.modes = {}
+        self.members = {}
+
+        self._pending_members = None  # Members from an RPL_NAMREPLY sequence that hasn't ended yet
+
+    def __repr__(self):
+        return "<Channel {} ({} members)>".format(self.name, len(self.members))
+
+
+class IRCState:
+    """
+    Tracks the channels we're in and the users in them, for a single connection.
+
+    :param casemapping: The name of the case mapping to use until the server tells us otherwise
+    """
+
+    def __init__(self, casemapping: str=DEFAULT_CASEMAPPING):
+        self.casemapping = casemapping
+        self._fold = get_casemapping(casemapping).fold
+
+        self.users = {}  #: Dict[str, User]: Users, by key
+        self.channels = {}  #: Dict[str, Channel]: Channels, by key
+
+        self.chanmodes = DEFAULT_CHANMODES
+        self.prefix_modes = DEFAULT_PREFIX[0]  #: str: Prefix modes, from highest to lowest
+        self.prefix_symbols = dict(zip(DEFAULT_PREFIX[1], DEFAULT_PREFIX[0]))  #: Dict[str, str]: Symbol -> mode
+
+    # region: Keys and lookups
+
+    def key(self, name: str) -> str:
+        """
+        Get the key for a nick or channel name, using the current case mapping.
+        """
+
+        return self._fold(name)
+
+    def get_user(self, nick: str) -> Optional[User]:
+        return self.users.get(self.key(nick))
+
+    def get_channel(self, name: str) -> Optional[Channel]:
+        return self.channels.get(self.key(name))
+
+    def get_members(self, channel: str) -> List[User]:
+        """
+        Get a list of the users in a channel, or an empty list if we're not in it.
+        """
+
+        _channel = self.get_channel(channel)
+
+        if not _channel:
+            return []
+
+        return [self.users[key] for key in _channel.members]
+
+    def get_member_modes(self, channel: str, nick: str) -> Optional[str]:
+        """
+        Get the prefix modes a user has in a channel, or None if they're not in it.
+        """
+
+        _channel = self.get_channel(channel)
+
+        if not _channel:
+            return None
+
+        return _channel.members.get(self.key(nick))
+
+    # endregion
+
+    # region: Server features
+
+    def update_features(self, supported_features: Dict[str, list]):
+        """
+        Update the case mapping and mode definitions from a connector's RPL_ISUPPORT features.
+        """
+
+        casemapping = (supported_features.get("CASEMAPPING") or [None])[0]
+
+        if casemapping != self.casemapping and get_casemapping(casemapping) is not None:
+            self.set_casemapping(casemapping)
+
+        prefix = (supported_features.get("PREFIX") or [None])[0]
+
+        if prefix and prefix.startswith("(") and ")" in prefix:
+            modes, symbols = prefix[1:].split(")", 1)
+
+            self.prefix_modes = modes
+            self.prefix_symbols = dict(zip(symbols, modes))
+
+        chanmodes = supported_features.get("CHANMODES")
+
+        if chanmodes and len(chanmodes) >= 4:
+            self.chanmodes = tuple(chanmodes[:4])
+
+    def set_casemapping(self, casemapping: str):
+        """
+        Switch to a different case mapping, re-keying everything that's already tracked.
+        """
+
+        self.casemapping = casemapping
+        self._fold = get_casemapping(casemapping).fold
+
+        users = {}
+        key_map = {}
+
+        for old_key, user in self.users.items():
+            new_key = self.key(user.nick)
+            key_map[old_key] = new_key
+            users[new_key] = user
+            user.channels = set()  # Filled in again from the channels' members below
+
+        channels = {}
+
+        for channel in self.channels.values():
+            channel_key = self.key(channel.name)
+            channel.members = {key_map.get(key, key): modes for key, modes in channel.members.items()}
+
+            if channel._pending_members is not None:
+                channel._pending_members = {
+                    key_map.get(key, key): modes for key, modes in channel._pending_members.items()
+                }
+
+            for members in (channel.members, channel._pending_members or {}):
+                for key in members:
+                    user = users.get(key)
+
+                    if user is not None:
+                        user.channels.add(channel_key)
+
+            channels[channel_key] = channel
+
+        self.users = users
+        self.channels = channels
+
+    # endregion
+
+    # region: Updates
+
+    def _add_member(self, channel: Channel, channel_key: str, nick: str, ident: Optional[str], host: Optional[str],
+                    modes: str="", members: Optional[dict]=None) -> str:
+        key = self.key(nick)
+        user = self.users.get(key)
+
+        if user is None:
+            user = User(nick, ident, host)
+            self.users[key] = user
+        else:
+            if ident and user.ident != ident:
+                user.ident = intern(ident)
+            if host and user.host != host:
+                user.host = intern(host)
+
+        user.channels.add(channel_key)
+
+        if members is None:
+            members = channel.members
+
+        members[key] = intern(modes)
+        return key
+
+    def _remove_member(self, channel_key: str, user_key: str):
+        channel = self.channels.get(channel_key)
+
+        if channel is not None:
+            channel.members.pop(user_key, None)
+
+            if channel._pending_members is not None:
+                channel._pending_members.pop(user_key, None)
+
+        user = self.users.get(user_key)
+
+        if user is not None:
+            user.channels.discard(channel_key)
+
+            if not user.channels:
+                del self.users[user_key]
+
+    def _remove_channel(self, channel_key: str):
+        channel = self.channels.get(channel_key)
+
+        if channel is None:
+            return
+
+        for user_key in list(channel.members):
+            self._remove_member(channel_key, user_key)
+
+        del self.channels[channel_key]
+
+    def join(self, channel: str, nick: str, ident: Optional[str]=None, host: Optional[str]=None,
+             is_self: bool=False):
+        """
+        A user joined a channel. If it's us, we start tracking the channel.
+
+        If we were already tracking the channel - because we're rejoining it after reconnecting - its topic, modes
+        and members are kept, and the members are brought up to date by the RPL_NAMREPLY that follows.
+        """
+
+        channel_key = self.key(channel)
+
+        if is_self and channel_key not in self.channels:
+            self.channels[channel_key] = Channel(channel)
+
+        _channel = self.channels.get(channel_key)
+
+        if _channel is not None:
+            self._add_member(_channel, channel_key, nick, ident, host)
+
+    def part(self, channel: str, nick: str, is_self: bool=False):
+        """
+        A user left or was kicked from a channel. If it's us, we stop tracking the channel.
+        """
+
+        channel_key = self.key(channel)
+
+        if is_self:
+            self._remove_channel(channel_key)
+        else:
+            self._remove_member(channel_key, self.key(nick))
+
+    def quit(self, nick: str) -> List[str]:
+        """
+        A user quit - remove them from every channel.
+
+        :return: The names of the channels they were in
+        """
+
+        user_key = self.key(nick)
+        user = self.users.get(user_key)
+
+        if user is None:
+            return []
+
+        names = []
+
+        for channel_key in list(user.channels):
+            names.append(self.channels[channel_key].name)
+            self._remove_member(channel_key, user_key)
+
+        return names
+
+    def nick(self, old_nick: str, new_nick: str):
+        """
+        A user changed their nick.
+        """
+
+        old_key = self.key(old_nick)
+        user = self.users.pop(old_key, None)
+
+        if user is None:
+            return
+
+        new_key = self.key(new_nick)
+        user.nick = intern(new_nick)
+        self.users[new_key] = user
+
+        for channel_key in user.channels:
+            channel = self.channels[channel_key]
+            channel.members[new_key] = channel.members.pop(old_key, "")
+
+            if channel._pending_members is not None and old_key in channel._pending_members:
+                channel._pending_members[new_key] = channel._pending_members.pop(old_key)
+
+    def names(self, channel: str, entries: Iterable[str]):
+        """
+        Part of an RPL_NAMREPLY sequence arrived. Entries may have several prefix symbols (multi-prefix) and may be
+        full hostmasks (userhost-in-names).
+
+        The channel's member list is replaced when the sequence ends - see `names_end()`.
+        """
+
+        channel_key = self.key(channel)
+        _channel = self.channels.get(channel_key)
+
+        if _channel is None:
+            return
+
+        if _channel._pending_members is None:
+            _channel._pending_members = {}
+
+        symbols = self.prefix_symbols
+
+        for entry in entries:
+            if not entry:
+                continue
+
+            position = 0
+
+            while position < len(entry) and entry[position] in symbols:
+                position += 1
+
+            modes = "".join(symbols[symbol] for symbol in entry[:position])
+            nick, _, userhost = entry[position:].partition("!")
+            ident, _, host = userhost.partition("@")
+
+            self._add_member(_channel, channel_key, nick, ident, host, modes, _channel._pending_members)
+
+    def names_end(self, channel: str):
+        """
+        An RPL_NAMREPLY sequence ended (RPL_ENDOFNAMES) - replace the channel's member list with the one we were sent.
+        """
+
+        channel_key = self.key(channel)
+        _channel = self.channels.get(channel_key)
+
+        if _channel is None or _channel._pending_members is None:
+            return
+
+        pending = _channel._pending_members
+        _channel._pending_members = None
+
+        for user_key in list(_channel.members):
+            if user_key not in pending:
+                self._remove_member(channel_key, user_key)
+
+        _channel.members = pending
+
+    def topic(self, channel: str, topic: Optional[str]):
+        _channel = self.get_channel(channel)
+
+        if _channel is not None:
+            _channel.topic = topic or None
+
+    def mode(self, channel: str, modes: str, params: List[str]):
+        """
+        A channel's modes changed.
+
+        :param channel: The channel name
+        :param modes: The mode string, eg "+o-v+l"
+        :param params: The parameters for the modes that take them
+        """
+
+        channel_key = self.key(channel)
+        _channel = self.channels.get(channel_key)
+
+        if _channel is None:
+            return
+
+        list_modes, param_modes, set_param_modes, _ = self.chanmodes
+        params = iter(params)
+        adding = True
+
+        for mode in modes:
+            if mode == "+":
+                adding = True
+            elif mode == "-":
+                adding = False
+            elif mode in self.prefix_modes:
+                user_key = self.key(next(params, ""))
+                current = _channel.members.get(user_key)
+
+                if current is None:
+                    continue
+
+                if adding:
+                    if mode not in current:
+                        # Keep prefix modes ordered from highest to lowest
+                        current = "".join(m for m in self.prefix_modes if m in current or m == mode)
+                elif mode in current:
+                    current = current.replace(mode, "")
+
+                _channel.members[user_key] = intern(current)
+            elif mode in list_modes:
+                next(params, None)  # We don't track lists
+            elif mode in param_modes or (mode in set_param_modes and adding):
+                param = next(params, None)
+
+                if adding:
+                    _channel.modes[mode] = param
+                else:
+                    _channel.modes.pop(mode, None)
+            elif adding:
+                _channel.modes[mode] = None
+            else:
+                _channel.modes.pop(mode, None)
+
+    def clear(self):
+        """
+        Forget everything.
+        """
+
+        self.users.clear()
+        self.channels.clear()
+
+    # endregion
@@ -0,0 +1,31 @@
+# coding=utf-8
+from ultros.networks.irc.backoff import Backoff
+
+from nose.tools import assert_equal, assert_true
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class TestBackoff(TestCase):
+    def test_backoff(self):
+        """
+        Jittered exponential backoff
+        """
+
+        backoff = Backoff(initial=1, maximum=10, multiplier=2, jitter=0.5)
+        delays = [backoff.next_delay() for _ in range(6)]
+
+        for delay, expected in zip(delays, [1, 2, 4, 8, 10, 10]):
+            assert_true(expected / 2 <= delay <= expected, "Delay {} not within jitter of {}".format(delay, expected))
+
+        assert_equal(backoff.attempts, 6, "Attempts not counted")
+
+        backoff.reset()
+        assert_true(backoff.next_delay() <= 1, "Backoff not reset")
+
+        backoff = Backoff(initial=1, maximum=10, jitter=0)
+        backoff.attempts = 10000
+
+        assert_equal(backoff.next_delay(), 10, "Delay not capped after many attempts")
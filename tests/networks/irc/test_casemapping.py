@@ -0,0 +1,48 @@
+# coding=utf-8
+from ultros.networks.irc.casemapping import CaseMapping, casefold, get_casemapping
+
+from nose.tools import assert_equal, assert_true, assert_false, assert_is_none, assert_raises
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class TestCaseMapping(TestCase):
+    def test_fold(self):
+        """
+        IRC case mapping: Folding names
+        """
+
+        assert_equal(casefold("Nick[]\\~", "rfc1459"), "nick{}|^", "Incorrect rfc1459 folding")
+        assert_equal(casefold("Nick[]\\~", "strict-rfc1459"), "nick{}|~", "Incorrect strict-rfc1459 folding")
+        assert_equal(casefold("Nick[]\\~", "ascii"), "nick[]\\~", "Incorrect ascii folding")
+        assert_equal(casefold("NÍCK", "ascii"), "nÍck", "Non-ASCII letters folded")
+
+        mapping = get_casemapping("rfc1459")
+
+        assert_true(mapping.equals("#Ultros[3K]", "#ultros{3k}"), "Equal names not equal")
+        assert_false(mapping.equals("#Ultros", "#Ultros3K"), "Different names equal")
+
+    def test_cache(self):
+        """
+        IRC case mapping: Shared, bounded key cache
+        """
+
+        assert_true(get_casemapping("ascii") is get_casemapping("ascii"), "Case mapping not shared")
+        assert_is_none(get_casemapping("rfc7613"), "Unsupported case mapping returned")
+        assert_raises(ValueError, CaseMapping, "unknown")
+
+        mapping = CaseMapping("rfc1459", cache_size=2)
+
+        first = mapping.fold("".join(["Some", "Nick"]))
+        second = mapping.fold("".join(["Some", "Nick"]))
+
+        assert_true(first is second, "Folded key not cached")
+        assert_equal(mapping.cache_info().hits, 1, "Folded key not cached")
+
+        mapping.fold("a")
+        mapping.fold("b")
+        mapping.fold("c")
+
+        assert_equal(mapping.cache_info().currsize, 2, "Cache not bounded")
@@ -0,0 +1,422 @@
+# coding=utf-8
+import asyncio
+import queue
+
+from ultros.networks.irc.connectors.plain import PlainIRCConnector
+from ultros.networks.irc.parser import parse_line
+
+from nose.tools import assert_equal, assert_true, assert_false, assert_in, assert_not_in
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class FakeNetwork:
+    name = "test"
+    ultros = None
+
+    def notify_connected(self, connector):
+        pass
+
+    def notify_disconnected(self, connector, exc):
+        pass
+
+
+class FakeTransport:
+    def __init__(self):
+        self.written = []
+        self.paused = False
+        self.closed = False
+
+    def write(self, data):
+        self.written.append(data)
+
+    def pause_reading(self):
+        self.paused = True
+
+    def resume_reading(self):
+        self.paused = False
+
+    def is_closing(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnector(TestCase):
+    def setUp(self):
+        self.network = FakeNetwork()
+        self.connector = PlainIRCConnector("test", self.network, None)
+        self.transport = FakeTransport()
+        self.connector.transport = self.transport
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(None)
+
+    def tearDown(self):
+        del self.connector
+        del self.network
+        del self.transport
+
+        self.loop.close()
+        del self.loop
+
+    def dispatch(self, line):
+        self.loop.run_until_complete(self.connector.dispatch_line(parse_line(line)))
+
+    def queued(self):
+        return [line for lane in self.connector.outbound.lanes for line, _ in lane]
+
+    def test_dispatch_table(self):
+        """
+        IRC command dispatch table
+        """
+
+        handlers = self.connector.command_handlers
+
+        assert_in("PING", handlers, "Built-in handler missing")
+        assert_in("001", handlers, "Built-in numeric handler missing")
+        assert_not_in("UNHANDLED", handlers, "Fallback handler in table")
+        assert_true(
+            PlainIRCConnector.get_command_handler_names() is PlainIRCConnector.get_command_handler_names(),
+            "Handler names worked out more than once"
+        )
+
+        self.dispatch("PING :irc.example.net")
+        assert_equal(self.queued(), [b"PONG :irc.example.net\r\n"], "PING not handled")
+
+        received = []
+        unhandled = []
+
+        async def handler(message):
+            received.append(message)
+
+        async def irc_UNHANDLED(message):
+            unhandled.append(message)
+
+        self.connector.irc_UNHANDLED = irc_UNHANDLED
+
+        self.dispatch(":nick!user@host PRIVMSG #channel :hi")
+        assert_equal(len(unhandled), 1, "Unknown command not passed to fallback handler")
+
+        self.connector.add_command_handler("privmsg", handler)
+        self.connector.add_command_handler("PING", handler)
+
+        self.dispatch(":nick!user@host PRIVMSG #channel :hi")
+        self.dispatch("PING :irc.example.net")
+
+        assert_equal([m.command for m in received], ["PRIVMSG", "PING"], "Added handlers not called")
+        assert_equal(len(unhandled), 1, "Handled command passed to fallback handler")
+        assert_equal(len(self.queued()), 2, "Built-in handler not called with added handler")
+
+        assert_true(self.connector.remove_command_handler("PRIVMSG", handler), "Handler not removed")
+        assert_false(self.connector.remove_command_handler("PRIVMSG", handler), "Handler removed twice")
+        assert_true(self.connector.remove_command_handler("PING", handler), "Handler not removed")
+
+        self.dispatch(":nick!user@host PRIVMSG #channel :hi")
+        assert_equal(len(unhandled), 2, "Removed handler still called")
+        assert_in("PING", self.connector.command_handlers, "Built-in handler removed")
+
+    def test_ordered_dispatch(self):
+        """
+        IRC lines are dispatched in order, with backpressure
+        """
+
+        received = []
+
+        async def slow_handler(message):
+            await asyncio.sleep(0.01)
+            received.append(message.params[-1])
+
+        async def fast_handler(message):
+            received.append(message.params[-1])
+
+        self.connector.add_command_handler("PRIVMSG", slow_handler)
+        self.connector.add_command_handler("NOTICE", fast_handler)
+
+        self.connector.dispatch_high_water = 3
+        self.connector.dispatch_low_water = 1
+
+        async def do_test():
+            self.connector.connection_made(self.transport)
+
+            self.connector.data_received(
+                b":a!b@c PRIVMSG #channel :1\r\n:a!b@c NOTICE #channel :2\r\n"
+                b":a!b@c PRIVMSG #channel :3\r\n:a!b@c NOTICE #channel :4\r\n"
+            )
+
+            assert_true(self.transport.paused, "Reading not paused")
+
+            self.connector.connection_lost(None)
+            await self.connector.dispatch_task
+
+        self.loop.run_until_complete(do_test())
+
+        assert_equal(received, ["1", "2", "3", "4"], "Lines dispatched out of order")
+        assert_false(self.transport.paused, "Reading not resumed")
+
+    def test_send_message(self):
+        """
+        Sending messages split by byte length and grouped by target
+        """
+
+        self.connector.nickname = "Ultros"
+        self.connector.userhost = "~ultros@ultros.io"
+
+        assert_equal(self.connector.send_message("#a", "hello\nthere"), 2, "Incorrect line count")
+        assert_equal(
+            self.queued(), [b"PRIVMSG #a :hello\r\n", b"PRIVMSG #a :there\r\n"], "Incorrect lines"
+        )
+
+        self.connector.outbound.stop()
+        self.loop.run_until_complete(self.connector.irc_005(parse_line(
+            ":irc.example.net 005 Ultros TARGMAX=PRIVMSG:2,NOTICE:1 :are supported by this server"
+        )))
+
+        assert_equal(self.connector.send_message(["#a", "#b", "#c"], "hi"), 2, "Incorrect line count")
+        assert_equal(self.connector.send_message(["#a", "#b", "#A"], "hi", notice=True), 2, "Incorrect line count")
+        assert_equal(
+            self.queued(),
+            [b"PRIVMSG #a,#b :hi\r\n", b"PRIVMSG #c :hi\r\n", b"NOTICE #a :hi\r\n", b"NOTICE #b :hi\r\n"],
+            "Incorrect lines"
+        )
+
+        self.connector.outbound.stop()
+        self.connector.send_message("#a", "\u00e9" * 1000)
+
+        prefix_length = len(b":Ultros!~ultros@ultros.io ")
+
+        for line in self.queued():
+            assert_true(prefix_length + len(line) <= 512, "Line too long: {} bytes".format(len(line)))
+            line.decode("UTF-8")
+
+        self.connector.userhost = None
+        self.connector.outbound.stop()
+        self.connector.send_message("#a", "a" * 1000)
+
+        for line in self.queued():
+            assert_true(
+                len(":Ultros!~test@ ".encode("UTF-8")) + 63 + len(line) <= 512,
+                "Line too long without a known host: {} bytes".format(len(line))
+            )
+
+    def test_state_tracking(self):
+        """
+        Channel state updated from JOIN, NAMES, MODE, NICK, KICK and QUIT
+        """
+
+        self.connector.nickname = "Ultros"
+        state = self.connector.state
+
+        self.dispatch(":irc.example.net 005 Ultros CASEMAPPING=ascii PREFIX=(ov)@+ :are supported by this server")
+        self.dispatch(":Ultros!~ultros@ultros.io JOIN #Channel")
+        self.dispatch(":irc.example.net 332 Ultros #Channel :Some topic")
+        self.dispatch(":irc.example.net 353 Ultros = #Channel :@Ultros +Someone [other]")
+        self.dispatch(":irc.example.net 366 Ultros #Channel :End of /NAMES list.")
+
+        assert_equal(self.connector.userhost, "~ultros@ultros.io", "Own userhost not learned")
+        assert_equal(state.casemapping, "ascii", "CASEMAPPING not used")
+        assert_equal(state.get_channel("#channel").topic, "Some topic", "Topic not stored")
+        assert_equal(len(state.get_members("#channel")), 3, "NAMES not tracked")
+
+        self.dispatch(":Someone!a@b MODE #Channel +o-v Someone Someone")
+        self.dispatch(":Someone!a@b NICK :Renamed")
+        self.dispatch(":Renamed!a@b KICK #Channel [OTHER] :Bye")
+
+        assert_equal(state.get_member_modes("#channel", "renamed"), "o", "MODE or NICK not tracked")
+        assert_equal(state.get_user("[other]"), None, "KICK not tracked")
+
+        self.dispatch(":Renamed!a@b QUIT :Bye")
+        self.dispatch(":Ultros!~ultros@ultros.io NICK :ULTROS2")
+
+        assert_equal(self.connector.nickname, "ULTROS2", "Own nick change not tracked")
+        assert_equal([user.nick for user in state.get_members("#channel")], ["ULTROS2"], "QUIT not tracked")
+
+        self.dispatch(":ultros2!~ultros@ultros.io PART #channel")
+        assert_equal(state.channels, {}, "Own PART not tracked")
+
+    def test_away(self):
+        """
+        RPL_AWAY handled
+        """
+
+        received = []
+
+        async def handler(message):
+            received.append(message)
+
+        self.connector.add_command_handler("301", handler)
+
+        with self.assertLogs(self.connector.logger, "INFO") as logs:
+            self.dispatch(":irc.example.net 301 Ultros Someone :Gone fishing")
+
+        assert_equal(received[0].params, ["Ultros", "Someone", "Gone fishing"], "Dispatched message modified")
+        assert_equal(logs.records[0].getMessage(), "Someone is away: Gone fishing", "Incorrect away message")
+
+    def test_capabilities(self):
+        """
+        IRCv3 capability negotiation
+        """
+
+        self.dispatch(":irc.example.net CAP * LS * :batch multi-prefix sasl=PLAIN")
+        assert_equal(self.queued(), [], "Replied to incomplete CAP LS")
+
+        self.dispatch(":irc.example.net CAP * LS :server-time draft/chathistory")
+        assert_equal(
+            self.queued(), [b"CAP REQ :batch draft/chathistory server-time\r\n"], "Incorrect capabilities requested"
+        )
+
+        self.connector.outbound.stop()
+        self.connector.negotiating_capabilities = True
+
+        self.dispatch(":irc.example.net CAP * ACK :batch draft/chathistory server-time")
+        assert_equal(self.queued(), [b"CAP END\r\n"], "Negotiation not ended")
+        assert_equal(
+            self.connector.enabled_capabilities, {"batch", "draft/chathistory", "server-time"},
+            "Capabilities not enabled"
+        )
+
+        self.connector.outbound.stop()
+        self.dispatch(":irc.example.net CAP Ultros DEL :draft/chathistory")
+
+        assert_false(self.connector.request_history("#channel"), "History requested without support")
+
+        self.dispatch(":irc.example.net CAP Ultros NEW :chathistory")
+        self.dispatch(":irc.example.net CAP Ultros ACK :chathistory")
+
+        assert_true(self.connector.request_history("#channel", 500), "History not requested")
+        assert_equal(
+            self.queued(), [b"CAP REQ :chathistory\r\n", b"CHATHISTORY LATEST #channel * 500\r\n"],
+            "Incorrect lines after negotiation"
+        )
+
+    def test_batches(self):
+        """
+        IRCv3 batches delivered in one handler call
+        """
+
+        self.connector.nickname = "Ultros"
+        state = self.connector.state
+
+        self.dispatch(":Ultros!u@h JOIN #a")
+        self.dispatch(":irc.example.net 353 Ultros = #a :Ultros one two three")
+        self.dispatch(":irc.example.net 366 Ultros #a :End of /NAMES list.")
+
+        quits = []
+        batches = []
+
+        async def irc_QUIT(message):
+            quits.append(message)
+
+        async def handler(batch):
+            batches.append(batch)
+
+        self.connector.add_command_handler("QUIT", irc_QUIT)
+        self.connector.add_batch_handler("netsplit", handler)
+        self.connector.add_batch_handler("draft/example", handler)
+
+        self.dispatch(":irc.example.net BATCH +split netsplit a.example.net b.example.net")
+        self.dispatch("@batch=split :one!a@b QUIT :a.example.net b.example.net")
+        self.dispatch("@batch=split :two!a@b QUIT :a.example.net b.example.net")
+
+        assert_equal(len(state.get_members("#a")), 4, "Batched lines handled before the batch ended")
+
+        self.dispatch(":irc.example.net BATCH -split")
+
+        assert_equal(len(batches), 1, "Batch handler not called")
+        assert_equal(len(batches[0]), 2, "Incorrect batch size")
+        assert_equal(batches[0].params, ["a.example.net", "b.example.net"], "Incorrect batch params")
+        assert_equal(quits, [], "Batched lines dispatched individually")
+        assert_equal([user.nick for user in state.get_members("#a")], ["Ultros", "three"], "State not updated")
+
+        self.dispatch("@time=2017-01-01T12:00:00.000Z :irc.example.net BATCH +outer draft/example")
+        self.dispatch("@batch=outer :irc.example.net BATCH +inner unknown-type")
+        self.dispatch("@batch=inner :three!a@b QUIT :Bye")
+        self.dispatch(":irc.example.net BATCH -inner")
+        self.dispatch(":irc.example.net BATCH -outer")
+
+        outer = batches[-1]
+
+        assert_equal(outer.type, "draft/example", "Outer batch not delivered")
+        assert_equal(outer.message.server_time.year, 2017, "Batch tags not kept")
+        assert_equal(outer.messages[0].type, "unknown-type", "Nested batch not delivered with its parent")
+
+        self.loop.run_until_complete(self.connector.dispatch_batch(outer.messages[0]))
+        assert_equal(len(quits), 1, "Lines in an unhandled batch not dispatched")
+
+    def test_disconnect(self):
+        """
+        Disconnecting sends queued lines, then QUIT
+        """
+
+        self.connector.registered = True
+
+        async def disconnect():
+            self.connector.write_line("PRIVMSG #a :one")
+            self.connector.write_line("PRIVMSG #a :two")
+            self.connector.outbound.start(self.transport.write)
+
+            await self.connector.do_disconnect("Bye")
+            self.connector.outbound.stop()
+
+        self.loop.run_until_complete(disconnect())
+
+        assert_equal(
+            b"".join(self.transport.written),
+            b"PRIVMSG #a :one\r\nPRIVMSG #a :two\r\nQUIT :Bye\r\n",
+            "Queued lines not sent before QUIT"
+        )
+        assert_true(self.transport.closed, "Transport not closed")
+        assert_true(self.transport.paused, "Reading not paused")
+
+        # Disconnecting again does nothing
+        written = len(self.transport.written)
+
+        self.loop.run_until_complete(self.connector.do_disconnect())
+        assert_equal(len(self.transport.written), written, "Lines written after closing")
+
+    def test_disconnect_cancelled(self):
+        """
+        Cancelling a disconnect still sends QUIT
+        """
+
+        self.connector.registered = True
+
+        async def disconnect():
+            for x in range(20):
+                self.connector.write_line("PRIVMSG #a :{}".format(x))
+
+            # Flood control holds most of the lines back, so the queue doesn't drain in time
+            self.connector.outbound.start(lambda data: None)
+
+            try:
+                await asyncio.wait_for(self.connector.do_disconnect(), 0.05)
+            except asyncio.TimeoutError:
+                pass
+
+            self.connector.outbound.stop()
+
+        self.loop.run_until_complete(disconnect())
+
+        assert_equal(self.transport.written, [b"QUIT :Shutting down\r\n"], "QUIT not sent")
+        assert_true(self.transport.closed, "Transport not closed")
+
+    def test_metrics(self):
+        """
+        Lines received and parse failures are counted, and reported as metrics
+        """
+
+        self.connector.dispatch_queue = queue.Queue()  # Only put_nowait() and qsize() are needed
+        self.connector.data_received(b":irc.example.net NOTICE * :hello\r\n:broken\r\n")
+
+        assert_equal(self.connector.lines_received, 2, "Incorrect line count")
+        assert_equal(self.connector.parse_failures, 1, "Incorrect parse failure count")
+
+        metrics = {metric.name: metric for metric in self.connector.collect_metrics()}
+
+        assert_equal(
+            metrics["ultros_irc_lines_received_total"].labels("test", "test").value, 2, "Incorrect metric value"
+        )
+        assert_equal(metrics["ultros_irc_dispatch_backlog"].labels("test", "test").value, 1, "Incorrect backlog")
@@ -0,0 +1,57 @@
+# coding=utf-8
+from ultros.networks.irc.framing import LineFramer
+
+from nose.tools import assert_equal
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class TestFraming(TestCase):
+    def setUp(self):
+        self.framer = LineFramer(compact_threshold=16)
+
+    def tearDown(self):
+        del self.framer
+
+    def test_basics(self):
+        """
+        IRC line framing basics
+        """
+
+        assert_equal(self.framer.feed(b"PING :a\r\n"), [b"PING :a"], "Single line not framed")
+        assert_equal(len(self.framer), 0, "Buffer not drained")
+
+        assert_equal(
+            self.framer.feed(b"PING :a\r\nPING :b\r\n\r\nPING :c"),
+            [b"PING :a", b"PING :b", b""],
+            "Multiple lines not framed"
+        )
+        assert_equal(len(self.framer), 7, "Partial line not kept")
+
+        assert_equal(self.framer.feed(b"\r\n"), [b"PING :c"], "Partial line not completed")
+
+        self.framer.feed(b"PING")
+        self.framer.clear()
+
+        assert_equal(len(self.framer), 0, "Buffer not cleared")
+        assert_equal(self.framer.feed(b"PONG\r\n"), [b"PONG"], "Cleared data was returned")
+
+    def test_split_delimiter(self):
+        """
+        IRC line framing with data split at every possible point
+        """
+
+        data = b":server 353 me = #chan :a b c\r\nPING :12345\r\n:n!u@h PRIVMSG #chan :hello there\r\n"
+        expected = [b":server 353 me = #chan :a b c", b"PING :12345", b":n!u@h PRIVMSG #chan :hello there"]
+
+        for size in range(1, len(data) + 1):
+            framer = LineFramer(compact_threshold=16)
+            lines = []
+
+            for offset in range(0, len(data), size):
+                lines.extend(framer.feed(data[offset:offset + size]))
+
+            assert_equal(lines, expected, "Incorrect lines for chunk size {}".format(size))
+            assert_equal(len(framer), 0, "Buffer not drained for chunk size {}".format(size))
@@ -0,0 +1,69 @@
+# coding=utf-8
+from ultros.networks.irc.messages import get_target_limits, group_targets, split_text
+
+from nose.tools import assert_equal, assert_true, assert_raises
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class TestMessages(TestCase):
+    def test_split_text(self):
+        """
+        Splitting text by encoded length
+        """
+
+        assert_equal(split_text("hello", 10), ["hello"], "Short text split")
+        assert_equal(split_text("hello\r\nthere\n\nfriend", 10), ["hello", "there", "friend"], "Lines not split")
+        assert_equal(split_text("aaaa bbbb cccc", 10), ["aaaa bbbb", "cccc"], "Not split at a space")
+        assert_equal(split_text("aaaaaaaaaaaaaaa", 10), ["aaaaaaaaaa", "aaaaa"], "Long word not split")
+        assert_equal(split_text("", 10), [], "Empty text not dropped")
+
+        for encoding, text in (
+                ("UTF-8", "squid \U0001F991 é ü " * 50),
+                ("Shift_JIS", "イカ squid イカイカ " * 50),
+                ("latin-1", "squid é ü " * 50)
+        ):
+            for max_bytes in (4, 5, 7, 50, 400):
+                chunks = split_text(text, max_bytes, encoding)
+
+                for chunk in chunks:
+                    assert_true(
+                        len(chunk.encode(encoding)) <= max_bytes,
+                        "Chunk too long for {} / {}: {!r}".format(encoding, max_bytes, chunk)
+                    )
+
+                assert_equal(
+                    "".join(chunks).replace(" ", ""), text.replace(" ", ""),
+                    "Text lost while splitting for {} / {}".format(encoding, max_bytes)
+                )
+
+        assert_raises(ValueError, split_text, "\U0001F991", 3)
+
+    def test_targets(self):
+        """
+        Target limits and grouping
+        """
+
+        assert_equal(get_target_limits({}), {}, "Limits with no features")
+        assert_equal(
+            get_target_limits({"MAXTARGETS": ["3"]}), {"PRIVMSG": 3, "NOTICE": 3}, "Incorrect MAXTARGETS limits"
+        )
+        assert_equal(
+            get_target_limits({
+                "MAXTARGETS": ["3"], "TARGMAX": ["NAMES:1", "PRIVMSG:4", "NOTICE:4", "JOIN:", "MONITOR:"]
+            }),
+            {"PRIVMSG": 4, "NOTICE": 4, "NAMES": 1, "JOIN": None, "MONITOR": None},
+            "Incorrect TARGMAX limits"
+        )
+
+        targets = ["#a", "#b", "#c", "#d", "#e"]
+
+        assert_equal(group_targets(targets, 1, 100), targets, "Targets grouped with limit of 1")
+        assert_equal(group_targets(targets, 2, 100), ["#a,#b", "#c,#d", "#e"], "Incorrect groups")
+        assert_equal(group_targets(targets, None, 100), ["#a,#b,#c,#d,#e"], "Incorrect unlimited groups")
+        assert_equal(group_targets(targets, None, 5), ["#a,#b", "#c,#d", "#e"], "Groups too long")
+        assert_equal(group_targets(["#long-channel"], None, 5), ["#long-channel"], "Long target dropped")
+        assert_equal(group_targets(["#é", "#ü"], None, 7), ["#é,#ü"], "Incorrect encoded groups")
+        assert_equal(group_targets(["#é", "#ü"], None, 6), ["#é", "#ü"], "Groups too long once encoded")
@@ -0,0 +1,97 @@
+# coding=utf-8
+import asyncio
+
+from ultros.networks.irc.outbound import OutboundQueue, Priority, TokenBucket
+
+from nose.tools import assert_equal, assert_true
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class TestOutbound(TestCase):
+    def setUp(self):
+        self.written = []
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(None)
+
+    def tearDown(self):
+        del self.written
+
+        self.loop.close()
+        del self.loop
+
+    def test_token_bucket(self):
+        """
+        Token bucket basics
+        """
+
+        bucket = TokenBucket(1, 3)
+
+        assert_equal(bucket.take(5), 3, "Took more than the bucket holds")
+        assert_equal(bucket.take(1), 0, "Took from an empty bucket")
+        assert_true(0 < bucket.delay() <= 1, "Incorrect delay")
+
+        bucket.updated -= 1.5  # Pretend time has passed
+
+        assert_equal(bucket.take(5), 1, "Bucket not refilled")
+
+        bucket = TokenBucket(None, 3)
+
+        assert_equal(bucket.take(100), 100, "Unlimited bucket limited")
+        assert_equal(bucket.delay(), 0, "Unlimited bucket has a delay")
+
+    def test_priorities(self):
+        """
+        Outbound queue priorities and coalesced writes
+        """
+
+        queue = OutboundQueue(None)
+
+        queue.put(b"PRIVMSG #a :low\r\n", Priority.LOW)
+        queue.put(b"PRIVMSG #a :normal\r\n")
+        queue.put(b"PONG :a\r\n", Priority.URGENT)
+
+        assert_equal(queue.stats()["depth"], 3, "Incorrect depth")
+        assert_equal(queue.stats()["depth_by_priority"]["LOW"], 1, "Incorrect lane depth")
+
+        async def do_test():
+            queue.start(self.written.append)
+            await queue.flush()
+            queue.stop()
+
+        self.loop.run_until_complete(do_test())
+
+        assert_equal(
+            self.written, [b"PONG :a\r\nPRIVMSG #a :normal\r\nPRIVMSG #a :low\r\n"],
+            "Lines not sent in priority order in a single write"
+        )
+
+        stats = queue.stats()
+
+        assert_equal((stats["depth"], stats["lines_sent"], stats["writes"]), (0, 3, 1), "Incorrect stats")
+
+    def test_flood_control(self):
+        """
+        Outbound queue flood control
+        """
+
+        queue = OutboundQueue(100, 2)
+
+        async def do_test():
+            queue.start(self.written.append)
+
+            for x in range(4):
+                queue.put("PRIVMSG #a :{}\r\n".format(x).encode("UTF-8"))
+
+            await queue.flush()
+            queue.stop()
+
+        self.loop.run_until_complete(do_test())
+
+        assert_equal(self.written[0], b"PRIVMSG #a :0\r\nPRIVMSG #a :1\r\n", "Burst not sent in one write")
+        assert_equal(b"".join(self.written).count(b"\r\n"), 4, "Not all lines sent")
+        assert_true(len(self.written) > 1, "Lines sent beyond the burst")
+        assert_true(queue.stats()["max_wait"] > 0, "Wait time not recorded")
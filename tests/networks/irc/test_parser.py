@@ -0,0 +1,108 @@
+# coding=utf-8
+from datetime import datetime, timezone
+
+from ultros.networks.irc.parser import (
+    escape_tag_value, parse_line, parse_server_time, parse_tags, split_prefix, unescape_tag_value
+)
+
+from nose.tools import assert_equal, assert_is_none, assert_raises
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class TestParser(TestCase):
+    def test_basics(self):
+        """
+        IRC line parsing basics
+        """
+
+        message = parse_line("PING :irc.example.net")
+
+        assert_equal(message.raw_tags, None, "Incorrect tags")
+        assert_equal(message.tags, {}, "Incorrect tags")
+        assert_equal(message.prefix, None, "Incorrect prefix")
+        assert_equal(message.command, "PING", "Incorrect command")
+        assert_equal(message.params, ["irc.example.net"], "Incorrect params")
+
+        message = parse_line(":nick!user@host privmsg #channel :Hello there :)")
+
+        assert_equal(message.prefix, "nick!user@host", "Incorrect prefix")
+        assert_equal(message.command, "PRIVMSG", "Command not upper-cased")
+        assert_equal(message.params, ["#channel", "Hello there :)"], "Incorrect params")
+
+        message = parse_line(":irc.example.net 005 Ultros CHANTYPES=# PREFIX=(ov)@+  :are supported by this server")
+
+        assert_equal(
+            message.params, ["Ultros", "CHANTYPES=#", "PREFIX=(ov)@+", "are supported by this server"],
+            "Incorrect params"
+        )
+
+        message = parse_line(":irc.example.net 353 Ultros = #channel :")
+        assert_equal(message.params, ["Ultros", "=", "#channel", ""], "Empty trailing param not kept")
+
+        message = parse_line("QUIT")
+        assert_equal((message.command, message.params), ("QUIT", []), "Incorrect command without params")
+
+        message = parse_line(":nick!user@host MODE #channel +b a:b")
+        assert_equal(message.params, ["#channel", "+b", "a:b"], "Incorrect params with colon")
+
+        assert_raises(ValueError, parse_line, "")
+        assert_raises(ValueError, parse_line, ":irc.example.net")
+        assert_raises(ValueError, parse_line, "@a=b :irc.example.net :trailing")
+
+    def test_tags(self):
+        """
+        IRCv3 message tags
+        """
+
+        message = parse_line(
+            r"@time=2017-01-01T00:00:00.000Z;msgid=abc;+example.com/flag;empty=;esc=a\sb\:c\\d\r\n\xe\ "
+            r" :nick!user@host PRIVMSG #channel :hi"
+        )
+
+        assert_equal(message.prefix, "nick!user@host", "Incorrect prefix")
+        assert_equal(message.params, ["#channel", "hi"], "Incorrect params")
+
+        assert_equal(
+            message.tags,
+            {
+                "time": "2017-01-01T00:00:00.000Z",
+                "msgid": "abc",
+                "+example.com/flag": None,
+                "empty": None,
+                "esc": "a b;c\\d\r\nxe"
+            },
+            "Incorrect tags"
+        )
+
+        assert_equal(parse_tags("a=1;a=2;;b"), {"a": "2", "b": None}, "Incorrect duplicate tags")
+
+        for value in ("plain", "a b;c\\d\r\n", ";; \\\\", ""):
+            assert_equal(
+                unescape_tag_value(escape_tag_value(value)), value, "Escaping not reversible: {!r}".format(value)
+            )
+
+    def test_prefix_and_time(self):
+        """
+        IRC parser: Prefixes and server-time
+        """
+
+        assert_equal(split_prefix("nick!user@host"), ("nick", "user", "host"), "Incorrect full prefix")
+        assert_equal(split_prefix("nick@host"), ("nick", None, "host"), "Incorrect prefix without ident")
+        assert_equal(split_prefix("irc.example.net"), ("irc.example.net", None, None), "Incorrect server prefix")
+        assert_equal(split_prefix(None), ("", None, None), "Incorrect missing prefix")
+
+        assert_equal(
+            parse_server_time("2011-10-19T16:40:51.620Z"),
+            datetime(2011, 10, 19, 16, 40, 51, 620000, tzinfo=timezone.utc),
+            "Incorrect server time"
+        )
+        assert_equal(
+            parse_line("@time=2011-10-19T16:40:51Z PING :a").server_time,
+            datetime(2011, 10, 19, 16, 40, 51, tzinfo=timezone.utc),
+            "Incorrect server time without milliseconds"
+        )
+        assert_is_none(parse_server_time("yesterday"), "Invalid server time parsed")
+        assert_is_none(parse_line("PING :a").server_time, "Server time for untagged line")
@@ -0,0 +1,168 @@
+# coding=utf-8
+import asyncio
+
+from ultros.networks.irc.connectors.plain import PlainIRCConnector
+from ultros.networks.irc.parser import parse_line
+from ultros.networks.irc.servers.irc import IRCServer
+
+from nose.tools import assert_equal, assert_false, assert_true, assert_is_none, assert_raises
+from unittest import TestCase
+
+from tests.networks.irc.test_connector import FakeNetwork, FakeTransport
+
+
+__author__ = "Gareth Coles"
+
+CHANNELS = ["#channel{}".format(x) for x in range(30)]
+
+
+class TestServer(TestCase):
+    def setUp(self):
+        self.network = FakeNetwork()
+        self.server = IRCServer("irc.example.net", self.network, CHANNELS)
+        self.connectors = []
+
+        for x in range(3):
+            connector = PlainIRCConnector("irc.example.net/{}".format(x), self.network, self.server,
+                                          nickname="Ultros{}".format(x))
+            connector.transport = FakeTransport()
+
+            self.server.add_connector(connector)
+            self.connectors.append(connector)
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(None)
+
+    def tearDown(self):
+        del self.connectors
+        del self.server
+        del self.network
+
+        self.loop.close()
+        del self.loop
+
+    def dispatch(self, connector, line):
+        self.loop.run_until_complete(connector.dispatch_line(parse_line(line)))
+
+    def queued(self, connector):
+        return [line for lane in connector.outbound.lanes for line, _ in lane]
+
+    def test_sharding(self):
+        """
+        IRC server pool: Channels spread across connections
+        """
+
+        assert_is_none(self.server.connector, "Connector ready before registration")
+        assert_raises(RuntimeError, self.server.send_message, "#channel0", "hi")
+
+        for connector in self.connectors:
+            self.dispatch(connector, ":irc.example.net 376 {} :End of /MOTD command.".format(connector.nickname))
+
+        assert_equal(self.server.ready_connectors, self.connectors, "Connectors not ready")
+
+        joined = []
+
+        for connector in self.connectors:
+            lines = self.queued(connector)
+            joined += lines
+
+            assert_true(lines, "No channels assigned to {}".format(connector.name))
+
+        joined = [channel for line in joined for channel in line[5:-2].decode("UTF-8").split(",")]
+        assert_equal(sorted(joined), sorted(CHANNELS), "Channels not all joined exactly once")
+
+        assert_true(
+            self.server.get_shard("#CHANNEL1") is self.server.get_shard("#channel1"), "Sharding not case-insensitive"
+        )
+
+        names = ["#channel[{}]".format(x) for x in range(30)]
+        shards = [self.server.get_shard(name) for name in names]
+
+        for connector in self.connectors:
+            self.dispatch(connector, ":irc.example.net 005 {} CASEMAPPING=ascii :are supported by this server".format(
+                connector.nickname
+            ))
+
+        assert_equal(
+            [self.server.get_shard(name) for name in names], shards, "Shards changed with the server's case mapping"
+        )
+
+    def test_load_balancing(self):
+        """
+        IRC server pool: Sends load-balanced within each connection's queue
+        """
+
+        first, second, third = self.connectors
+
+        for connector in self.connectors:
+            connector.registered = True
+
+        self.dispatch(second, ":Ultros1!a@b JOIN #joined")
+        self.dispatch(third, ":Ultros2!a@b JOIN #joined")
+
+        second.write_line("PING :busy")
+
+        assert_equal(self.server.send_message("#joined", "hi"), 1, "Incorrect line count")
+        assert_equal(self.queued(third), [b"PRIVMSG #joined :hi\r\n"], "Not sent by the least busy member")
+
+        self.server.send_message(["someone", "#joined"], "hi")
+
+        assert_equal(self.queued(first), [b"PRIVMSG someone :hi\r\n"], "Nick not sent by the least busy connector")
+        assert_equal(len(self.queued(second)) + len(self.queued(third)), 3, "Channel not sent by a member")
+
+    def test_reconnect(self):
+        """
+        IRC server pool: Reconnecting and rejoining with state kept
+        """
+
+        connector = self.connectors[0]
+        connected = []
+
+        async def do_connect():
+            connected.append(True)
+
+            if len(connected) < 3:
+                raise ConnectionRefusedError()
+
+        connector.do_connect = do_connect
+        connector.registered = True
+
+        self.server.reconnect = {"initial": 0.001, "maximum": 0.01}
+        self.server.channels = []
+
+        self.dispatch(connector, ":irc.example.net 005 Ultros0 TARGMAX=JOIN:2 :are supported by this server")
+        self.dispatch(connector, ":Ultros0!a@b JOIN #a")
+        self.dispatch(connector, ":irc.example.net 332 Ultros0 #a :Topic")
+        self.dispatch(connector, ":Ultros0!a@b JOIN #b")
+        self.dispatch(connector, ":Ultros0!a@b JOIN #c")
+
+        async def do_test():
+            await self.server.connector_disconnected(connector, None)
+            await self.server.connector_disconnected(connector, None)
+
+            while self.server._reconnect_tasks:
+                await asyncio.sleep(0.001)
+
+        self.loop.run_until_complete(do_test())
+
+        assert_equal(len(connected), 3, "Failed connections not retried")
+        assert_equal(self.server._backoffs[connector.name].attempts, 3, "Backoff not used")
+
+        connector.registered = False
+        connector.outbound.stop()
+
+        self.dispatch(connector, ":irc.example.net 422 Ultros0 :MOTD File is missing")
+
+        assert_equal(self.queued(connector), [b"JOIN #a,#b\r\n", b"JOIN #c\r\n"], "Channels not rejoined")
+        assert_equal(self.server._backoffs[connector.name].attempts, 0, "Backoff not reset")
+
+        self.dispatch(connector, ":Ultros0!a@b JOIN #a")
+        self.dispatch(connector, ":irc.example.net 474 Ultros0 #b :Cannot join channel (+b)")
+
+        assert_equal(connector.state.get_channel("#a").topic, "Topic", "Channel state not kept")
+        assert_is_none(connector.state.get_channel("#b"), "Channel we couldn't rejoin still tracked")
+
+        self.server.close()
+        self.loop.run_until_complete(self.server.connector_disconnected(connector, None))
+
+        assert_false(self.server._reconnect_tasks, "Reconnecting after close()")
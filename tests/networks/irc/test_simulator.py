@@ -0,0 +1,144 @@
+# coding=utf-8
+import asyncio
+
+from ultros.networks.irc.connectors.plain import PlainIRCConnector
+from ultros.networks.irc.servers.irc import IRCServer
+
+from nose.tools import assert_equal, assert_true
+from unittest import TestCase
+
+from tests.networks.irc.test_connector import FakeNetwork
+from tests.tools.ircd import SimulatedIRCServer, sent_time, wait_until
+
+
+__author__ = "Gareth Coles"
+
+CHANNELS = ["#channel{}".format(x) for x in range(6)]
+
+
+class TestSimulator(TestCase):
+    def setUp(self):
+        self.ircd = SimulatedIRCServer()
+        self.network = FakeNetwork()
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(None)
+
+    def tearDown(self):
+        del self.network
+        del self.ircd
+
+        self.loop.close()
+        del self.loop
+
+    def _run_simulation(self, test, connections: int=1):
+        """
+        Start the simulator, connect a pool of connectors to it and wait for them to join every channel, then run
+        the test coroutine with the connectors.
+        """
+
+        server = IRCServer("irc.example.net", self.network, CHANNELS)
+        connectors = []
+
+        for x in range(connections):
+            connector = PlainIRCConnector(
+                "irc.example.net/{}".format(x), self.network, server, host="127.0.0.1",
+                nickname="Ultros{}".format(x), flood_rate=None
+            )
+
+            server.add_connector(connector)
+            connectors.append(connector)
+
+        def joined():
+            return all(
+                any(connector.state.get_channel(channel) is not None for connector in connectors)
+                for channel in CHANNELS
+            )
+
+        async def run():
+            await self.ircd.start()
+
+            try:
+                for connector in connectors:
+                    connector.port = self.ircd.port
+                    await connector.do_connect()
+
+                await wait_until(joined)
+                await test(connectors)
+            finally:
+                for connector in connectors:
+                    await connector.do_disconnect()
+
+                await self.ircd.close()
+                await wait_until(lambda: all(connector.dispatch_task.done() for connector in connectors))
+
+        self.loop.run_until_complete(run())
+
+    def test_registration(self):
+        """
+        IRC simulator: Connectors register, negotiate capabilities and join with large NAMES lists
+        """
+
+        for channel in CHANNELS:
+            self.ircd.add_users(channel, 500)
+
+        async def test(connectors):
+            connector = connectors[0]
+
+            assert_true(connector.registered, "Not registered")
+            assert_equal(
+                connector.enabled_capabilities, {"batch", "cap-notify", "message-tags", "server-time"},
+                "Incorrect capabilities"
+            )
+            assert_equal(connector.supported_features["PREFIX"], ["(ov)@+"], "RPL_ISUPPORT not received")
+            assert_equal(len(connector.state.get_members("#channel0")), 501, "NAMES list not received")
+            assert_equal(connector.state.get_member_modes("#channel0", "user0"), "o", "Member modes not received")
+
+            rtt = await self.ircd.clients[0].ping()
+
+            assert_true(rtt > 0, "PING not answered")
+
+        self._run_simulation(test)
+
+    def test_traffic(self):
+        """
+        IRC simulator: Floods, NAMES bursts and netsplits reach every connection in the pool
+        """
+
+        async def test(connectors):
+            received = []
+
+            async def handler(message):
+                received.append(sent_time(message))
+
+            for connector in connectors:
+                connector.add_command_handler("PRIVMSG", handler)
+
+            delivered = await self.ircd.flood(CHANNELS, 300)
+            await wait_until(lambda: len(received) == delivered)
+
+            assert_equal(delivered, 300, "Messages not sent to one connection per channel")
+
+            delivered = await self.ircd.flood(CHANNELS, 30, rate=1000)
+            await wait_until(lambda: len(received) == 330)
+
+            assert_true(all(x > 0 for x in received), "Send times not embedded")
+
+            self.ircd.names_burst("#channel1", 1000)
+
+            def members():
+                return sum(len(connector.state.get_members("#channel1")) for connector in connectors)
+
+            await wait_until(lambda: members() == 1001)
+
+            split = self.ircd.netsplit(400, channel="#channel1")
+            await wait_until(lambda: members() == 601)
+
+            assert_equal(len(split), 400, "Incorrect number of users split")
+
+            self.ircd.netjoin()
+            await wait_until(lambda: members() == 1001)
+
+        self._run_simulation(test, connections=3)
+
+        assert_equal(self.ircd.clients, [], "Clients not disconnected")
@@ -0,0 +1,132 @@
+# coding=utf-8
+from ultros.networks.irc.state import IRCState
+
+from nose.tools import assert_equal, assert_true, assert_false, assert_is_none, assert_in, assert_not_in
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class TestState(TestCase):
+    def setUp(self):
+        self.state = IRCState()
+
+        self.state.join("#Channel", "Ultros", "ultros", "ultros.io", is_self=True)
+        self.state.join("#channel", "Someone", "someone", "user/someone")
+        self.state.join("#Other", "Ultros", "ultros", "ultros.io", is_self=True)
+        self.state.join("#other", "someone", "someone", "user/someone")
+
+    def tearDown(self):
+        del self.state
+
+    def test_membership(self):
+        """
+        IRC state: Joins, parts, quits and case mapping
+        """
+
+        state = self.state
+
+        assert_equal(len(state.users), 2, "Users not shared between channels")
+        assert_equal(state.get_channel("#CHANNEL").name, "#Channel", "Channel not found case-insensitively")
+        assert_equal(state.get_user("SOMEONE").channels, {"#channel", "#other"}, "Incorrect user channels")
+
+        state.join("#channel", "Third", "third", "/".join(["user", "someone"]))
+        assert_true(state.get_user("third").host is state.get_user("someone").host, "Host not interned")
+        state.part("#channel", "third")
+
+        state.join("#unknown", "Someone")
+        assert_is_none(state.get_channel("#unknown"), "Channel we're not in was tracked")
+
+        state.part("#channel", "someone")
+        assert_equal(state.get_user("someone").channels, {"#other"}, "User not removed from channel")
+
+        state.part("#other", "Ultros", is_self=True)
+        assert_is_none(state.get_user("someone"), "User sharing no channels not forgotten")
+        assert_is_none(state.get_channel("#other"), "Parted channel still tracked")
+
+        state.join("#channel", "A[way]", "a", "b")
+        assert_equal(state.get_user("a{WAY}").nick, "A[way]", "rfc1459 case mapping not used")
+
+        state.names("#channel", ["@Ultros", "A[way]", "+B[usy]"])
+        state.set_casemapping("ascii")
+        state.names_end("#channel")
+
+        assert_equal(state.get_member_modes("#channel", "b[usy]"), "v", "Pending member keys not rebuilt")
+        assert_equal(state.get_user("B[USY]").channels, {"#channel"}, "User channel keys not rebuilt")
+        assert_is_none(state.get_user("b{usy}"), "Keys not rebuilt for new case mapping")
+        assert_is_none(state.get_user("a{way}"), "Keys not rebuilt for new case mapping")
+        assert_equal(state.get_user("A[WAY]").nick, "A[way]", "Keys not rebuilt for new case mapping")
+        assert_in("a[way]", state.get_channel("#CHANNEL").members, "Member keys not rebuilt")
+
+        assert_equal(state.quit("a[way]"), ["#Channel"], "Incorrect channels for quit")
+        assert_is_none(state.get_user("a[way]"), "User not removed on quit")
+
+    def test_nick(self):
+        """
+        IRC state: Nick changes
+        """
+
+        state = self.state
+
+        state.mode("#channel", "+o", ["someone"])
+        state.nick("Someone", "Another")
+
+        assert_is_none(state.get_user("someone"), "Old nick still tracked")
+        assert_equal(state.get_user("another").nick, "Another", "New nick not tracked")
+        assert_equal(state.get_member_modes("#channel", "another"), "o", "Member modes lost on nick change")
+        assert_in("another", state.get_channel("#other").members, "Not renamed in every channel")
+
+    def test_names(self):
+        """
+        IRC state: NAMES replies
+        """
+
+        state = self.state
+        state.update_features({"PREFIX": ["(qov)~@+"]})
+
+        state.names("#channel", ["~@Ultros", "+Someone", "new!new@example.com"])
+        state.names("#channel", ["@other"])
+
+        assert_equal(
+            len(state.get_channel("#channel").members), 2, "Member list replaced before RPL_ENDOFNAMES"
+        )
+
+        state.names_end("#channel")
+
+        assert_equal(state.get_member_modes("#channel", "ultros"), "qo", "Incorrect multi-prefix modes")
+        assert_equal(state.get_member_modes("#channel", "someone"), "v", "Incorrect modes")
+        assert_equal(state.get_member_modes("#channel", "new"), "", "Incorrect modes")
+        assert_equal(state.get_user("new").host, "example.com", "userhost-in-names host not stored")
+        assert_equal(len(state.get_members("#channel")), 4, "Incorrect member count")
+
+        state.names("#channel", ["Ultros"])
+        state.names_end("#channel")
+
+        assert_equal(len(state.get_channel("#channel").members), 1, "Stale members kept")
+        assert_is_none(state.get_user("new"), "Stale user not forgotten")
+        assert_equal(state.get_user("someone").channels, {"#other"}, "Stale membership kept")
+
+    def test_modes(self):
+        """
+        IRC state: Channel and prefix modes
+        """
+
+        state = self.state
+        state.update_features({"PREFIX": ["(ov)@+"], "CHANMODES": ["b", "k", "l", "imnt"]})
+
+        state.mode("#channel", "+vo-v+lkb-n+t", ["someone", "someone", "someone", "10", "key", "*!*@*"])
+
+        channel = state.get_channel("#channel")
+
+        assert_equal(state.get_member_modes("#channel", "someone"), "o", "Incorrect prefix modes")
+        assert_equal(channel.modes, {"l": "10", "k": "key", "t": None}, "Incorrect channel modes")
+
+        state.mode("#channel", "-lk+v", ["key", "someone"])
+
+        assert_equal(channel.modes, {"t": None}, "Channel modes not removed")
+        assert_equal(state.get_member_modes("#channel", "someone"), "ov", "Prefix modes out of order")
+
+        state.mode("#channel", "-o", ["nobody"])
+        assert_false("nobody" in channel.members, "Mode change added a member")
+        assert_not_in("b", channel.modes, "List mode tracked")
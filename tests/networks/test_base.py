@@ -0,0 +1,126 @@
+# coding=utf-8
+import asyncio
+
+from ultros.core.networks.base.connectors.base import BaseConnector
+from ultros.core.networks.base.networks.base import BaseNetwork
+from ultros.core.networks.base.servers.base import BaseServer
+
+from nose.tools import assert_equal, assert_true, assert_is_none
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class FakeConfig:
+    def set_owner(self, owner):
+        pass
+
+
+class FakeUltros:
+    pass
+
+
+class Connector(BaseConnector):
+    disconnected = False
+
+    async def do_connect(self):
+        pass
+
+    async def do_disconnect(self):
+        self.disconnected = True
+
+
+class Server(BaseServer):
+    async def connector_connected(self, connector):
+        pass
+
+    async def connector_disconnected(self, connector, exc):
+        pass
+
+
+class Network(BaseNetwork):
+    async def setup(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def create_server(self, name, *args, **kwargs):
+        server = Server(name, self)
+
+        self._create_server(server)
+        return server
+
+    def create_connector(self, name, server=None, **kwargs):
+        connector = Connector(name, self, server)
+
+        self._create_connector(connector, server)
+        return connector
+
+
+class TestBaseNetwork(TestCase):
+    def setUp(self):
+        self.ultros = FakeUltros()
+        self.network = Network("test", FakeConfig(), self.ultros)
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(None)
+
+    def tearDown(self):
+        del self.network
+        del self.ultros
+
+        self.loop.close()
+        del self.loop
+
+    def test_associations(self):
+        """
+        Base network: Connector and server associations
+        """
+
+        network = self.network
+
+        first = network.create_server("first")
+        second = network.create_server("second")
+
+        connectors = [network.create_connector("connector{}".format(x), server=first) for x in range(3)]
+        other = network.create_connector("other", server=second)
+        lonely = network.create_connector("lonely")
+
+        for connector in connectors:
+            assert_true(network.get_server_for_connector(connector) is first, "Incorrect server for connector")
+
+        assert_true(network.get_server_for_connector(other) is second, "Incorrect server for connector")
+        assert_is_none(network.get_server_for_connector(lonely), "Server found for unassociated connector")
+
+        self.loop.run_until_complete(network.destroy_connector(connectors[0]))
+
+        assert_true(connectors[0].disconnected, "Connector not disconnected")
+        assert_is_none(network.get_server_for_connector(connectors[0]), "Destroyed connector still associated")
+        assert_equal(network._connector_associations["first"], connectors[1:], "Connector not removed from server")
+
+        self.loop.run_until_complete(network.destroy_server(first))
+
+        assert_true(all(connector.disconnected for connector in connectors), "Server connectors not disconnected")
+        assert_is_none(network.get_server_for_connector(connectors[1]), "Connector of destroyed server associated")
+        assert_equal(network._connector_servers, {other: "second"}, "Reverse index not cleaned up")
+        assert_equal(list(network._connectors), ["other", "lonely"], "Connectors not removed")
+
+    def test_shutdown(self):
+        """
+        Base network: Shutting down destroys every server and connector
+        """
+
+        network = self.network
+
+        first = network.create_server("first")
+        connectors = [network.create_connector("connector{}".format(x), server=first) for x in range(3)]
+        lonely = network.create_connector("lonely")
+
+        self.loop.run_until_complete(network._shutdown())
+
+        assert_true(all(connector.disconnected for connector in connectors), "Server connectors not disconnected")
+        assert_true(lonely.disconnected, "Unassociated connector not disconnected")
+        assert_equal(network._servers, {}, "Servers not removed")
+        assert_equal(network._connectors, {}, "Connectors not removed")
@@ -0,0 +1,104 @@
+# coding=utf-8
+import asyncio
+
+from ultros.core.networks.manager import NetworkManager
+
+from nose.tools import assert_equal, assert_true, assert_false, assert_in
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class FakeUltros:
+    network_names = None
+
+    def __init__(self, config):
+        self.config = config
+
+
+class FakeNetwork:
+    running = 0
+    most_running = 0
+
+    def __init__(self, delay, error=None):
+        self.delay = delay
+        self.error = error
+
+    async def setup(self):
+        FakeNetwork.running += 1
+        FakeNetwork.most_running = max(FakeNetwork.most_running, FakeNetwork.running)
+
+        try:
+            await asyncio.sleep(self.delay)
+
+            if self.error:
+                raise self.error
+        finally:
+            FakeNetwork.running -= 1
+
+    async def shutdown(self):
+        await asyncio.sleep(self.delay)
+
+        if self.error:
+            raise self.error
+
+
+class TestNetworkManager(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(None)
+
+        FakeNetwork.running = 0
+        FakeNetwork.most_running = 0
+
+    def tearDown(self):
+        self.loop.close()
+        del self.loop
+
+    def test_connect_all(self):
+        """
+        Network manager: Concurrent setup with a limit and timeout
+        """
+
+        manager = NetworkManager(FakeUltros({"network_concurrency": 3, "network_timeout": 0.2}))
+
+        for x in range(5):
+            manager.networks["network{}".format(x)] = FakeNetwork(0.05)
+
+        manager.networks["slow"] = FakeNetwork(10)
+        manager.networks["broken"] = FakeNetwork(0, ValueError("Broken"))
+
+        start = self.loop.time()
+        report = self.loop.run_until_complete(manager.connect_all())
+        taken = self.loop.time() - start
+
+        assert_equal(FakeNetwork.most_running, 3, "Concurrency limit not respected")
+        assert_true(taken < 1, "Slow network held up startup")
+
+        for x in range(5):
+            assert_true(report["network{}".format(x)].ready, "Network not ready")
+
+        assert_false(report["slow"].ready, "Slow network ready")
+        assert_equal(report["slow"].error, "timed out", "Incorrect error for slow network")
+        assert_false(report["broken"].ready, "Broken network ready")
+        assert_in("Broken", report["broken"].error, "Incorrect error for broken network")
+
+    def test_shutdown(self):
+        """
+        Network manager: Networks shut down at once, even if one fails
+        """
+
+        manager = NetworkManager(FakeUltros({}))
+
+        for x in range(5):
+            manager.networks["network{}".format(x)] = FakeNetwork(0.1)
+
+        manager.networks["broken"] = FakeNetwork(0, ValueError("Broken"))
+
+        start = self.loop.time()
+        self.loop.run_until_complete(manager.shutdown())
+        taken = self.loop.time() - start
+
+        assert_true(taken < 0.3, "Networks shut down one at a time")
+        assert_equal(manager.networks, {}, "Networks not cleared")
@@ -1,4 +1,5 @@
 # coding=utf-8
+import asyncio
 import os
 import secrets
 import shutil
@@ -125,6 +126,38 @@ class TestYAMLRoundtrip(TestCase):
             "aaa: bbb  # ccc\n"
         )
 
+    def test_asave(self):
+        """
+        YAML config testing: Saving without blocking keeps comments
+        """
+
+        config_obj = self.manager.get_config(
+            "test.yml", None, fmt="yml-roundtrip"
+        )
+
+        config_obj.set_start_comment("A starting comment!")
+        config_obj.add_eol_comment("Testing comment!", key="herp", column=10)
+
+        loop = asyncio.new_event_loop()
+
+        try:
+            loop.run_until_complete(config_obj.asave())
+        finally:
+            loop.close()
+
+        with open(config_obj.path, "r") as fh:
+            lines = fh.readlines()
+
+        assert_equal(
+            lines[0],
+            "# A starting comment!\n"
+        )
+
+        assert_equal(
+            lines[2],
+            "herp: derp # Testing comment!\n"
+        )
+
     def test_dict_functionality(self):
         """
         YAML config testing: Dict functionality
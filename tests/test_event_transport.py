@@ -0,0 +1,240 @@
+# coding=utf-8
+import asyncio
+import os
+import shutil
+import tempfile
+
+from ultros.core.events.definitions.general import Event
+from ultros.core.events.definitions.remote import RemoteEvent, remote_identifier
+from ultros.core.events.manager import EventManager
+from ultros.core.events.serialization import SerializationError, decode_batch, dumps, encode_batch, loads
+from ultros.core.events.transports.unix import UnixSocketTransport
+
+from nose.tools import assert_equal, assert_true, assert_false, assert_raises, assert_is_none
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class MessageEvent(Event):
+    def __init__(self, text, count, connection=None):
+        super().__init__()
+
+        self.text = text
+        self.count = count
+        self.connection = connection
+
+
+class OtherEvent(Event):
+    pass
+
+
+class TestSerialization(TestCase):
+    def test_values(self):
+        """
+        Event serialization: Round-tripping values
+        """
+
+        values = [
+            None, True, False, 0, 1, -1, 127, 128, -129, 2 ** 70, -(2 ** 70), 1.5, "", "text", "ü ☃", b"\x00\xff",
+            ["a", "a", 1], {"key": ["value", {"nested": None}]}
+        ]
+
+        for value in values:
+            assert_equal(loads(dumps(value)), value, "Value not round-tripped: {!r}".format(value))
+
+        assert_equal(loads(dumps(("a", 1))), ["a", 1], "Tuple not round-tripped as a list")
+        assert_equal(dumps(1), b"\x03\x02", "Small int not compact")
+        assert_true(len(dumps(["identifier"] * 10)) < len("identifier") + 25, "Repeated strings not referenced")
+
+        with assert_raises(SerializationError):
+            dumps(object())
+
+        with assert_raises(SerializationError):
+            loads(b"\x05\x05abc")
+
+        with assert_raises(SerializationError):
+            loads(b"\x03\x02\x00")
+
+    def test_batch(self):
+        """
+        Event serialization: Batches of events
+        """
+
+        events = [MessageEvent("hello", x, connection=object()) for x in range(3)]
+        events[1]._private = "private"
+
+        origin, decoded = decode_batch(encode_batch("worker-1", events))
+
+        assert_equal(origin, "worker-1", "Wrong origin")
+        assert_equal(len(decoded), 3, "Wrong number of events")
+
+        identifier, identifiers, data = decoded[1]
+
+        assert_equal(identifier, MessageEvent.identifier, "Wrong identifier")
+        assert_equal(identifiers, MessageEvent.identifiers, "Wrong identifiers")
+        assert_equal(data, {"text": "hello", "count": 1}, "Wrong data")
+
+
+class TestUnixSocketTransport(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "events.sock")
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        shutil.rmtree(self.directory)
+
+    def test_forwarding(self):
+        """
+        Unix event transport: Forwarding events between instances through a hub
+        """
+
+        managers = [EventManager(None) for _ in range(3)]
+        received = [[] for _ in managers]
+
+        for index, manager in enumerate(managers):
+            manager.load_transport({
+                "type": "unix", "path": self.path, "name": "instance-{}".format(index),
+                "forward": [MessageEvent.identifier]
+            })
+
+            def handler(event, index=index):
+                received[index].append(event)
+
+            manager.add_handler(self, remote_identifier(MessageEvent), handler)
+            manager.add_handler(self, OtherEvent, handler)
+
+        hub = managers[0].transport
+        transport = managers[1].transport
+
+        async def run():
+            for manager in managers:
+                await manager.transport.start()
+
+            await asyncio.sleep(0.05)
+
+            assert_true(hub.is_hub, "First instance isn't the hub")
+            assert_false(transport.is_hub, "Second instance is the hub")
+
+            await managers[1].fire_event(MessageEvent("first", 1))
+            await managers[1].fire_event(MessageEvent("second", 2))
+            await managers[1].fire_event(OtherEvent())
+            await managers[0].fire_event(MessageEvent("from hub", 3))
+
+            await asyncio.sleep(0.1)
+
+            for manager in managers:
+                manager.shutdown()
+
+            await asyncio.sleep(0.01)
+
+        self.loop.run_until_complete(run())
+
+        stats = transport.stats()
+
+        assert_equal([event.data["text"] for event in received[0]], ["first", "second"], "Hub didn't receive")
+        assert_equal(
+            [event.data["text"] for event in received[2] if event.origin == "instance-1"], ["first", "second"],
+            "Not relayed in order"
+        )
+        assert_equal(
+            [event.data["text"] for event in received[2] if event.origin == "instance-0"], ["from hub"],
+            "Hub's own events not sent"
+        )
+        assert_equal([event.data["text"] for event in received[1] if isinstance(event, RemoteEvent)], ["from hub"],
+                     "Sender received its own events")
+        assert_equal(len([event for event in received[1] if isinstance(event, OtherEvent)]), 1, "Local event lost")
+
+        assert_equal(stats["batches_sent"], 1, "Events not batched")
+        assert_equal(stats["events_sent"], 2, "Events not counted")
+
+        assert_false(os.path.exists(self.path), "Socket not removed")
+
+    def test_slow_client(self):
+        """
+        Unix event transport: Dropping batches for instances that aren't keeping up
+        """
+
+        managers = [EventManager(None) for _ in range(2)]
+        received = []
+
+        for index, manager in enumerate(managers):
+            manager.load_transport({
+                "type": "unix", "path": self.path, "name": "instance-{}".format(index),
+                "forward": [MessageEvent.identifier]
+            })
+
+        def handler(event):
+            received.append(event)
+
+        managers[1].add_handler(self, remote_identifier(MessageEvent), handler)
+
+        hub = managers[0].transport
+
+        async def run():
+            for manager in managers:
+                await manager.transport.start()
+
+            await asyncio.sleep(0.05)
+
+            await managers[0].fire_event(MessageEvent("sent", 1))
+            await asyncio.sleep(0.05)
+
+            hub.max_buffer_size = -1  # Every instance is too far behind now
+
+            await managers[0].fire_event(MessageEvent("dropped", 2))
+            await asyncio.sleep(0.05)
+
+            for manager in managers:
+                manager.shutdown()
+
+            await asyncio.sleep(0.01)
+
+        self.loop.run_until_complete(run())
+
+        assert_equal([event.data["text"] for event in received], ["sent"], "Batch not dropped")
+        assert_equal(hub.batches_dropped, 1, "Dropped batch not counted")
+
+    def test_takeover(self):
+        """
+        Unix event transport: Taking over when the hub goes away
+        """
+
+        first = EventManager(None)
+        second = EventManager(None)
+
+        for name, manager in (("first", first), ("second", second)):
+            manager.load_transport({"type": "unix", "path": self.path, "name": name, "reconnect_delay": 0.01})
+
+        async def run():
+            await first.transport.start()
+            await second.transport.start()
+            await asyncio.sleep(0.05)
+
+            first.shutdown()
+            await asyncio.sleep(0.1)
+
+            assert_true(second.transport.is_hub, "Second instance didn't take over")
+            assert_is_none(first.transport, "Transport not removed on shutdown")
+
+            second.shutdown()
+            await asyncio.sleep(0.01)
+
+        self.loop.run_until_complete(run())
+
+    def test_unknown(self):
+        """
+        Event transports: Unknown and missing types
+        """
+
+        manager = EventManager(None)
+
+        assert_is_none(manager.load_transport(None), "Transport created without config")
+        assert_is_none(manager.load_transport({"type": None}), "Transport created without type")
+        assert_is_none(manager.load_transport({"type": "carrier-pigeon"}), "Unknown transport created")
@@ -0,0 +1,215 @@
+# coding=utf-8
+import asyncio
+import os
+import shutil
+import tempfile
+
+from ultros.core.events.definitions.general import Event
+from ultros.core.events.manager import EventManager
+from ultros.core.metrics import Gauge, Metrics, MetricsServer
+
+from nose.tools import assert_equal, assert_true, assert_in, assert_not_in, assert_raises
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        self.metrics = Metrics(enabled=True)
+
+    def tearDown(self):
+        del self.metrics
+
+    def test_render(self):
+        """
+        Metrics: Rendering counters, gauges and histograms
+        """
+
+        counter = self.metrics.counter("test_total", "A counter", ["network"])
+        counter.labels("irc").inc()
+        counter.labels("irc").inc(2)
+        counter.labels("say \"hi\"\n").inc()
+
+        self.metrics.gauge("test_depth", "A gauge").labels().set(1.5)
+
+        histogram = self.metrics.histogram("test_seconds", "A histogram", buckets=[0.1, 1])
+
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.labels().observe(value)
+
+        lines = self.metrics.render().splitlines()
+
+        assert_equal(lines[:5], [
+            "# HELP test_total A counter",
+            "# TYPE test_total counter",
+            "test_total{network=\"irc\"} 3",
+            "test_total{network=\"say \\\"hi\\\"\\n\"} 1",
+            "# HELP test_depth A gauge",
+        ], "Incorrect counter lines")
+
+        assert_in("test_depth 1.5", lines, "Gauge not rendered")
+        assert_in("# TYPE test_seconds histogram", lines, "Histogram type not rendered")
+
+        for line in (
+            "test_seconds_bucket{le=\"0.1\"} 2", "test_seconds_bucket{le=\"1.0\"} 3",
+            "test_seconds_bucket{le=\"+Inf\"} 4", "test_seconds_sum 5.65", "test_seconds_count 4"
+        ):
+            assert_in(line, lines, "Histogram line missing")
+
+    def test_registration(self):
+        """
+        Metrics: Registering the same metric twice
+        """
+
+        first = self.metrics.counter("test_total", "A counter", ["network"])
+
+        assert_true(self.metrics.counter("test_total", "A counter", ["network"]) is first, "Metric registered twice")
+
+        with assert_raises(ValueError):
+            self.metrics.gauge("test_total", "A gauge")
+
+        with assert_raises(ValueError):
+            first.labels("irc", "extra")
+
+    def test_collectors(self):
+        """
+        Metrics: Collectors are combined by name, and only called when scraped
+        """
+
+        calls = 0
+
+        def collector(name):
+            def collect():
+                nonlocal calls
+                calls += 1
+
+                gauge = Gauge("test_connected", "Whether connected", ["connector"])
+                gauge.labels(name).set(1)
+
+                return [gauge]
+
+            return collect
+
+        def broken():
+            raise ValueError("Broken")
+
+        self.metrics.add_collector(collector("first"))
+        self.metrics.add_collector(broken)
+        self.metrics.add_collector(collector("second"))
+
+        assert_equal(calls, 0, "Collectors called before scraping")
+
+        lines = self.metrics.render().splitlines()
+
+        assert_equal(calls, 2, "Collectors not called")
+        assert_equal(lines.count("# TYPE test_connected gauge"), 1, "Collected metrics not combined")
+        assert_in("test_connected{connector=\"first\"} 1", lines, "Collected metric missing")
+        assert_in("test_connected{connector=\"second\"} 1", lines, "Collected metric missing")
+
+    def test_events(self):
+        """
+        Metrics: Event manager reports fired events and handler times
+        """
+
+        loop = asyncio.new_event_loop()
+        manager = EventManager(None)
+
+        manager.add_handler(None, Event, lambda event: None)
+
+        try:
+            loop.run_until_complete(manager.fire_event(Event()))
+            assert_equal(manager.events_fired, None, "Events counted without metrics")
+
+            manager.register_metrics(self.metrics)
+
+            loop.run_until_complete(manager.fire_event(Event()))
+            loop.run_until_complete(manager.fire_event(Event()))
+        finally:
+            loop.close()
+
+        assert_equal(manager.events_fired.labels(Event.identifier).value, 2, "Events not counted")
+        assert_equal(manager.handler_time.labels(Event.identifier).count, 2, "Handler times not recorded")
+        assert_not_in("ultros_event_transport", self.metrics.render(), "Transport metrics without a transport")
+
+
+class TestMetricsServer(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.metrics = Metrics(enabled=True)
+        self.metrics.counter("test_total", "A counter").labels().inc()
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(None)
+
+    def tearDown(self):
+        self.loop.close()
+        del self.loop
+
+        shutil.rmtree(self.directory)
+
+    async def request(self, open_connection, data: bytes) -> bytes:
+        reader, writer = await open_connection()
+        writer.write(data)
+
+        response = await reader.read()
+        writer.close()
+
+        return response
+
+    def test_unix(self):
+        """
+        Metrics server: Serving over a Unix socket
+        """
+
+        path = os.path.join(self.directory, "metrics.sock")
+        server = MetricsServer(self.metrics, path=path)
+
+        async def scrape():
+            await server.start()
+
+            def connect():
+                return asyncio.open_unix_connection(path)
+
+            try:
+                return (
+                    await self.request(connect, b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n"),
+                    await self.request(connect, b"GET /other HTTP/1.1\r\n\r\n"),
+                    await self.request(connect, b"POST /metrics HTTP/1.1\r\n\r\n")
+                )
+            finally:
+                server.close()
+
+        found, missing, post = self.loop.run_until_complete(scrape())
+        head, body = found.split(b"\r\n\r\n", 1)
+
+        assert_true(head.startswith(b"HTTP/1.1 200 OK"), "Incorrect status")
+        assert_in(b"Content-Type: text/plain; version=0.0.4", head, "Incorrect content type")
+        assert_in(b"test_total 1\n", body, "Metrics not served")
+        assert_true(missing.startswith(b"HTTP/1.1 404"), "Unknown path served")
+        assert_true(post.startswith(b"HTTP/1.1 405"), "POST allowed")
+        assert_equal(server.scrapes, 1, "Incorrect scrape count")
+        assert_true(not os.path.exists(path), "Socket not removed")
+
+    def test_tcp(self):
+        """
+        Metrics server: Serving over TCP
+        """
+
+        server = MetricsServer(self.metrics, port=0)
+
+        async def scrape():
+            await server.start()
+
+            try:
+                return await self.request(
+                    lambda: asyncio.open_connection("127.0.0.1", server.port), b"GET / HTTP/1.0\r\n\r\n"
+                )
+            finally:
+                server.close()
+
+        response = self.loop.run_until_complete(scrape())
+
+        assert_true(response.startswith(b"HTTP/1.1 200 OK"), "Incorrect status")
+        assert_true(response.endswith(b"test_total 1\n"), "Metrics not served")
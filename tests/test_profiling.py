@@ -0,0 +1,59 @@
+# coding=utf-8
+from ultros.core.profiling import StartupProfiler
+
+from nose.tools import assert_equal, assert_true, assert_is_not_none
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class TestProfiling(TestCase):
+    def test_phases(self):
+        """
+        Profiling: Timing phases of startup
+        """
+
+        profiler = StartupProfiler()
+
+        with profiler.phase("Import"):
+            import ultros.core.main  # noqa: F401
+
+        profiler.add_phase("Connect networks", 0.25)
+
+        assert_equal([phase.name for phase in profiler.phases], ["Import", "Connect networks"], "Phases not recorded")
+        assert_true(profiler.phases[0].time >= 0, "Phase time is negative")
+        assert_equal(profiler.phases[1].modules, 0, "Modules counted for a separately-timed phase")
+
+        lines = profiler.format_report()
+
+        assert_equal(len(lines), 3, "Report has the wrong number of lines")
+        assert_true(lines[1].startswith("Connect networks") and "250.0ms" in lines[1], "Phase formatted incorrectly")
+        assert_true(lines[2].startswith("Total"), "Total missing from report")
+
+    def test_report(self):
+        """
+        Profiling: Reporting only once, and only when enabled
+        """
+
+        profiler = StartupProfiler(enabled=True)
+
+        with profiler.phase("Settings"):
+            pass
+
+        with self.assertLogs("ultros.core.profiling", "INFO") as logs:
+            profiler.report()
+
+        assert_equal(len(logs.output), 3, "Report not logged")
+        assert_is_not_none(profiler.finished, "Profiler not finished")
+
+        total = profiler.total
+        profiler.report()
+
+        assert_equal(profiler.total, total, "Total changed after the report")
+
+        disabled = StartupProfiler()
+
+        with self.assertRaises(AssertionError):
+            with self.assertLogs("ultros.core.profiling", "INFO"):
+                disabled.report()
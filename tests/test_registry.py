@@ -0,0 +1,80 @@
+# coding=utf-8
+from operator import attrgetter
+
+from ultros.core.networks.base.networks.base import BaseNetwork, network_registry
+from ultros.core.registry import Registry
+from ultros.core.storage.base import StorageBase, storage_registry
+
+from nose.tools import assert_equal, assert_true, assert_false, assert_is_none, assert_in, assert_raises
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+class Base:
+    name = None
+
+
+class TestRegistry(TestCase):
+    def test_registry(self):
+        """
+        Registry: Registering and getting classes
+        """
+
+        registry = Registry(Base, attrgetter("name"), "tests.missing.{}")
+
+        @registry.register()
+        class First(Base):
+            name = "first"
+
+        @registry.register("renamed")
+        class Second(Base):
+            name = "second"
+
+        assert_true(registry.get("first") is First, "Class not registered by key")
+        assert_true(registry.get("renamed") is Second, "Class not registered by name")
+        assert_is_none(registry.get("second"), "Class registered under the wrong name")
+        assert_is_none(registry.get("unknown"), "Missing module not handled")
+
+        assert_in("first", registry, "Registry membership incorrect")
+        assert_true(registry.remove("first"), "Class not removed")
+        assert_false(registry.remove("first"), "Class removed twice")
+
+        with assert_raises(TypeError):
+            registry.add(object, "object")
+
+    def test_builtins(self):
+        """
+        Registry: Built-in network and storage classes
+        """
+
+        network_cls = network_registry.get("irc")
+
+        from ultros.networks.irc.network import IRCNetwork
+
+        assert_true(network_cls is IRCNetwork, "IRC network not found")
+        assert_true(issubclass(network_cls, BaseNetwork), "Incorrect network class")
+
+        storage_cls = storage_registry.get("ultros.core.storage.config.json")
+
+        from ultros.core.storage.config.json import JSONConfig
+
+        assert_true(storage_cls is JSONConfig, "JSON config not found")
+        assert_true(issubclass(storage_cls, StorageBase), "Incorrect storage class")
+
+        assert_equal(
+            storage_registry.classes["ultros.core.storage.config.json"], JSONConfig, "Class not cached"
+        )
+
+    def test_fallback(self):
+        """
+        Registry: Finding classes in modules that don't register them
+        """
+
+        registry = Registry(StorageBase, attrgetter("__module__"))
+
+        from ultros.core.storage.config.ini import INIConfig
+
+        assert_true(registry.get("ultros.core.storage.config.ini") is INIConfig, "Class not found in module")
+        assert_is_none(registry.get("ultros.core.storage.base"), "Abstract or imported class found")
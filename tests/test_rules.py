@@ -1,6 +1,9 @@
 # coding=utf-8
+import array
 import asyncio
+import operator
 
+import ultros.core.rules.bulk as bulk
 import ultros.core.rules.predicates as p
 import ultros.core.rules.transformers as t
 
@@ -377,3 +380,132 @@ class TestRules(TestCase):
         self.rule_set = "Test3"
         result = self.loop.run_until_complete(self.do_run())
         assert_true(result, "Failed: Test3")
+
+    def test_snapshots(self):
+        """
+        Rule set versioning and snapshots
+        """
+
+        def predicate_true(*args):
+            return True
+
+        version = self.engine.version
+
+        self.engine.add_rule(
+            "Test1", predicate_true, "", t.trans_continue
+        )
+
+        assert_equal(self.engine.version, version + 1, "Adding a rule didn't publish a new version")
+        assert_raises(TypeError, operator.setitem, self.engine.rule_sets, "Test2", ())
+
+        snapshot = self.engine.snapshot()
+
+        self.engine.add_rule(
+            "Test1", predicate_true, "", t.factory_trans_return(True)
+        )
+
+        assert_equal(len(snapshot.rule_sets["Test1"]), 1, "Old snapshot was modified")
+        assert_equal(len(self.engine.get_rule_set("Test1")), 2, "New rule wasn't published")
+
+        self.rule_set = "Test1"
+
+        result = self.loop.run_until_complete(self.engine.run("Test1", "", snapshot=snapshot))
+        assert_equal(result, None, "Run with old snapshot used new rules")
+
+        result = self.loop.run_until_complete(self.do_run())
+        assert_true(result, "Run with current snapshot didn't use new rules")
+
+        # Changes made while a run is suspended shouldn't affect it
+
+        waiter = self.loop.create_future()
+
+        async def async_predicate_wait(value, comparable):
+            await waiter
+            return True
+
+        self.engine.add_rule(
+            "Test3", async_predicate_wait, "", t.trans_continue
+        )
+
+        task = self.loop.create_task(self.engine.run("Test3", ""))
+        self.loop.call_soon(self.engine.add_rule, "Test3", predicate_true, "", t.factory_trans_return(True))
+        self.loop.call_soon(self.engine.del_rule_set, "Test1")
+        self.loop.call_soon(waiter.set_result, None)
+
+        result = self.loop.run_until_complete(task)
+        assert_equal(result, None, "Suspended run saw rules added after it started")
+        assert_equal(self.engine.get_rule_set("Test1"), None, "Rule set wasn't deleted")
+
+    def test_bulk(self):
+        """
+        Bulk rule runs and number predicates
+        """
+
+        values = array.array("i", [0, 5, 10, 15, 20, 25])
+
+        self.engine.add_rule(
+            "flood", p.num_greater_than, 0, t.trans_continue
+        )
+        self.engine.add_rule(
+            "flood", p.num_between, (5, 20), t.factory_trans_return("warn")
+        )
+
+        mask, results = self.loop.run_until_complete(self.engine.run_bulk("flood", values))
+
+        assert_equal(list(mask), [False, True, True, True, True, False], "Incorrect mask")
+        assert_equal(results, [False, "warn", "warn", "warn", "warn", False], "Incorrect results")
+        assert_equal(values[0], 0, "Input values were modified")
+
+        for value, result in zip(values, results):
+            single = self.loop.run_until_complete(self.engine.run("flood", value))
+            assert_equal(single, result, "Bulk result differs from single result for {}".format(value))
+
+        for predicate, comparable, expected in (
+                (p.num_less_than, 10, [True, True, False, False, False, False]),
+                (p.num_in_range, (5, 20), [False, True, True, True, False, False]),
+                (p.num_not_in_range, (5, 20), [True, False, False, False, True, True]),
+                (p.num_not_between, (5, 20), [True, False, False, False, False, True]),
+                (p.num_in_set, [0, 25], [True, False, False, False, False, True]),
+                (p.num_not_in_set, {0, 25}, [False, True, True, True, True, False])
+        ):
+            assert_equal(
+                [predicate(value, comparable) for value in values], expected,
+                "Incorrect result: {}".format(predicate.__name__)
+            )
+            assert_equal(
+                [bool(x) for x in predicate.bulk(bulk.as_column(values), comparable)], expected,
+                "Incorrect bulk result: {}".format(predicate.__name__)
+            )
+
+        # Predicates without a bulk implementation, and updated values
+
+        async def async_predicate_even(value, comparable):
+            return value % 2 == 0
+
+        self.engine.add_rule(
+            "double", p.num_less_than, 20, t.factory_trans_continue_call(lambda: 30)
+        )
+        self.engine.add_rule(
+            "double", async_predicate_even, "", t.trans_stop
+        )
+
+        mask, results = self.loop.run_until_complete(self.engine.run_bulk("double", [1, 2, 21, 22]))
+
+        assert_equal(list(mask), [True, True, False, False], "Incorrect mask")
+        assert_equal(results, [None, None, False, False], "Incorrect results")
+
+        # Updated values of a different type to the input
+
+        self.engine.add_rule(
+            "halve", p.num_greater_than, 0, t.factory_trans_continue(2.5)
+        )
+        self.engine.add_rule(
+            "halve", p.num_greater_than, 2.2, t.factory_trans_return("big")
+        )
+
+        mask, results = self.loop.run_until_complete(self.engine.run_bulk("halve", array.array("i", [0, 3])))
+
+        assert_equal(list(mask), [False, True], "Incorrect mask")
+        assert_equal(results, [False, "big"], "Updated values were truncated")
+
+        assert_raises(LookupError, self.loop.run_until_complete, self.engine.run_bulk("missing", values))
@@ -0,0 +1,92 @@
+# coding=utf-8
+import os
+import shutil
+import signal
+import tempfile
+import time
+
+from ultros.core.supervisor import Supervisor, assign_networks
+
+from nose.tools import assert_equal, assert_true
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+def crash_once(config_dir, data_dir, networks, connection, stats_interval):
+    marker = os.path.join(config_dir, "-".join(networks))
+
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+
+    connection.send({"pid": os.getpid(), "cpu_time": 1.0, "networks": {name: True for name in networks}})
+    connection.close()
+
+
+def sleep_forever(config_dir, data_dir, networks, connection, stats_interval):
+    connection.send({"pid": os.getpid(), "cpu_time": 0.5, "networks": {name: True for name in networks}})
+    time.sleep(60)
+
+
+class TestSupervisor(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.handlers = signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)
+
+    def tearDown(self):
+        signal.signal(signal.SIGINT, self.handlers[0])
+        signal.signal(signal.SIGTERM, self.handlers[1])
+        shutil.rmtree(self.directory)
+
+    def test_assign_networks(self):
+        """
+        Supervisor: Splitting networks between workers
+        """
+
+        assert_equal(assign_networks(["a", "b", "c", "d", "e"], 2), [["a", "c", "e"], ["b", "d"]])
+        assert_equal(assign_networks(["a", "b"], 8), [["a"], ["b"]], "More workers than networks")
+        assert_equal(assign_networks([], 4), [[]], "No networks")
+
+    def test_restart(self):
+        """
+        Supervisor: Restarting crashed workers and collecting stats
+        """
+
+        supervisor = Supervisor(
+            self.directory, self.directory, ["a", "b", "c"], 2,
+            restart_delay=0.01, stats_interval=0.05, target=crash_once
+        )
+
+        assert_equal(supervisor.run(), 0, "Supervisor failed")
+
+        stats = supervisor.stats()
+
+        assert_equal(stats["restarts"], 2, "Workers not restarted once each")
+        assert_equal(stats["workers_alive"], 0, "Workers still alive")
+        assert_equal(stats["cpu_time"], 2.0, "Stats not collected")
+        assert_equal(stats["workers"]["worker-0"]["assigned"], ["a", "c"], "Wrong networks assigned")
+
+    def test_stop(self):
+        """
+        Supervisor: Stopping workers on a signal
+        """
+
+        supervisor = Supervisor(
+            self.directory, self.directory, ["a", "b"], 2, stats_interval=0.05, target=sleep_forever
+        )
+
+        signal.signal(signal.SIGALRM, lambda *_: os.kill(os.getpid(), signal.SIGTERM))
+        signal.setitimer(signal.ITIMER_REAL, 0.3)
+
+        try:
+            started = time.monotonic()
+            assert_equal(supervisor.run(), 0, "Supervisor failed")
+        finally:
+            signal.signal(signal.SIGALRM, signal.SIG_DFL)
+
+        assert_true(supervisor.stopping, "Supervisor not stopping")
+        assert_true(time.monotonic() - started < 10, "Workers not stopped")
+        assert_equal(supervisor.stats()["restarts"], 0, "Stopped workers restarted")
+        assert_true(all(worker.stats for worker in supervisor.workers), "Stats not collected")
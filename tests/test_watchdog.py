@@ -0,0 +1,76 @@
+# coding=utf-8
+import asyncio
+import time
+
+from ultros.core.metrics import Metrics
+from ultros.core.watchdog import LoopMonitor
+
+from nose.tools import assert_equal, assert_true, assert_false, assert_in
+from unittest import TestCase
+
+
+__author__ = "Gareth Coles"
+
+
+def blocking_call(seconds):
+    time.sleep(seconds)
+
+
+class TestLoopMonitor(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(None)
+
+        self.monitor = LoopMonitor(self.loop, interval=0.02, threshold=0.05)
+
+    def tearDown(self):
+        self.monitor.stop()
+        del self.monitor
+
+        self.loop.close()
+        del self.loop
+
+    def run_monitored(self, func):
+        async def run():
+            self.monitor.start()
+
+            await asyncio.sleep(0.05)
+            func()
+            await asyncio.sleep(0.05)
+
+            assert_true(self.monitor.running, "Monitor not running")
+
+            self.monitor.stop()
+            await asyncio.sleep(0)  # Let the task be cancelled
+
+        self.loop.run_until_complete(run())
+
+    def test_stall(self):
+        """
+        Loop monitor: Stalls are measured and their stack captured
+        """
+
+        metrics = Metrics(enabled=True)
+        self.monitor.register_metrics(metrics)
+
+        self.run_monitored(lambda: blocking_call(0.3))
+
+        assert_equal(self.monitor.stall_count, 1, "Incorrect stall count")
+        assert_true(self.monitor.max_lag >= 0.25, "Lag not measured")
+
+        stall = self.monitor.stalls[0]
+
+        assert_true(stall.duration >= 0.05, "Stall reported too early")
+        assert_in("blocking_call", stall.stack, "Blocking function not in the stack")
+        assert_in("ultros_event_loop_stalls_total 1", metrics.render(), "Stall not reported as a metric")
+        assert_true(self.monitor.lag_time.count > 0, "Lag not reported as a metric")
+
+    def test_no_stall(self):
+        """
+        Loop monitor: A loop that isn't blocked doesn't stall
+        """
+
+        self.run_monitored(lambda: None)
+
+        assert_equal(self.monitor.stall_count, 0, "Stall reported for an idle loop")
+        assert_false(self.monitor.running, "Monitor still running")
@@ -0,0 +1,736 @@
+# coding=utf-8
+
+"""
+A stand-in IRC server, for testing and load testing the IRC stack without a real network.
+
+`SimulatedIRCServer` listens on a local port and speaks enough of the protocol for `PlainIRCConnector` to connect
+and register as it would with a real server:
+
+* CAP negotiation (`LS`, `REQ` and `END`), for the capabilities in `capabilities`
+* Registration with `NICK` and `USER`, answered with 001 to 005 and the MOTD
+* `PING` and `PONG`, both ways
+* `JOIN` with the channel's NAMES list, `PART`, `PRIVMSG`, `NOTICE` and `QUIT`
+
+Channels can be filled with simulated users, who don't have connections of their own - they only exist to send
+traffic to the connected clients. That traffic is scripted by calling methods on the server:
+
+* `add_users()` adds users to a channel, and `names_burst()` adds a lot of them at once and sends every client the
+  channel's whole NAMES list again
+* `flood()` sends messages from simulated users to channels, as fast as possible or at a given rate
+* `netsplit()` and `netjoin()` make users quit and rejoin together, in a batch for clients that support them
+
+Each flood message carries the time it was sent, so the time it took to get through the client can be measured
+with `sent_time()`. The simulated users and the clients must share a process for those times to be comparable.
+"""
+
+import asyncio
+import itertools
+
+from collections import deque
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from ultros.networks.irc.casemapping import casefold
+from ultros.networks.irc.framing import LineFramer
+from ultros.networks.irc.parser import IRCMessage, parse_line
+
+__author__ = "Gareth Coles"
+
+#: Tuple[str, ...]: Capabilities offered to clients
+DEFAULT_CAPABILITIES = ("batch", "cap-notify", "message-tags", "server-time")
+
+#: Tuple[str, ...]: RPL_ISUPPORT tokens sent to clients
+DEFAULT_ISUPPORT = (
+    "CASEMAPPING=rfc1459", "CHANMODES=beI,k,l,imnpst", "CHANTYPES=#", "MODES=4", "NETWORK=UltrosSim", "NICKLEN=30",
+    "PREFIX=(ov)@+", "TARGMAX=JOIN:,NAMES:1,NOTICE:4,PART:,PRIVMSG:4"
+)
+
+MAX_LINE_LENGTH = 510  #: int: The longest line the server sends, not counting tags or the line ending
+
+
+def sent_time(message: IRCMessage) -> float:
+    """
+    Get the time a message from `SimulatedIRCServer.flood()` was sent, from `time.perf_counter()`.
+    """
+
+    return float(message.params[-1].split(" ", 2)[1])
+
+
+async def wait_until(predicate: Callable[[], bool], timeout: float=5.0, interval: float=0.005):
+    """
+    Wait until a function returns True, checking every `interval` seconds.
+
+    :raises asyncio.TimeoutError: If it still hasn't after `timeout` seconds
+    """
+
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+
+    while not predicate():
+        if loop.time() >= deadline:
+            raise asyncio.TimeoutError()
+
+        await asyncio.sleep(interval)
+
+
+class SimulatedChannel:
+    """
+    :ivar name: The channel's name, as it was first joined
+    :ivar users: Simulated users in the channel; nick -> mode prefix ("@", "+" or "")
+    :ivar clients: Connected clients in the channel, in the order they joined
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.users = {}  #: Dict[str, str]
+        self.clients = []  #: List[SimulatedClient]
+
+
+class SimulatedClient(asyncio.Protocol):
+    """
+    A client's connection to the simulated server.
+
+    :ivar lines: The most recent lines received from the client, oldest first
+    :ivar capabilities: Capabilities the client has enabled
+    :ivar channels: Keys of the channels the client is in
+    """
+
+    def __init__(self, server: "SimulatedIRCServer", history: int=1000):
+        self.server = server
+        self.transport = None
+
+        self.nick = None  #: Optional[str]
+        self.ident = None  #: Optional[str]
+        self.host = "127.0.0.1"
+
+        self.capabilities = set()  #: Set[str]
+        self.channels = set()  #: Set[str]
+        self.negotiating = False
+        self.registered = False
+
+        self.lines = deque(maxlen=history)  #: Deque[str]
+        self.lines_received = 0
+        self.lines_sent = 0
+
+        self.framer = LineFramer()
+
+        self._pings = {}  #: Dict[str, Tuple[float, asyncio.Future]]: Token -> when it was sent, and its result
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    @property
+    def prefix(self) -> str:
+        return "{}!{}@{}".format(self.nick, self.ident, self.host)
+
+    @property
+    def closed(self) -> bool:
+        return self.transport is None or self.transport.is_closing()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.clients.append(self)
+
+    def connection_lost(self, exc):
+        self.server.remove_client(self, "Connection closed")
+
+        for _, future in self._pings.values():
+            if not future.done():
+                future.cancel()
+
+        self._pings.clear()
+        self._writable.set()
+
+    def pause_writing(self):
+        self._writable.clear()
+
+    def resume_writing(self):
+        self._writable.set()
+
+    async def drain(self):
+        """
+        Wait until the client has caught up with what's been sent to it, if it's fallen behind.
+        """
+
+        await self._writable.wait()
+
+    def data_received(self, data: bytes):
+        for line in self.framer.feed(data):
+            line = line.decode("UTF-8", "replace")
+
+            self.lines.append(line)
+            self.lines_received += 1
+
+            message = parse_line(line)
+            handler = getattr(self, "irc_{}".format(message.command), None)
+
+            if handler is None:
+                self.send_numeric("421", message.command, "Unknown command")
+            else:
+                handler(message)
+
+    def send(self, line: str):
+        self.send_lines([line])
+
+    def send_lines(self, lines: List[str]):
+        """
+        Send several lines in a single write.
+        """
+
+        if self.closed or not lines:
+            return
+
+        self.transport.write("".join(line + "\r\n" for line in lines).encode("UTF-8"))
+        self.lines_sent += len(lines)
+
+    def send_numeric(self, numeric: str, *params: str):
+        self.send(self.format_numeric(numeric, *params))
+
+    def format_numeric(self, numeric: str, *params: str) -> str:
+        return " ".join(
+            [":" + self.server.name, numeric, self.nick or "*"] + list(params[:-1]) + [":" + params[-1]]
+        )
+
+    def close(self):
+        if not self.closed:
+            self.transport.close()
+
+    async def ping(self, timeout: float=5.0) -> float:
+        """
+        Send the client a PING, and wait for its PONG.
+
+        :return: The round trip time, in seconds
+        """
+
+        token = "ultros-sim-{}".format(next(self.server._tokens))
+        future = asyncio.Future()
+
+        self._pings[token] = (perf_counter(), future)
+        self.send("PING :{}".format(token))
+
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pings.pop(token, None)
+
+    # region: Commands
+
+    def irc_CAP(self, message: IRCMessage):
+        subcommand = message.params[0].upper()
+
+        if subcommand == "LS":
+            self.negotiating = True
+            self.send(":{} CAP {} LS :{}".format(
+                self.server.name, self.nick or "*", " ".join(self.server.capabilities)
+            ))
+        elif subcommand == "REQ":
+            requested = message.params[-1].split()
+            names = [capability.lstrip("-") for capability in requested]
+
+            if all(name in self.server.capabilities for name in names):
+                for capability in requested:
+                    if capability.startswith("-"):
+                        self.capabilities.discard(capability[1:])
+                    else:
+                        self.capabilities.add(capability)
+
+                reply = "ACK"
+            else:
+                reply = "NAK"
+
+            self.send(":{} CAP {} {} :{}".format(self.server.name, self.nick or "*", reply, message.params[-1]))
+        elif subcommand == "END":
+            self.negotiating = False
+            self.register()
+
+    def irc_NICK(self, message: IRCMessage):
+        nick = message.params[0]
+
+        if self.server.get_client(nick) not in (None, self):
+            self.send_numeric("433", nick, "Nickname is already in use")
+            return
+
+        if self.registered:
+            self.server.send_to_peers(self, ":{} NICK :{}".format(self.prefix, nick), include_self=True)
+
+        self.nick = nick
+        self.register()
+
+    def irc_USER(self, message: IRCMessage):
+        self.ident = message.params[0]
+        self.register()
+
+    def irc_PING(self, message: IRCMessage):
+        self.send(":{} PONG {} :{}".format(self.server.name, self.server.name, message.params[-1]))
+
+    def irc_PONG(self, message: IRCMessage):
+        sent, future = self._pings.pop(message.params[-1], (None, None))
+
+        if future is not None and not future.done():
+            future.set_result(perf_counter() - sent)
+
+    def irc_JOIN(self, message: IRCMessage):
+        for channel in message.params[0].split(","):
+            self.server.join(self, channel)
+
+    def irc_PART(self, message: IRCMessage):
+        for channel in message.params[0].split(","):
+            self.server.part(self, channel, message.params[1] if len(message.params) > 1 else None)
+
+    def irc_NAMES(self, message: IRCMessage):
+        self.server.send_names(self, message.params[0])
+
+    def irc_PRIVMSG(self, message: IRCMessage):
+        self.server.relay(self, message)
+
+    def irc_NOTICE(self, message: IRCMessage):
+        self.server.relay(self, message)
+
+    def irc_QUIT(self, message: IRCMessage):
+        self.server.remove_client(self, message.params[0] if message.params else "Quit")
+        self.send("ERROR :Closing link: {} (Quit)".format(self.host))
+        self.close()
+
+    # endregion
+
+    def register(self):
+        if self.registered or self.negotiating or self.nick is None or self.ident is None:
+            return
+
+        self.registered = True
+        server = self.server
+
+        lines = [
+            self.format_numeric("001", "Welcome to the {} IRC Network {}".format(server.network, self.prefix)),
+            self.format_numeric("002", "Your host is {}, running version ultros-sim".format(server.name)),
+            self.format_numeric("003", "This server was created for a test"),
+            ":{} 004 {} {} ultros-sim iow beIiklmnopstv beIklov".format(server.name, self.nick, server.name)
+        ]
+
+        # Servers split RPL_ISUPPORT over several lines, so clients need to handle that
+        for index in range(0, len(server.isupport), 5):
+            lines.append(self.format_numeric(
+                "005", *server.isupport[index:index + 5], "are supported by this server"
+            ))
+
+        if server.motd is None:
+            lines.append(self.format_numeric("422", "MOTD File is missing"))
+        else:
+            lines.append(self.format_numeric("375", "- {} Message of the day -".format(server.name)))
+            lines += [self.format_numeric("372", "- {}".format(line)) for line in server.motd]
+            lines.append(self.format_numeric("376", "End of /MOTD command."))
+
+        self.send_lines(lines)
+
+
+class SimulatedIRCServer:
+    """
+    A local IRC server for connectors to connect to, with scriptable traffic. See the module documentation.
+
+    :param host: The address to listen on
+    :param port: The port to listen on, or 0 to pick a free one - see `port` once started
+    :param name: The server's name, used as the prefix of its replies
+    :param network: The network name sent to clients
+    :param capabilities: The capabilities offered to clients
+    :param isupport: The RPL_ISUPPORT tokens sent to clients
+    :param motd: The lines of the message of the day, or None to send ERR_NOMOTD instead
+    """
+
+    def __init__(self, host: str="127.0.0.1", port: int=0, *, name: str="irc.example.net",
+                 network: str="UltrosSim", capabilities: Iterable[str]=DEFAULT_CAPABILITIES,
+                 isupport: Iterable[str]=DEFAULT_ISUPPORT, motd: Optional[Iterable[str]]=("Simulated server",)):
+        self.host = host
+        self.name = name
+        self.network = network
+        self.capabilities = list(capabilities)
+        self.isupport = list(isupport)
+        self.motd = None if motd is None else list(motd)
+
+        self.clients = []  #: List[SimulatedClient]: Connected clients, in the order they connected
+        self.channels = {}  #: Dict[str, SimulatedChannel]: Channel key -> channel
+
+        self.messages_received = 0  #: int: PRIVMSGs and NOTICEs received from clients
+
+        self._port = port
+        self._server = None  #: Optional[asyncio.AbstractServer]
+        self._split = {}  #: Dict[str, Tuple[str, List[str]]]: Nick -> (mode prefix, channel keys), split users
+        self._users = itertools.count()
+        self._tokens = itertools.count()
+
+    @property
+    def port(self) -> int:
+        if self._server is not None and self._server.sockets:
+            return self._server.sockets[0].getsockname()[1]
+
+        return self._port
+
+    @property
+    def registered_clients(self) -> List[SimulatedClient]:
+        return [client for client in self.clients if client.registered]
+
+    async def start(self):
+        self._server = await asyncio.get_event_loop().create_server(
+            lambda: SimulatedClient(self), self.host, self._port
+        )
+
+    async def close(self):
+        """
+        Stop listening, and close every client's connection.
+        """
+
+        if self._server is None:
+            return
+
+        self._server.close()
+
+        for client in list(self.clients):
+            client.close()
+
+        await self._server.wait_closed()
+        self._server = None
+
+    def key(self, name: str) -> str:
+        return casefold(name)
+
+    def get_client(self, nick: str) -> Optional[SimulatedClient]:
+        key = self.key(nick)
+
+        for client in self.clients:
+            if client.nick is not None and self.key(client.nick) == key:
+                return client
+
+        return None
+
+    def get_channel(self, name: str) -> SimulatedChannel:
+        """
+        Get a channel, creating it if it doesn't exist yet.
+        """
+
+        key = self.key(name)
+        channel = self.channels.get(key)
+
+        if channel is None:
+            channel = self.channels[key] = SimulatedChannel(name)
+
+        return channel
+
+    # region: Client commands
+
+    def join(self, client: SimulatedClient, name: str):
+        channel = self.get_channel(name)
+        key = self.key(name)
+
+        if key in client.channels:
+            return
+
+        channel.clients.append(client)
+        client.channels.add(key)
+
+        for member in channel.clients:
+            member.send(":{} JOIN {}".format(client.prefix, channel.name))
+
+        self.send_names(client, channel.name)
+
+    def part(self, client: SimulatedClient, name: str, reason: Optional[str]=None):
+        key = self.key(name)
+        channel = self.channels.get(key)
+
+        if channel is None or key not in client.channels:
+            client.send_numeric("442", name, "You're not on that channel")
+            return
+
+        line = ":{} PART {}".format(client.prefix, channel.name)
+
+        if reason is not None:
+            line += " :{}".format(reason)
+
+        for member in channel.clients:
+            member.send(line)
+
+        channel.clients.remove(client)
+        client.channels.discard(key)
+
+    def relay(self, client: SimulatedClient, message: IRCMessage):
+        self.messages_received += 1
+
+        line = ":{} {} {} :{}".format(client.prefix, message.command, message.params[0], message.params[-1])
+
+        for target in message.params[0].split(","):
+            channel = self.channels.get(self.key(target))
+
+            if channel is not None:
+                for member in channel.clients:
+                    if member is not client:
+                        member.send(line)
+            else:
+                other = self.get_client(target)
+
+                if other is not None:
+                    other.send(line)
+
+    def remove_client(self, client: SimulatedClient, reason: str):
+        if client not in self.clients:
+            return
+
+        self.clients.remove(client)
+
+        if client.registered:
+            self.send_to_peers(client, ":{} QUIT :{}".format(client.prefix, reason))
+
+        for key in client.channels:
+            self.channels[key].clients.remove(client)
+
+        client.channels.clear()
+
+    def send_to_peers(self, client: SimulatedClient, line: str, include_self: bool=False):
+        """
+        Send a line to every client that shares a channel with `client`, once each.
+        """
+
+        peers = {member for key in client.channels for member in self.channels[key].clients}
+
+        if include_self:
+            peers.add(client)
+        else:
+            peers.discard(client)
+
+        for peer in peers:
+            peer.send(line)
+
+    def send_names(self, client: SimulatedClient, name: str):
+        """
+        Send a client a channel's NAMES list - the connected clients, then the simulated users - split over as many
+        RPL_NAMREPLY lines as it takes.
+        """
+
+        channel = self.channels.get(self.key(name))
+        lines = []
+
+        if channel is not None:
+            entries = itertools.chain(
+                (member.nick for member in channel.clients), (mode + nick for nick, mode in channel.users.items())
+            )
+
+            start = client.format_numeric("353", "=", channel.name, "")
+            current = []
+            length = len(start)
+
+            for entry in entries:
+                if current and length + len(entry) + 1 > MAX_LINE_LENGTH:
+                    lines.append(start + " ".join(current))
+                    current = []
+                    length = len(start)
+
+                current.append(entry)
+                length += len(entry) + 1
+
+            if current:
+                lines.append(start + " ".join(current))
+
+        lines.append(client.format_numeric("366", name, "End of /NAMES list."))
+        client.send_lines(lines)
+
+    # endregion
+
+    # region: Scripted traffic
+
+    def user_prefix(self, nick: str) -> str:
+        return "{}!{}@sim.{}".format(nick, nick.lower(), self.network.lower())
+
+    def add_users(self, name: str, count: int, *, nick: str="user", announce: bool=True) -> List[str]:
+        """
+        Add simulated users to a channel. Every tenth user is voiced, and every fiftieth is an op.
+
+        :param name: The channel to add the users to
+        :param count: How many users to add
+        :param nick: What to start each user's nick with; a unique number is added to the end
+        :param announce: Whether to send a JOIN to the clients in the channel for each user
+        :return: The nicks of the users that were added
+        """
+
+        channel = self.get_channel(name)
+        nicks = []
+
+        for _ in range(count):
+            index = next(self._users)
+            user = "{}{}".format(nick, index)
+
+            channel.users[user] = "@" if index % 50 == 0 else "+" if index % 10 == 0 else ""
+            nicks.append(user)
+
+        if announce:
+            lines = [":{} JOIN {}".format(self.user_prefix(user), channel.name) for user in nicks]
+
+            for client in channel.clients:
+                client.send_lines(lines)
+
+        return nicks
+
+    def names_burst(self, name: str, count: int) -> List[str]:
+        """
+        Quietly add simulated users to a channel, then send every client in it the whole NAMES list again.
+
+        :return: The nicks of the users that were added
+        """
+
+        nicks = self.add_users(name, count, announce=False)
+
+        for client in self.get_channel(name).clients:
+            self.send_names(client, name)
+
+        return nicks
+
+    async def flood(self, channels: Union[str, Iterable[str]], count: int, *, rate: Optional[float]=None,
+                    size: int=100, command: str="PRIVMSG", chunk: int=100) -> int:
+        """
+        Send messages from simulated users to the clients in one or more channels. The messages go to each channel
+        in turn, and come from a random-looking user in that channel (or "flood" if there are none).
+
+        The text of each message starts with its index and the time it was sent, so `sent_time()` can be used to
+        measure how long it took to be handled.
+
+        :param channels: The channel or channels to send to
+        :param count: How many messages to send in total
+        :param rate: How many messages to send per second, or None to send them as fast as the clients take them
+        :param size: How long each message's text should be, in characters
+        :param command: The command to send the messages with, "PRIVMSG" or "NOTICE"
+        :param chunk: The most messages to send per write; this is also how often the clients get a chance to read,
+                      when there's no rate
+        :return: How many lines were sent - one for each client in the channel, for each message
+        """
+
+        if isinstance(channels, str):
+            channels = [channels]
+
+        targets = [self.get_channel(name) for name in channels]
+        senders = [list(channel.users) or ["flood"] for channel in targets]
+
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        sent = 0
+        delivered = 0
+
+        while sent < count:
+            if rate is None:
+                due = min(count, sent + chunk)
+            else:
+                due = min(count, sent + chunk, int((loop.time() - start) * rate) + 1)
+
+            pending = {}  #: Dict[SimulatedClient, List[str]]
+
+            for index in range(sent, due):
+                target = index % len(targets)
+                channel = targets[target]
+                users = senders[target]
+                user = users[(index * 7919) % len(users)]
+
+                text = "{} {:.9f} ".format(index, perf_counter())
+                line = ":{} {} {} :{}".format(
+                    self.user_prefix(user), command, channel.name, text + "x" * max(0, size - len(text))
+                )
+
+                for client in channel.clients:
+                    pending.setdefault(client, []).append(line)
+
+            for client, lines in pending.items():
+                client.send_lines(lines)
+                delivered += len(lines)
+
+            sent = due
+
+            if rate is None:
+                await asyncio.gather(*(client.drain() for client in pending))
+                await asyncio.sleep(0)
+            elif sent < count:
+                await asyncio.sleep(max(0.0, start + sent / rate - loop.time()))
+
+        return delivered
+
+    def netsplit(self, count: Optional[int]=None, *, channel: Optional[str]=None,
+                 servers: str="hub.example.net leaf.example.net") -> List[str]:
+        """
+        Make simulated users quit all at once, as if their server split from the network. Clients with the `batch`
+        capability get the QUITs in a `netsplit` batch. The users can be brought back with `netjoin()`.
+
+        :param count: How many users should quit, or None for all of them
+        :param channel: Only make users in this channel quit, or None for users in any channel
+        :param servers: The quit message - the two servers that split
+        :return: The nicks of the users that quit
+        """
+
+        if channel is not None:
+            candidates = list(self.get_channel(channel).users)
+        else:
+            candidates = list(dict.fromkeys(nick for chan in self.channels.values() for nick in chan.users))
+
+        nicks = candidates if count is None else candidates[:count]
+        quits = {}  #: Dict[SimulatedClient, Dict[str, None]]: Client -> nicks to send QUITs for, in order
+
+        for nick in nicks:
+            split_channels = []
+            mode = ""
+
+            for key, chan in self.channels.items():
+                if nick in chan.users:
+                    mode = chan.users.pop(nick)
+                    split_channels.append(key)
+
+                    for client in chan.clients:
+                        quits.setdefault(client, {})[nick] = None
+
+            self._split[nick] = (mode, split_channels)
+
+        for client, quitting in quits.items():
+            lines = [":{} QUIT :{}".format(self.user_prefix(nick), servers) for nick in quitting]
+            client.send_lines(self.batch(client, "netsplit", servers, lines))
+
+        return nicks
+
+    def netjoin(self, nicks: Optional[Iterable[str]]=None, *, servers: str="hub.example.net leaf.example.net"):
+        """
+        Bring back users that quit in a `netsplit()`, rejoining the channels they were in. Clients with the `batch`
+        capability get the JOINs in a `netjoin` batch.
+
+        :param nicks: The users to bring back, or None for all of them
+        """
+
+        if nicks is None:
+            nicks = list(self._split)
+
+        joins = {}  #: Dict[SimulatedClient, List[str]]
+
+        for nick in nicks:
+            mode, keys = self._split.pop(nick, ("", []))
+
+            for key in keys:
+                channel = self.channels.get(key)
+
+                if channel is None:
+                    continue
+
+                channel.users[nick] = mode
+
+                for client in channel.clients:
+                    joins.setdefault(client, []).append(
+                        ":{} JOIN {}".format(self.user_prefix(nick), channel.name)
+                    )
+
+        for client, lines in joins.items():
+            client.send_lines(self.batch(client, "netjoin", servers, lines))
+
+    def batch(self, client: SimulatedClient, batch_type: str, params: str, lines: List[str]) -> List[str]:
+        """
+        Wrap lines in a batch, if the client has the `batch` capability.
+        """
+
+        if "batch" not in client.capabilities:
+            return lines
+
+        reference = "sim{}".format(next(self._tokens))
+
+        batch = [":{} BATCH +{} {} {}".format(self.name, reference, batch_type, params)]
+        batch += ["@batch={} {}".format(reference, line) for line in lines]
+        batch.append(":{} BATCH -{}".format(self.name, reference))
+
+        return batch
+
+    # endregion